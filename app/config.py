@@ -1,9 +1,10 @@
 import logging
 from enum import Enum
 from pathlib import Path
+from typing import Literal
 
 from platformdirs import PlatformDirs
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, JsonConfigSettingsSource, PydanticBaseSettingsSource, SettingsConfigDict
 
 from .version import __version__
@@ -49,12 +50,54 @@ class LogLevels(int, Enum):
     critical = logging.CRITICAL
 
 
+class DatabaseSettings(BaseModel):
+    """SQLite settings applied to every pooled connection of the local database."""
+
+    journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+
+    mmap_size: int = Field(default=256 * 1024 * 1024, ge=0)  # bytes
+    cache_size: int = -64 * 1024  # negative values are in KiB
+
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    busy_timeout: int = Field(default=5000, ge=0)  # milliseconds
+
+    pool_size: int = Field(default=5, ge=1)
+    max_overflow: int = Field(default=10, ge=0)
+
+    # Writes queued within this long of each other are committed together, up to `group_commit_size`
+    group_commit_delay: int = Field(default=1, ge=0)  # milliseconds
+    group_commit_size: int = Field(default=500, ge=1)
+
+
+class HttpClientSettings(BaseModel):
+    """Connection pool and timeout settings for the HTTP clients used to sync with the server."""
+
+    connect_timeout: float = Field(default=10.0, gt=0)  # seconds
+    read_timeout: float = Field(default=30.0, gt=0)
+
+    write_timeout: float = Field(default=30.0, gt=0)
+    pool_timeout: float = Field(default=10.0, gt=0)
+
+    max_connections: int = Field(default=20, ge=1)
+    max_keepalive_connections: int = Field(default=10, ge=0)
+
+    keepalive_expiry: float = Field(default=30.0, ge=0)  # seconds
+    http2: bool = False  # needs the 'h2' package
+
+    max_concurrency: int = Field(default=8, ge=1)  # concurrent requests per async fan-out
+
+
 class AppSettings(BaseSettings):
     model_config = SettingsConfigDict(json_file=app_file_paths.config_file, validate_assignment=True)
 
     log_level: LogLevels = LogLevels.debug.value
     recent_databases: list[Path] = []
 
+    max_worker_threads: int = Field(default=8, ge=1)
+    database: DatabaseSettings = DatabaseSettings()
+    http: HttpClientSettings = HttpClientSettings()
+
     @classmethod
     def settings_customise_sources(
         cls,
@@ -1,23 +1,44 @@
 import logging
+import threading
 import typing
+import uuid
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict, deque
 from functools import partial
+from pathlib import Path
 
+import httpx
 from PySide6.QtCore import QObject, Signal, Slot
-from pydantic import TypeAdapter
 
+from ..client.errors import UnexpectedStatus
+from ..importers import VaultImporter
 from ..localdb.database import MainDatabase
 from ..models.models import (
     AddPasswordGroup,
     EditedEntryWithID,
     EditedPasswordEntryInfo,
-    GroupChildrenData,
+    EntryCursor,
+    EntryRow,
+    ExportFormat,
+    ExportResult,
     GroupParentData,
+    ImportResult,
+    OutboxOperationType,
     PasswordEntryData,
+    SyncResult,
 )
 from ..serversync.client import SyncClient
 from ..serversync.models import EntryPublicGet, GroupPublicGet
-from ..workers import make_worker_thread
+from ..serversync.outbox import OutboxFlusher
+from ..serversync.sync import SyncEngine
+from ..workers import (
+    SingleFlight,
+    TaskDroppedError,
+    TaskPriority,
+    WorkerTask,
+    make_future_task,
+    make_worker_thread,
+)
 
 if typing.TYPE_CHECKING:
     from .tabs.passwords import PasswordEntriesController
@@ -26,8 +47,30 @@ if typing.TYPE_CHECKING:
 # TODO: Add better logging and error handling
 logger: logging.Logger = logging.getLogger("passwordmanager-client")
 
+# Identical reads started while one is still running share its result. Keys are (operation, group ID, ...)
+# and end with the database's write version, so a read started after a write never joins one from before it
+read_flights: SingleFlight = SingleFlight()
+
+
+class ServerCallError(Exception):
+    """Raised by network calls the server rejected, carrying the data so the local write can be undone."""
+
+    def __init__(self, data, message: str = "server rejected the request"):
+        super().__init__(message)
+        self.data = data
+
+
+class ServerUnreachableError(ServerCallError):
+    """Raised by network calls that could not reach the server, carrying the data so it can be queued."""
+
+    def __init__(self, data):
+        super().__init__(data, "server is unreachable")
+
+
+def _entry_payload(data: EditedPasswordEntryInfo) -> dict:
+    return data.model_dump(mode="json", include={"title", "username", "password", "url", "notes"})
+
 
-# TODO: Add functionality to sync data created while sync was disabled
 class EntriesDataController(QObject):
     def __init__(self, parent: "PasswordEntriesController"):
         super().__init__(parent)
@@ -49,6 +92,9 @@ class EntriesDataController(QObject):
         self.update_entry = UpdateEntryHelper(self)
         self.fetch_entries = FetchEntriesHelper(self)
 
+        self.fetch_entry = FetchEntryHelper(self)
+        self.search_entries = SearchEntriesHelper(self)
+
 
 class GroupsDataController(QObject):
     def __init__(self, parent: "PasswordEntriesController"):
@@ -69,7 +115,12 @@ class GroupsDataController(QObject):
         self.delete_group = DeleteGroupHelper(self)
 
         self.fetch_root = FetchRootGroupHelper(self)
-        self.fetch_children = FetchGroupChildrenHelper(self)
+        self.fetch_tree = FetchGroupTreeHelper(self)
+        self.pull_changes = PullChangesHelper(self)
+        self.flush_outbox = FlushOutboxHelper(self)
+
+        self.import_entries = ImportEntriesHelper(self)
+        self.export_entries = ExportEntriesHelper(self)
 
 
 class MetaQObjectABC(type(QObject), ABCMeta):
@@ -109,60 +160,129 @@ class BaseHelper(QObject, metaclass=MetaQObjectABC):
         pass
 
 
+class SupersedableHelper(BaseHelper):
+    """Base class for data helpers where only the latest request matters.
+
+    Requests are tagged with the generation they were started in. `supersede()` starts a new generation,
+    dropping queued tasks of the older ones, helpers discard any result from an older generation.
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        self.generation: int = 0
+        self._tasks: list[WorkerTask] = []
+
+    def supersede(self):
+        self.generation += 1
+
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks.clear()
+
+    def track(self, task: WorkerTask):
+        self._tasks.append(task)
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self.generation
+
+
 class AddEntryHelper(BaseHelper):
     addEntryComplete = Signal(PasswordEntryData)
+    addEntryConfirmed = Signal(object, PasswordEntryData)  # (local ID, entry with the server ID)
+
+    addEntryFailed = Signal(PasswordEntryData)
 
     def __init__(self, parent):
         super().__init__(parent)
 
+    def _net_create(self, entry: PasswordEntryData):
+        try:
+            net_entry = self.client.entries.create_entry(entry.group_id, entry)
+        except httpx.TransportError as exc:
+            raise ServerUnreachableError(entry) from exc
+        except Exception as exc:
+            raise ServerCallError(entry) from exc
+
+        # The server assigns its own ID, re-key the row that was already written locally
+        self.db.entries.change_entry_id(entry.entry_id, net_entry.entry_id)
+        return entry.entry_id, entry.model_copy(update={"entry_id": net_entry.entry_id})
+
+    def _db_create_offline(self, data: EditedPasswordEntryInfo):
+        entry = self.db.entries.create_entry(data.group_id, data)
+        self.db.outbox.record(OutboxOperationType.create_entry, entry.entry_id, entry.group_id, _entry_payload(data))
+
+        return entry
+
+    def _db_rollback(self, entry: PasswordEntryData):
+        self.db.entries.delete_entry_by_id(entry.entry_id, entry.group_id)
+        return entry
+
     @Slot(EditedPasswordEntryInfo)
     def start_processing(self, data: EditedPasswordEntryInfo):
+        # Write locally first so the table updates at disk speed, the server confirms in the background
         if self.client.enabled:
-            net_func = partial(self.client.entries.create_entry, data.group_id, data)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
-
-            logger.info("Sent request to add password entry")
-            return
+            func = partial(self.db.entries.create_entry, data.group_id, data)
+        else:
+            func = partial(self._db_create_offline, data)
 
-        func = partial(self.db.entries.create_entry, data.group_id, data)
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
+        logger.debug("Adding entry '%s' to local database", data.title)
 
-        logger.debug("Client disabled, adding entry '%s' to local database", data.title)
+    @Slot(object)
+    def after_server_call(self, result: tuple[uuid.UUID, PasswordEntryData]):
+        local_id, entry = result
 
-    @Slot(EntryPublicGet)
-    def after_server_call(self, entry: EntryPublicGet):
-        url_or_none = entry.url.model_dump() if entry.url is not None else None
-
-        data = EditedPasswordEntryInfo(
-            title=entry.title,
-            username=entry.username,
-            password=entry.password,
-            url=url_or_none,
-            notes=entry.notes,
-            group_id=entry.group_id,
-        )
-        func = partial(
-            self.db.entries.create_entry, entry.group_id, data, entry_id=entry.entry_id, created_at=entry.created_at
-        )
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
-        logger.debug("Server response OK, adding entry '%s' to local database", entry.title)
+        logger.debug("Server confirmed entry '%s'", entry.title)
+        self.addEntryConfirmed.emit(local_id, entry)
 
     @Slot(PasswordEntryData)
     def after_db_call(self, entry: PasswordEntryData):
         logger.debug("Entry '%s' added to database", entry.title)
         self.addEntryComplete.emit(entry)
 
+        if self.client.enabled:
+            net_func = partial(self._net_create, entry)
+            make_worker_thread(
+                net_func,
+                self.after_server_call,
+                self.server_call_failed,
+                priority=TaskPriority.background_sync,
+                droppable=False,
+            )
+
+            logger.info("Sent request to add password entry")
+
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
         logger.error("Error:", exc_info=exc)
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
+        if isinstance(exc, ServerUnreachableError):
+            entry: PasswordEntryData = exc.data
+            logger.warning("Server unreachable, adding entry '%s' to the outbox", entry.title)
+
+            func = partial(
+                self.db.outbox.record,
+                OutboxOperationType.create_entry,
+                entry.entry_id,
+                entry.group_id,
+                _entry_payload(entry),
+            )
+            make_future_task(self.db.defer(func), exc_callback=self.db_call_failed)
+            return
+
         logger.error("Error:", exc_info=exc)
+        if isinstance(exc, ServerCallError):
+            func = partial(self._db_rollback, exc.data)
+            make_future_task(self.db.defer(func), self.addEntryFailed.emit, self.db_call_failed)
 
 
 class DeleteEntryHelper(BaseHelper):
     deleteEntryComplete = Signal(PasswordEntryData)
+    deleteEntryFailed = Signal(PasswordEntryData)
 
     def __init__(self, parent: EntriesDataController):
         super().__init__(parent)
@@ -171,160 +291,432 @@ class DeleteEntryHelper(BaseHelper):
         if not self.client.enabled:
             raise RuntimeError("Called _net_delete with a disabled client")
 
-        self.client.entries.delete_entry_by_id(data.entry_id, data.group_id)
+        try:
+            self.client.entries.delete_entry_by_id(data.entry_id, data.group_id)
+        except httpx.TransportError as exc:
+            raise ServerUnreachableError(data) from exc
+        except UnexpectedStatus as exc:
+            # Already gone on the server
+            if exc.status_code != 404:
+                raise ServerCallError(data) from exc
+        except Exception as exc:
+            raise ServerCallError(data) from exc
+
         return data
 
-    def _db_delete(self, data: PasswordEntryData):
+    def _db_delete(self, row: EntryRow):
+        # Listings don't carry the password and notes, keep the full entry in case the server rejects this
+        data = self.db.entries.get_entry(row.entry_id)
         self.db.entries.delete_entry_by_id(data.entry_id, data.group_id)
+
         return data
 
-    def start_processing(self, data: PasswordEntryData):
-        if self.client.enabled:
-            net_func = partial(self._net_delete, data)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
-            return
+    def _db_delete_offline(self, row: EntryRow):
+        data = self._db_delete(row)
+        self.db.outbox.record(OutboxOperationType.delete_entry, data.entry_id, data.group_id)
 
-        func = partial(self._db_delete, data)
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        return data
 
-        logger.debug("Client disabled, deleting entry '%s'", data.title)
+    def _db_rollback(self, data: PasswordEntryData):
+        return self.db.entries.create_entry(data.group_id, data, entry_id=data.entry_id, created_at=data.created_at)
 
-    @Slot(EntryPublicGet)
-    def after_server_call(self, data: PasswordEntryData):
-        func = partial(self._db_delete, data)
+    def start_processing(self, row: EntryRow):
+        if self.client.enabled:
+            func = partial(self._db_delete, row)
+        else:
+            func = partial(self._db_delete_offline, row)
 
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
-        logger.debug("Server response OK, deleting entry '%s' from local database", data.title)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
+        logger.debug("Deleting entry '%s' from local database", row.title)
+
+    @Slot(object)
+    def after_server_call(self, data: PasswordEntryData):
+        logger.debug("Server confirmed deletion of entry '%s'", data.title)
 
     @Slot(PasswordEntryData)
     def after_db_call(self, entry: PasswordEntryData):
         logger.debug("Entry '%s' deleted from database", entry.title)
         self.deleteEntryComplete.emit(entry)
 
+        if self.client.enabled:
+            net_func = partial(self._net_delete, entry)
+            make_worker_thread(
+                net_func,
+                self.after_server_call,
+                self.server_call_failed,
+                priority=TaskPriority.background_sync,
+                droppable=False,
+            )
+
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
         logger.error("Error:", exc_info=exc)
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
+        if isinstance(exc, ServerUnreachableError):
+            entry: PasswordEntryData = exc.data
+            logger.warning("Server unreachable, adding deletion of entry '%s' to the outbox", entry.title)
+
+            func = partial(self.db.outbox.record, OutboxOperationType.delete_entry, entry.entry_id, entry.group_id)
+            make_future_task(self.db.defer(func), exc_callback=self.db_call_failed)
+            return
+
         logger.error("Error:", exc_info=exc)
+        if isinstance(exc, ServerCallError):
+            func = partial(self._db_rollback, exc.data)
+            make_future_task(self.db.defer(func), self.deleteEntryFailed.emit, self.db_call_failed)
 
 
 class UpdateEntryHelper(BaseHelper):
     updateEntryComplete = Signal(PasswordEntryData)
+    updateEntryConflicted = Signal(PasswordEntryData)
 
     def __init__(self, parent):
         super().__init__(parent)
 
-    @Slot(EditedEntryWithID)
-    def start_processing(self, data: EditedEntryWithID):
-        if self.client:
-            net_func = partial(self.client.entries.update_entry_data, data.entry_id, data)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
+    def _net_update(self, entry: PasswordEntryData):
+        data = EditedEntryWithID.model_validate(entry, from_attributes=True)
+        try:
+            self.client.entries.update_entry_data(data.entry_id, data)
+        except httpx.TransportError as exc:
+            raise ServerUnreachableError(entry) from exc
+        except Exception as exc:
+            raise ServerCallError(entry) from exc
 
-            logger.info("Sending request to edit entry...")
-            return
+        return entry
 
-        func = partial(self.db.entries.update_entry_data, data.entry_id, data)
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+    def _db_update_offline(self, data: EditedEntryWithID):
+        entry = self.db.entries.update_entry_data(data.entry_id, data)
+        self.db.outbox.record(OutboxOperationType.update_entry, data.entry_id, data.group_id, _entry_payload(data))
 
-    @Slot(EntryPublicGet)
-    def after_server_call(self, data: EntryPublicGet):
-        # This is used because it's a RootModel generated instead of an actual AnyUrl
-        url_or_none = data.url.model_dump() if data.url is not None else None
-
-        entry = EditedEntryWithID(
-            title=data.title,
-            username=data.username,
-            password=data.password,
-            url=url_or_none,
-            notes=data.notes,
-            entry_id=data.entry_id,
-            group_id=data.group_id,
-        )
-        func = partial(self.db.entries.update_entry_data, data.entry_id, entry)
+        return entry
+
+    def _db_mark_conflicted(self, entry: PasswordEntryData):
+        # Keep the local edit visible, the next pull replaces it with the server copy
+        self.db.syncstate.forget([entry.entry_id])
+        return entry
+
+    @Slot(EditedEntryWithID)
+    def start_processing(self, data: EditedEntryWithID):
+        if self.client.enabled:
+            func = partial(self.db.entries.update_entry_data, data.entry_id, data)
+        else:
+            func = partial(self._db_update_offline, data)
+
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
+        logger.debug("Updating entry '%s' in local database", data.title)
 
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
-        logger.debug("Server response OK, updating entry '%s'", data.title)
+    @Slot(object)
+    def after_server_call(self, data: PasswordEntryData):
+        logger.debug("Server confirmed update of entry '%s'", data.title)
 
     @Slot(PasswordEntryData)
     def after_db_call(self, data: PasswordEntryData):
         logger.debug("Entry '%s' updated", data.title)
         self.updateEntryComplete.emit(data)
 
+        if self.client.enabled:
+            net_func = partial(self._net_update, data)
+            make_worker_thread(
+                net_func,
+                self.after_server_call,
+                self.server_call_failed,
+                priority=TaskPriority.background_sync,
+                droppable=False,
+            )
+
+            logger.info("Sending request to edit entry...")
+
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
         logger.error("Error:", exc_info=exc)
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
+        if isinstance(exc, ServerUnreachableError):
+            entry: PasswordEntryData = exc.data
+            logger.warning("Server unreachable, adding update of entry '%s' to the outbox", entry.title)
+
+            func = partial(
+                self.db.outbox.record,
+                OutboxOperationType.update_entry,
+                entry.entry_id,
+                entry.group_id,
+                _entry_payload(entry),
+            )
+            make_future_task(self.db.defer(func), exc_callback=self.db_call_failed)
+            return
+
         logger.error("Error:", exc_info=exc)
+        if isinstance(exc, ServerCallError):
+            func = partial(self._db_mark_conflicted, exc.data)
+            make_future_task(self.db.defer(func), self.updateEntryConflicted.emit, self.db_call_failed)
+
 
+class FetchEntriesHelper(SupersedableHelper):
+    fetchEntriesComplete = Signal(list, bool)  # (entries, has_more)
+    fetchMoreEntriesComplete = Signal(object, list, bool)  # (group ID, entries, has_more)
+    fetchMoreEntriesFailed = Signal(Exception)
 
-class FetchEntriesHelper(BaseHelper):
-    fetchEntriesComplete = Signal(list)
+    page_size: int = 200
+    cache_size: int = 32  # first pages kept in memory
 
     def __init__(self, parent):
         super().__init__(parent)
 
-    def _process_entries(self, group: GroupParentData):
-        if self.client.enabled:
-            net_entries = self.client.entries.get_entries_by_group(group.group_id, amount=100, offset=0)
-        else:
-            net_entries = None
+        # Group ID -> (write version, entries, has_more), least recently used first
+        self._cache: OrderedDict[uuid.UUID, tuple[int, list[EntryRow], bool]] = OrderedDict()
+
+        self._prefetch_queue: deque[GroupParentData] = deque()
+        self._prefetch_task: WorkerTask | None = None
+        self._prefetch_group: GroupParentData | None = None
+
+        # (group, cursor, generation) of the last next page requested
+        self._next_page: tuple[GroupParentData, EntryCursor, int] | None = None
+
+    def _process_entries(self, group: GroupParentData, after: EntryCursor | None, generation: int):
+        # Taken before reading, a write committed meanwhile makes the page look older than it is, never newer
+        version = self.db.write_version
+
+        # Another group was selected after this one was queued
+        if self.is_stale(generation):
+            return generation, version, group.group_id, [], False, after is not None
+
+        # The local database is kept in sync by `SyncEngine`, so reads never go to the server.
+        # One extra row tells whether another page exists without a count query
+        entries = self.db.entries.get_entries_by_group(group.group_id, amount=self.page_size + 1, after=after)
+        has_more = len(entries) > self.page_size
+
+        return generation, version, group.group_id, entries[: self.page_size], has_more, after is not None
+
+    def _flight_key(self, group: GroupParentData, after: EntryCursor | None) -> tuple:
+        # Results are tagged with the generation, only reads started in the current one can be joined
+        cursor = (after.title, after.entry_id) if after is not None else None
+        return "fetch_entries", group.group_id, cursor, self.generation, self.db.write_version
+
+    def _cached(self, group_id: uuid.UUID) -> tuple[int, list[EntryRow], bool] | None:
+        cached = self._cache.get(group_id)
+        if cached is None:
+            return None
 
-        db_entries = self.db.entries.get_entries_by_group(group.group_id, amount=100, offset=0)
-        if net_entries is None:
-            logger.debug("Client disabled, returning entries found in database")
-            return db_entries
+        # Any write since the page was read may have changed it
+        if cached[0] != self.db.write_version:
+            del self._cache[group_id]
+            return None
 
-        len_net_entries = len(net_entries)
-        len_db_entries = len(db_entries)
+        return cached
 
-        if len_net_entries != len_db_entries:
-            logger.error(
-                "Retrieved %d entries from server, only retrieved %d entries from local database",
-                len_net_entries,
-                len_db_entries,
+    def _store(self, group_id: uuid.UUID, version: int, entries: list[EntryRow], has_more: bool):
+        self._cache[group_id] = (version, entries, has_more)
+        self._cache.move_to_end(group_id)
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def supersede(self):
+        super().supersede()
+
+        # A prefetch is tagged with the generation it was queued in, the next `prefetch()` starts over
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = self._prefetch_group = None
+
+    def start_processing(self, group: GroupParentData, after: EntryCursor | None = None):
+        if after is None:
+            cached = self._cached(group.group_id)
+            if cached is not None:
+                self.supersede()
+                self._cache.move_to_end(group.group_id)
+
+                _, entries, has_more = cached
+                logger.info("Loaded entries for group '%s' from memory", group.group_name)
+
+                self.fetchEntriesComplete.emit(entries, has_more)
+                return
+
+        # Loading a group replaces whatever is still being fetched, unless it is the same load again.
+        # Next pages belong to the current load
+        if after is None and not read_flights.in_flight(self._flight_key(group, after)):
+            self.supersede()
+
+        key = self._flight_key(group, after)
+
+        # The selected group is what the user is looking at, it goes ahead of every other queued task
+        func = partial(self._process_entries, group, after, self.generation)
+        if after is None:
+            task = read_flights.run(
+                key, func, self.after_db_call, self.db_call_failed, TaskPriority.interactive, jump_queue=True
             )
-            raise RuntimeError(f"expected {len_net_entries} entries from client, only got {len_db_entries}")
-
-        conv_entries: list[PasswordEntryData] = []
-        for entry in net_entries:
-            url_or_none = entry.url.model_dump() if entry.url is not None else None
-            conv_entry = PasswordEntryData(
-                title=entry.title,
-                username=entry.username,
-                password=entry.password,
-                url=url_or_none,
-                notes=entry.notes,
-                entry_id=entry.entry_id,
-                group_id=entry.group_id,
-                created_at=entry.created_at,
+        else:
+            self._next_page = (group, after, self.generation)
+            task = read_flights.run(key, func, self.after_db_call, self.next_page_failed, TaskPriority.visible_prefetch)
+
+        self.track(task)
+
+        if after is None:
+            logger.info("Reloading entries for group '%s'", group.group_name)
+
+    def prefetch(self, groups: list[GroupParentData]):
+        """Reads the first page of `groups` into memory, one group at a time and behind the groups on screen.
+
+        Replaces the groups still waiting from an earlier call. Loading a group cancels the read in progress,
+        loads never share a read with prefetches.
+        """
+        self._prefetch_queue = deque(groups)
+
+        # A task cancelled by a helper that joined it never reports back
+        if self._prefetch_task is None or self._prefetch_task.cancelled:
+            self._prefetch_next()
+
+    def stop_prefetch(self):
+        """Drops the groups still waiting to be prefetched, a read that already started still finishes."""
+
+        self._prefetch_queue.clear()
+
+    def _prefetch_next(self):
+        self._prefetch_task = self._prefetch_group = None
+
+        while self._prefetch_queue:
+            group = self._prefetch_queue.popleft()
+            if self._cached(group.group_id) is not None:
+                continue
+
+            # Not shared with `start_processing()`, whose reads are tagged with their own generation
+            key = ("prefetch_entries", group.group_id, self.generation, self.db.write_version)
+            func = partial(self._process_entries, group, None, self.generation)
+
+            self._prefetch_group = group
+            self._prefetch_task = read_flights.run(
+                key, func, self.after_prefetch, self.prefetch_failed, TaskPriority.visible_prefetch
             )
-            conv_entries.append(conv_entry)
+            return
 
-        return conv_entries
+    @Slot(object)
+    def after_prefetch(self, result: tuple[int, int, uuid.UUID, list[EntryRow], bool, bool]):
+        generation, version, group_id, entries, has_more, _ = result
+        if not self.is_stale(generation):
+            self._store(group_id, version, entries, has_more)
 
-    def start_processing(self, group: GroupParentData):
-        # TODO: Implement paging using the amount and offset
-        if self.client.enabled:
-            net_func = partial(self._process_entries, group)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
+        self._prefetch_next()
+
+    @Slot(Exception)
+    def prefetch_failed(self, exc: Exception):
+        if not isinstance(exc, TaskDroppedError):
+            logger.error("Error:", exc_info=exc)
+
+        self._prefetch_next()
+
+    @Slot(object)
+    def after_server_call(self, result: tuple[int, int, uuid.UUID, list[EntryRow], bool, bool]):
+        self.after_db_call(result)
+
+    @Slot(object)
+    def after_db_call(self, result: tuple[int, int, uuid.UUID, list[EntryRow], bool, bool]):
+        generation, version, group_id, entries, has_more, is_next_page = result
+        if self.is_stale(generation):
+            logger.debug("Discarding %d entries of a superseded fetch", len(entries))
+            return
+
+        if is_next_page:
+            self.fetchMoreEntriesComplete.emit(group_id, entries, has_more)
             return
 
-        func = partial(self._process_entries, group)
+        self._store(group_id, version, entries, has_more)
+        self.fetchEntriesComplete.emit(entries, has_more)
 
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
-        logger.info("Reloading entries for group '%s'", group.group_name)
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        logger.error("Error:", exc_info=exc)
 
-    @Slot(list)
-    def after_server_call(self, entries: list[PasswordEntryData]):
-        self.fetchEntriesComplete.emit(entries)
+    @Slot(Exception)
+    def next_page_failed(self, exc: Exception):
+        # Pushed out of a full queue, the page is still wanted unless another group was selected since
+        if isinstance(exc, TaskDroppedError) and self._next_page is not None:
+            group, after, generation = self._next_page
+            if not self.is_stale(generation):
+                logger.warning("Next page of group '%s' was dropped, fetching it again", group.group_name)
+                self.start_processing(group, after)
 
-    @Slot(list)
-    def after_db_call(self, entries: list[PasswordEntryData]):
-        self.fetchEntriesComplete.emit(entries)
+            return
+
+        logger.error("Error:", exc_info=exc)
+        self.fetchMoreEntriesFailed.emit(exc)
+
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        logger.error("Error:", exc_info=exc)
+
+
+class FetchEntryHelper(BaseHelper):
+    fetchEntryComplete = Signal(PasswordEntryData)
+    fetchEntryForEditComplete = Signal(PasswordEntryData)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+    def start_processing(self, row: EntryRow, for_edit: bool = False):
+        # Listed rows only hold the displayed columns, this loads the password and notes of one entry
+        func = partial(self.db.entries.get_entry, row.entry_id)
+        callback = self.after_db_call_for_edit if for_edit else self.after_db_call
+
+        make_worker_thread(func, callback, self.db_call_failed)
+        logger.debug("Fetching entry '%s'", row.title)
+
+    @Slot(PasswordEntryData)
+    def after_server_call(self, entry: PasswordEntryData):
+        self.after_db_call(entry)
+
+    @Slot(PasswordEntryData)
+    def after_db_call(self, entry: PasswordEntryData):
+        self.fetchEntryComplete.emit(entry)
+
+    @Slot(PasswordEntryData)
+    def after_db_call_for_edit(self, entry: PasswordEntryData):
+        self.fetchEntryForEditComplete.emit(entry)
+
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        logger.error("Error:", exc_info=exc)
+
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        logger.error("Error:", exc_info=exc)
+
+
+class SearchEntriesHelper(SupersedableHelper):
+    searchEntriesComplete = Signal(list)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+    def _search(self, query: str, limit: int, offset: int, generation: int):
+        if self.is_stale(generation):
+            return generation, []
+
+        return generation, self.db.entries.search(query, limit=limit, offset=offset)
+
+    def start_processing(self, query: str, limit: int = 200, offset: int = 0):
+        self.supersede()
+
+        # The server has no search endpoint, the local database always mirrors it
+        func = partial(self._search, query, limit, offset, self.generation)
+        self.track(make_worker_thread(func, self.after_db_call, self.db_call_failed))
+
+        logger.debug("Searching entries for '%s'", query)
+
+    @Slot(object)
+    def after_server_call(self, result: tuple[int, list[EntryRow]]):
+        self.after_db_call(result)
+
+    @Slot(object)
+    def after_db_call(self, result: tuple[int, list[EntryRow]]):
+        generation, entries = result
+        if self.is_stale(generation):
+            logger.debug("Discarding %d results of a superseded search", len(entries))
+            return
+
+        self.searchEntriesComplete.emit(entries)
 
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
@@ -341,24 +733,38 @@ class AddGroupHelper(BaseHelper):
     def __init__(self, parent):
         super().__init__(parent)
 
+    def _net_create(self, data: AddPasswordGroup):
+        try:
+            return self.client.groups.create_group(data.group_name, parent_id=data.parent_id)
+        except httpx.TransportError as exc:
+            raise ServerUnreachableError(data) from exc
+
+    def _db_create_offline(self, data: AddPasswordGroup):
+        group = self.db.groups.create_group(data.group_name, parent_id=data.parent_id)
+        self.db.outbox.record(
+            OutboxOperationType.create_group, group.group_id, group.parent_id, {"group_name": group.group_name}
+        )
+
+        return group
+
     @Slot(AddPasswordGroup)
     def start_processing(self, data: AddPasswordGroup):
         if self.client.enabled:
-            net_func = partial(self.client.groups.create_group, data.group_name, parent_id=data.parent_id)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
+            net_func = partial(self._net_create, data)
+            make_worker_thread(net_func, self.after_server_call, self.server_call_failed, droppable=False)
 
             logger.info("Sent request to add password group")
             return
 
-        func = partial(self.db.groups.create_group, data.group_name, parent_id=data.parent_id)
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        func = partial(self._db_create_offline, data)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
 
     @Slot(GroupPublicGet)
     def after_server_call(self, group: GroupPublicGet):
         func = partial(
             self.db.groups.create_group, group.group_name, parent_id=group.parent_id, group_id=group.group_id
         )
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
 
     @Slot(GroupParentData)
     def after_db_call(self, group: GroupParentData):
@@ -371,6 +777,13 @@ class AddGroupHelper(BaseHelper):
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
+        if isinstance(exc, ServerUnreachableError):
+            logger.warning("Server unreachable, adding group '%s' to the outbox", exc.data.group_name)
+
+            func = partial(self._db_create_offline, exc.data)
+            make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
+            return
+
         logger.error("Error:", exc_info=exc)
 
 
@@ -384,21 +797,31 @@ class DeleteGroupHelper(BaseHelper):
         if not self.client.enabled:
             raise RuntimeError("Called _net_delete with a disabled client")
 
-        self.client.groups.delete_group(data.group_id)
+        try:
+            self.client.groups.delete_group(data.group_id)
+        except httpx.TransportError as exc:
+            raise ServerUnreachableError(data) from exc
+
         return data
 
     def _db_delete(self, data: GroupParentData):
         self.db.groups.delete_group(data.group_id)
         return data
 
+    def _db_delete_offline(self, data: GroupParentData):
+        self.db.groups.delete_group(data.group_id)
+        self.db.outbox.record(OutboxOperationType.delete_group, data.group_id, data.parent_id)
+
+        return data
+
     def start_processing(self, data: GroupParentData):
         if self.client.enabled:
             net_func = partial(self._net_delete, data)
-            make_worker_thread(net_func, self.after_server_call, self.server_call_failed)
+            make_worker_thread(net_func, self.after_server_call, self.server_call_failed, droppable=False)
             return
 
-        func = partial(self._db_delete, data)
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        func = partial(self._db_delete_offline, data)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
 
         logger.debug("Client disabled, deleting group '%s'", data.group_name)
 
@@ -406,7 +829,7 @@ class DeleteGroupHelper(BaseHelper):
     def after_server_call(self, data: GroupParentData):
         func = partial(self._db_delete, data)
 
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
         logger.debug("Server response OK, deleting group '%s' from local database", data.group_name)
 
     @Slot(PasswordEntryData)
@@ -420,6 +843,13 @@ class DeleteGroupHelper(BaseHelper):
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
+        if isinstance(exc, ServerUnreachableError):
+            logger.warning("Server unreachable, adding deletion of group '%s' to the outbox", exc.data.group_name)
+
+            func = partial(self._db_delete_offline, exc.data)
+            make_future_task(self.db.defer(func), self.after_db_call, self.db_call_failed)
+            return
+
         logger.error("Error:", exc_info=exc)
 
 
@@ -429,33 +859,11 @@ class FetchRootGroupHelper(BaseHelper):
     def __init__(self, parent):
         super().__init__(parent)
 
-    def _process_root(self):
-        if self.client.enabled:
-            net_group = self.client.groups.get_root_info()
-        else:
-            net_group = None
-        
-        db_group = self.db.groups.get_root_info()
-        if net_group is None:
-            logger.debug("Client disabled, returning group found in database")
-            return db_group
-
-        conv_group = GroupParentData.model_validate(net_group, from_attributes=True)
-        if db_group != conv_group:
-            logger.error(
-                "Local group [ID: %s] '%s' does not match remote group [ID: %s] '%s'",
-                db_group.group_id, db_group.group_name, conv_group.group_id, conv_group.group_name
-            )
-            raise RuntimeError(f"local group {db_group.group_name} does not match remote group {conv_group.group_name}")
-
-        return conv_group
-    
     def start_processing(self):
-        if self.client.enabled:
-            make_worker_thread(self._process_root, self.after_server_call, self.server_call_failed)
-            return
-
-        make_worker_thread(self._process_root, self.after_db_call, self.db_call_failed)
+        key = ("fetch_root", None, self.db.write_version)
+        read_flights.run(
+            key, self.db.groups.get_root_info, self.after_db_call, self.db_call_failed, TaskPriority.visible_prefetch
+        )
 
     @Slot(tuple)
     def after_server_call(self, data: GroupParentData):
@@ -467,6 +875,12 @@ class FetchRootGroupHelper(BaseHelper):
 
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
+        # Pushed out of a full queue, the tree still needs its root
+        if isinstance(exc, TaskDroppedError):
+            logger.warning("Root group fetch was dropped, fetching it again")
+            self.start_processing()
+            return
+
         logger.error("Error:", exc_info=exc)
 
     @Slot(Exception)
@@ -474,73 +888,261 @@ class FetchRootGroupHelper(BaseHelper):
         logger.error("Error:", exc_info=exc)
 
 
-class FetchGroupChildrenHelper(BaseHelper):
-    fetchRootChildrenComplete = Signal(list)
-    fetchGroupChildrenComplete = Signal(list)
+class FetchGroupTreeHelper(BaseHelper):
+    fetchTreeComplete = Signal(list)
 
     def __init__(self, parent):
         super().__init__(parent)
+        self._group: GroupParentData | None = None  # root of the last tree requested
 
-    def _process_groups(self, group: GroupParentData | None):
-        if self.client.enabled:
-            if group is None:
-                net_groups = self.client.groups.get_children_of_root()
-            else:
-                net_groups = self.client.groups.get_children_of_group(group.group_id)
-        else:
-            net_groups = None
-        
-        if group is None:
-            db_groups = self.db.groups.get_children_of_root()
-        else:
-            db_groups = self.db.groups.get_children_of_group(group.group_id)
-        
-        if net_groups is None:
-            logger.debug("Client disabled, returning groups found in database")
-            return db_groups
-
-        ta = TypeAdapter(list[GroupChildrenData])
-        conv_group = ta.validate_python(net_groups, from_attributes=True)
-
-        if db_groups != conv_group:
-            logger.error(
-                "Local group mismatch",
-            )
-            raise RuntimeError("mismatch")
+    def start_processing(self, group: GroupParentData):
+        self._group = group
 
-        return (conv_group, True if group is None else False)
-    
-    def process_threadless(self, group: GroupParentData | None):
-        return self._process_groups(group)
+        func = partial(self.db.groups.get_subtree, group.group_id)
+        key = ("fetch_tree", group.group_id, self.db.write_version)
+        read_flights.run(key, func, self.after_db_call, self.db_call_failed, TaskPriority.visible_prefetch)
 
-    def start_processing(self, group: GroupParentData | None):
-        func = partial(self._process_groups, group)
-        if self.client.enabled:
-            make_worker_thread(func, self.after_server_call, self.server_call_failed)
+    @Slot(list)
+    def after_server_call(self, groups: list[GroupParentData]):
+        self.fetchTreeComplete.emit(groups)
+
+    @Slot(list)
+    def after_db_call(self, groups: list[GroupParentData]):
+        self.fetchTreeComplete.emit(groups)
+
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        # Pushed out of a full queue, the tree is still waiting for it
+        if isinstance(exc, TaskDroppedError) and self._group is not None:
+            logger.warning("Tree fetch of group '%s' was dropped, fetching it again", self._group.group_name)
+            self.start_processing(self._group)
             return
 
-        make_worker_thread(func, self.after_db_call, self.db_call_failed)
+        logger.error("Error:", exc_info=exc)
 
-    @Slot(tuple)
-    def after_server_call(self, data: tuple[list, bool]):
-        groups, was_root = data
-        if was_root:
-            self.fetchRootChildrenComplete.emit(groups)
-        else:
-            self.fetchGroupChildrenComplete.emit(groups)
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        logger.error("Error:", exc_info=exc)
 
-    @Slot(tuple)
-    def after_db_call(self, data: tuple[list, bool]):
-        groups, was_root = data
-        if was_root:
-            self.fetchRootChildrenComplete.emit(groups)
-        else:
-            self.fetchGroupChildrenComplete.emit(groups)
+
+class PullChangesHelper(BaseHelper):
+    pullChangesComplete = Signal(SyncResult)
+    pullChangesFailed = Signal(Exception)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+    def start_processing(self):
+        if not self.client.enabled:
+            raise RuntimeError("Called PullChangesHelper with a disabled client")
+
+        engine = SyncEngine(self.db, self.client)
+        make_worker_thread(
+            engine.sync,
+            self.after_server_call,
+            self.server_call_failed,
+            priority=TaskPriority.background_sync,
+            droppable=False,
+        )
+
+        logger.info("Flushing outbox and pulling changes from server")
+
+    @Slot(SyncResult)
+    def after_server_call(self, result: SyncResult):
+        self.pullChangesComplete.emit(result)
+
+    @Slot(SyncResult)
+    def after_db_call(self, result: SyncResult):
+        self.pullChangesComplete.emit(result)
 
     @Slot(Exception)
     def db_call_failed(self, exc: Exception):
         logger.error("Error:", exc_info=exc)
+        self.pullChangesFailed.emit(exc)
 
     @Slot(Exception)
     def server_call_failed(self, exc: Exception):
         logger.error("Error:", exc_info=exc)
+        self.pullChangesFailed.emit(exc)
+
+
+class FlushOutboxHelper(BaseHelper):
+    flushOutboxComplete = Signal(int)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self._running: bool = False
+
+    def _process_outbox(self):
+        if not self.db.outbox.count():
+            return 0
+
+        flusher = OutboxFlusher(self.db, self.client)
+        return flusher.flush()
+
+    def start_processing(self):
+        if not self.client.enabled:
+            raise RuntimeError("Called FlushOutboxHelper with a disabled client")
+
+        if self._running:
+            logger.debug("Outbox flush already running, skipping")
+            return
+
+        self._running = True
+        make_worker_thread(
+            self._process_outbox,
+            self.after_server_call,
+            self.server_call_failed,
+            priority=TaskPriority.background_sync,
+            droppable=False,
+        )
+
+    @Slot(int)
+    def after_server_call(self, sent: int):
+        self._running = False
+        self.flushOutboxComplete.emit(sent)
+
+    @Slot(int)
+    def after_db_call(self, sent: int):
+        self._running = False
+        self.flushOutboxComplete.emit(sent)
+
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        self._running = False
+        logger.error("Error:", exc_info=exc)
+
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        self._running = False
+        if isinstance(exc, httpx.TransportError):
+            logger.info("Server unreachable, keeping outbox for the next flush")
+            return
+
+        logger.error("Error:", exc_info=exc)
+
+
+class ImportEntriesHelper(BaseHelper):
+    importProgress = Signal(int, int)  # (bytes read, file size)
+    importComplete = Signal(ImportResult)
+
+    importFailed = Signal(Exception)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        self._cancel_event: threading.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._cancel_event is not None
+
+    def start_processing(self, path: Path, group: GroupParentData, password: str | None = None):
+        if self.running:
+            raise RuntimeError("An import is already running")
+
+        # Emitted from the worker thread, Qt queues it to the connected slots
+        self._cancel_event = threading.Event()
+        importer = VaultImporter(
+            self.db, group.group_id, progress_callback=self.importProgress.emit, cancel_event=self._cancel_event
+        )
+
+        make_worker_thread(
+            partial(importer.import_file, path, password=password),
+            self.after_db_call,
+            self.db_call_failed,
+            priority=TaskPriority.maintenance,
+            droppable=False,
+        )
+        logger.info("Importing entries from '%s' into group '%s'", path.name, group.group_name)
+
+    def cancel(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    @Slot(ImportResult)
+    def after_server_call(self, result: ImportResult):
+        self._cancel_event = None
+        self.importComplete.emit(result)
+
+    @Slot(ImportResult)
+    def after_db_call(self, result: ImportResult):
+        self._cancel_event = None
+        self.importComplete.emit(result)
+
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        self._cancel_event = None
+
+        logger.error("Error:", exc_info=exc)
+        self.importFailed.emit(exc)
+
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        self._cancel_event = None
+
+        logger.error("Error:", exc_info=exc)
+        self.importFailed.emit(exc)
+
+
+class ExportEntriesHelper(BaseHelper):
+    exportProgress = Signal(int, int)  # (entries written, total entries)
+    exportComplete = Signal(ExportResult)
+
+    exportFailed = Signal(Exception)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        self._cancel_event: threading.Event | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._cancel_event is not None
+
+    def start_processing(self, path: Path, export_format: ExportFormat, password: str | None = None):
+        if self.running:
+            raise RuntimeError("An export is already running")
+
+        self._cancel_event = threading.Event()
+        func = partial(
+            self.db.export,
+            path,
+            export_format,
+            password=password,
+            progress_callback=self.exportProgress.emit,
+            cancel_event=self._cancel_event,
+        )
+
+        make_worker_thread(
+            func, self.after_db_call, self.db_call_failed, priority=TaskPriority.maintenance, droppable=False
+        )
+        logger.info("Exporting entries to '%s' as %s", path.name, export_format)
+
+    def cancel(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    @Slot(ExportResult)
+    def after_server_call(self, result: ExportResult):
+        self._cancel_event = None
+        self.exportComplete.emit(result)
+
+    @Slot(ExportResult)
+    def after_db_call(self, result: ExportResult):
+        self._cancel_event = None
+        self.exportComplete.emit(result)
+
+    @Slot(Exception)
+    def db_call_failed(self, exc: Exception):
+        self._cancel_event = None
+
+        logger.error("Error:", exc_info=exc)
+        self.exportFailed.emit(exc)
+
+    @Slot(Exception)
+    def server_call_failed(self, exc: Exception):
+        self._cancel_event = None
+
+        logger.error("Error:", exc_info=exc)
+        self.exportFailed.emit(exc)
@@ -1,15 +1,17 @@
 import logging
 import traceback
 import typing
+from functools import partial
 from pathlib import Path
 
 from PySide6.QtCore import QModelIndex, QObject, Qt, Signal, Slot
-from PySide6.QtWidgets import QFileDialog, QMessageBox
+from PySide6.QtWidgets import QFileDialog, QInputDialog, QLineEdit, QMessageBox
 
+from ...localdb.crypto import DecryptionError
 from ...localdb.database import MainDatabase
 from ...models.ui import RecentDatabasesListModel
 from ...version import __version__
-from ...workers import make_worker_thread
+from ...workers import TaskPriority, make_worker_thread
 
 if typing.TYPE_CHECKING:
     from ..apps import AppsController
@@ -33,6 +35,9 @@ class DatabasesTabController(QObject):
         self.ui.databasesNewDatabaseButton.clicked.connect(self.new_database_clicked)
         self.ui.databasesOpenDatabaseButton.clicked.connect(self.open_database_clicked)
 
+        self.ui.databasesChangePasswordButton.clicked.connect(self.change_password_clicked)
+        self.ui.databasesRotateKeyButton.clicked.connect(self.rotate_key_clicked)
+
         self.recent_databases_model = RecentDatabasesListModel(parent=self)
         self.ui.recentlyOpenedDatabasesListView.setModel(self.recent_databases_model)
 
@@ -114,15 +119,173 @@ class DatabasesTabController(QObject):
         )
         logger.error("Failed to load database due to exception:", exc_info=exc)
 
+    def _set_vault_buttons_enabled(self, enabled: bool):
+        self.ui.databasesChangePasswordButton.setEnabled(enabled)
+        self.ui.databasesRotateKeyButton.setEnabled(enabled)
+
     def _load_database(self, path: Path):
+        self._set_vault_buttons_enabled(False)
         self.maindb = MainDatabase()
-        make_worker_thread(lambda: self.maindb.setup(path), self.database_after_setup, self.worker_exc_received)
+        db_settings = self.app_parent.mw_parent.app_settings.database
+
+        make_worker_thread(
+            lambda: self.maindb.setup(path, db_settings), self.database_after_setup, self.worker_exc_received
+        )
 
         self.ui.statusbar.showMessage("Databases - Setting up database", timeout=5000)
 
     @Slot(None)
     def database_after_setup(self):
         logger.info("Loaded local database")
+        self._unlock_vault()
+
+    def _ask_new_master_password(
+        self,
+        title: str = "Set master password",
+        label: str = "This database is not encrypted yet. Choose a master password to encrypt it with:",
+    ) -> str | None:
+        password, ok = QInputDialog.getText(self.mw_parent, title, label, QLineEdit.EchoMode.Password)
+        if not ok or not password:
+            return None
+
+        confirm, ok = QInputDialog.getText(
+            self.mw_parent, title, "Enter the master password again:", QLineEdit.EchoMode.Password
+        )
+        if not ok:
+            return None
+
+        if confirm != password:
+            QMessageBox.warning(
+                self.mw_parent,
+                "PasswordManager - Client",
+                "The passwords do not match.",
+                buttons=QMessageBox.StandardButton.Ok,
+                defaultButton=QMessageBox.StandardButton.Ok,
+            )
+            return self._ask_new_master_password(title, label)
+
+        return password
+
+    def _unlock_vault(self):
+        vault = self.maindb.vault
+        if vault.initialized:
+            password, ok = QInputDialog.getText(
+                self.mw_parent, "Unlock database", "Master password:", QLineEdit.EchoMode.Password
+            )
+            password = password if ok and password else None
+
+            func = partial(vault.unlock, password)
+            message = "Databases - Unlocking database"
+        else:
+            password = self._ask_new_master_password()
+
+            func = partial(vault.create, password)
+            message = "Databases - Encrypting database"
 
+        if password is None:
+            self.maindb.close()
+            self.ui.statusbar.showMessage("Databases - Database was not unlocked", timeout=5000)
+
+            return
+
+        # The key derivation is deliberately slow, keep it off the UI thread
+        make_worker_thread(func, self.vault_unlocked, self.vault_unlock_failed)
+        self.ui.statusbar.showMessage(message, timeout=5000)
+
+    @Slot(None)
+    def vault_unlocked(self):
+        logger.info("Unlocked local database")
+
+        self._set_vault_buttons_enabled(True)
         self.databaseLoaded.emit(self.maindb)
         self.ui.statusbar.showMessage("Databases - Loaded local database", timeout=5000)
+
+    @Slot(Exception)
+    def vault_unlock_failed(self, exc: Exception):
+        if not isinstance(exc, DecryptionError):
+            self.maindb.close()
+            self.worker_exc_received(exc)
+
+            return
+
+        QMessageBox.warning(
+            self.mw_parent,
+            "PasswordManager - Client",
+            "The master password is incorrect.",
+            buttons=QMessageBox.StandardButton.Ok,
+            defaultButton=QMessageBox.StandardButton.Ok,
+        )
+        self._unlock_vault()
+
+    @Slot()
+    def change_password_clicked(self):
+        old_password, ok = QInputDialog.getText(
+            self.mw_parent, "Change master password", "Current master password:", QLineEdit.EchoMode.Password
+        )
+        if not ok or not old_password:
+            return
+
+        new_password = self._ask_new_master_password("Change master password", "New master password:")
+        if new_password is None:
+            return
+
+        # Must not be dropped, the vault is left as it was until the new password is written
+        func = partial(self.maindb.vault.change_password, old_password, new_password)
+        make_worker_thread(func, self.password_changed, self.vault_change_failed, droppable=False)
+
+        self._set_vault_buttons_enabled(False)
+        self.ui.statusbar.showMessage("Databases - Changing master password", timeout=5000)
+
+    @Slot()
+    def rotate_key_clicked(self):
+        btn = QMessageBox.question(
+            self.mw_parent,
+            "PasswordManager - Client",
+            "Re-encrypt every entry with a new key? This can take a while for large databases.",
+            buttons=QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            defaultButton=QMessageBox.StandardButton.No,
+        )
+        if btn != QMessageBox.StandardButton.Yes:
+            return
+
+        make_worker_thread(
+            self.maindb.vault.rotate_key,
+            self.key_rotated,
+            self.vault_change_failed,
+            priority=TaskPriority.maintenance,
+            droppable=False,
+        )
+
+        self._set_vault_buttons_enabled(False)
+        self.ui.statusbar.showMessage("Databases - Re-encrypting database", timeout=5000)
+
+    @Slot(None)
+    def password_changed(self):
+        self._set_vault_buttons_enabled(True)
+        self.ui.statusbar.showMessage("Databases - Changed master password", timeout=5000)
+
+    @Slot(None)
+    def key_rotated(self):
+        self._set_vault_buttons_enabled(True)
+        self.ui.statusbar.showMessage("Databases - Re-encrypted database with a new key", timeout=5000)
+
+    @Slot(Exception)
+    def vault_change_failed(self, exc: Exception):
+        self._set_vault_buttons_enabled(True)
+
+        if isinstance(exc, DecryptionError):
+            message = "The current master password is incorrect."
+        else:
+            tb: str = "".join(traceback.format_exception(exc, limit=1))
+            message = (
+                f"Unable to change the database encryption. Check the log file for more details. Traceback:\n\n{tb}"
+            )
+            logger.error("Failed to change the database encryption due to exception:", exc_info=exc)
+
+        QMessageBox.warning(
+            self.mw_parent,
+            "PasswordManager - Client",
+            message,
+            buttons=QMessageBox.StandardButton.Ok,
+            defaultButton=QMessageBox.StandardButton.Ok,
+        )
@@ -3,27 +3,41 @@ import traceback
 import typing
 import uuid
 from enum import StrEnum
-from functools import partial
+from pathlib import Path
 
 from pydantic import AnyUrl, TypeAdapter, ValidationError
-from PySide6.QtCore import QModelIndex, QObject, Qt, Signal, Slot
+from PySide6.QtCore import QModelIndex, QObject, Qt, QTimer, Signal, Slot
 from PySide6.QtGui import QAction, QIcon
-from PySide6.QtWidgets import QDialog, QDialogButtonBox, QHeaderView, QMenu, QMessageBox
+from PySide6.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QHeaderView,
+    QInputDialog,
+    QLineEdit,
+    QMenu,
+    QMessageBox,
+    QProgressDialog,
+)
 
 from ...localdb.database import MainDatabase
 from ...models.models import (
     AddPasswordGroup,
     EditedEntryWithID,
     EditedPasswordEntryInfo,
-    GroupChildrenData,
+    EntryCursor,
+    EntryRow,
+    ExportFormat,
+    ExportResult,
     GroupParentData,
+    ImportResult,
     PasswordEntryData,
+    SyncResult,
 )
 from ...models.ui import PasswordEntriesTableModel, PasswordGroupsTreeModel
 from ...serversync.client import SyncClient
 from ...ui.add_password_group_dialog import Ui_AddPasswordGroupDialog
 from ...ui.password_entry_info_dialog import Ui_PasswordEntryInfoDialog
-from ...workers import make_worker_thread
 from ..data_helpers import EntriesDataController, GroupsDataController
 
 if typing.TYPE_CHECKING:
@@ -114,6 +128,17 @@ class PasswordEntriesController(QObject):
         self.entry_info_dialog = PasswordEntryInfoDialog(self)
         self.data_ctrl: EntriesDataController = EntriesDataController(self)
 
+        # Wait for the user to stop typing before searching
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+
+        self.search_timer.setInterval(250)
+
+        # Groups the user may select next are read into memory once they stop interacting
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+
+        self.prefetch_timer.setInterval(500)
         self.setup()
 
     def setup(self):
@@ -135,7 +160,46 @@ class PasswordEntriesController(QObject):
         self.data_ctrl.delete_entry.deleteEntryComplete.connect(self.model_delete_password_entry)
 
         self.data_ctrl.update_entry.updateEntryComplete.connect(self.model_edit_password_entry)
+
+        # Writes are applied locally first, these report what the server made of them
+        self.data_ctrl.add_entry.addEntryConfirmed.connect(self.model_confirm_password_entry)
+        self.data_ctrl.add_entry.addEntryFailed.connect(self.model_rollback_add_entry)
+
+        self.data_ctrl.delete_entry.deleteEntryFailed.connect(self.model_rollback_delete_entry)
+        self.data_ctrl.update_entry.updateEntryConflicted.connect(self.model_conflicted_password_entry)
+
         self.data_ctrl.fetch_entries.fetchEntriesComplete.connect(self.model_reload_entries)
+        self.data_ctrl.fetch_entries.fetchMoreEntriesComplete.connect(self.model_append_entries)
+        self.data_ctrl.fetch_entries.fetchMoreEntriesFailed.connect(self.fetch_more_entries_failed)
+
+        # The view asks for the next page when it scrolls near the end
+        self.entries_model.moreEntriesRequested.connect(self.fetch_more_entries)
+
+        self.ui.passwordSearchLineEdit.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.search_entries)
+
+        self.data_ctrl.search_entries.searchEntriesComplete.connect(self.model_search_results)
+
+        self.data_ctrl.fetch_entry.fetchEntryComplete.connect(self.selected_entry_fetched)
+        self.data_ctrl.fetch_entry.fetchEntryForEditComplete.connect(self.edit_fetched_entry)
+
+        # Prefetching waits until the user has been idle for a moment, any interaction stops it
+        self.prefetch_timer.timeout.connect(self.prefetch_neighbours)
+
+        table = self.ui.passwordEntriesTableView
+        tree = self.ui.passwordGroupsTreeView
+
+        for sig in (
+            table.clicked,
+            table.customContextMenuRequested,
+            tree.clicked,
+            tree.expanded,
+            tree.collapsed,
+            tree.customContextMenuRequested,
+            self.ui.passwordSearchLineEdit.textChanged,
+            self.entries_model.moreEntriesRequested,
+        ):
+            sig.connect(lambda *args: self.user_interacted())
 
     @Slot()
     def context_menu_event(self, pos):
@@ -162,7 +226,7 @@ class PasswordEntriesController(QObject):
         if indexes:
             # Get only the first index, because the QTableView uses the SelectRows behavior
             index = indexes[0]
-            current_item: PasswordEntryData = self.entries_model.data(index, Qt.ItemDataRole.UserRole)
+            current_item: EntryRow = self.entries_model.data(index, Qt.ItemDataRole.UserRole)
 
             remove_entry_action.triggered.connect(lambda: self.delete_password_entry(current_item))
             edit_entry_action.triggered.connect(lambda: self.edit_password_entry(current_item))
@@ -174,30 +238,133 @@ class PasswordEntriesController(QObject):
 
         context.exec(self.ui.passwordEntriesTableView.mapToGlobal(pos))
 
+    def _selected_entry_id(self) -> uuid.UUID | None:
+        indexes = self.ui.passwordEntriesTableView.selectedIndexes()
+        if not indexes:
+            return None
+
+        row: EntryRow = indexes[0].data(Qt.ItemDataRole.UserRole)
+        return row.entry_id
+
     @Slot(QModelIndex)
     def tableview_clicked(self, index: QModelIndex):
-        data: PasswordEntryData = index.data(Qt.ItemDataRole.UserRole)
-        self.entryChanged.emit(data)
+        row: EntryRow = index.data(Qt.ItemDataRole.UserRole)
+        self.data_ctrl.fetch_entry.start_processing(row)
+
+    @Slot(PasswordEntryData)
+    def selected_entry_fetched(self, entry: PasswordEntryData):
+        # Another entry was selected while this one was loading
+        if self._selected_entry_id() != entry.entry_id:
+            return
+
+        self.entryChanged.emit(entry)
 
     @Slot(QModelIndex)
     def tableview_doubleclicked(self, index: QModelIndex):
-        data: PasswordEntryData = index.data(Qt.ItemDataRole.UserRole)
-        self.edit_password_entry(data)
+        row: EntryRow = index.data(Qt.ItemDataRole.UserRole)
+        self.edit_password_entry(row)
+
+    @Slot()
+    def user_interacted(self):
+        self.data_ctrl.fetch_entries.stop_prefetch()
+        self.prefetch_timer.start()
+
+    @Slot()
+    def prefetch_neighbours(self):
+        # Search results don't belong to a group
+        if not self.current_group or self.ui.passwordSearchLineEdit.text():
+            return
+
+        tree = self.ui.passwordGroupsTreeView
+        model: PasswordGroupsTreeModel = tree.model()
+
+        item = model.item_by_id(self.current_group.group_id)
+        if item is None:
+            return
+
+        # Children the user can see, then siblings from the nearest one out
+        groups: list[GroupParentData] = []
+        if tree.isExpanded(model.index_by_id(self.current_group.group_id)):
+            groups.extend(child.data() for child in item.child_items)
+
+        siblings = [sibling for sibling in item.parent().child_items if sibling is not item]
+        siblings.sort(key=lambda sibling: abs(sibling.row() - item.row()))
+
+        groups.extend(sibling.data() for sibling in siblings)
+
+        # Leave room in the cache for the groups already visited
+        fetch_entries = self.data_ctrl.fetch_entries
+        fetch_entries.prefetch(groups[: fetch_entries.cache_size // 2])
 
     @Slot(GroupParentData)
     def reload_entries(self, group: GroupParentData):
         self.current_group = group
-        self.data_ctrl.fetch_entries.start_processing(group)
+        self.user_interacted()
 
+        # Selecting a group leaves search mode without triggering another search
+        if self.ui.passwordSearchLineEdit.text():
+            self.ui.passwordSearchLineEdit.blockSignals(True)
+            self.ui.passwordSearchLineEdit.clear()
+
+            self.ui.passwordSearchLineEdit.blockSignals(False)
+            self.search_timer.stop()
+
+        # A page kept in memory is loaded right away, replacing this message
         self.ui.statusbar.showMessage(f"Passwords - Reloading entries for group '{group.group_name}'", timeout=5000)
 
-    @Slot(list)
-    def model_reload_entries(self, entries: list[PasswordEntryData]):
+        # Results of a search still running would replace this group's entries
+        self.data_ctrl.search_entries.supersede()
+        self.data_ctrl.fetch_entries.start_processing(group)
+
+    @Slot(list, bool)
+    def model_reload_entries(self, entries: list[EntryRow], has_more: bool):
         logger.info("Fetched %d entries", len(entries))
-        self.entries_model.load_entries(entries)
+        self.entries_model.load_entries(entries, has_more=has_more)
 
         self.ui.statusbar.showMessage("Passwords - Entries reloaded", timeout=5000)
 
+    @Slot(EntryCursor)
+    def fetch_more_entries(self, cursor: EntryCursor):
+        if not self.current_group:
+            return
+
+        self.data_ctrl.fetch_entries.start_processing(self.current_group, after=cursor)
+
+    @Slot(object, list, bool)
+    def model_append_entries(self, group_id: uuid.UUID, entries: list[EntryRow], has_more: bool):
+        # A page for a group that is no longer shown
+        if not self.current_group or self.current_group.group_id != group_id:
+            return
+
+        logger.debug("Fetched %d more entries", len(entries))
+        self.entries_model.append_entries(entries, has_more=has_more)
+
+    @Slot(Exception)
+    def fetch_more_entries_failed(self, exc: Exception):
+        # Scrolling to the end again retries
+        self.entries_model.fetch_more_failed()
+
+    @Slot()
+    def search_entries(self):
+        query = self.ui.passwordSearchLineEdit.text().strip()
+        if not query:
+            self.data_ctrl.search_entries.supersede()
+            if self.current_group:
+                self.data_ctrl.fetch_entries.start_processing(self.current_group)
+
+            return
+
+        self.data_ctrl.fetch_entries.supersede()
+        self.data_ctrl.search_entries.start_processing(query)
+        self.ui.statusbar.showMessage(f"Passwords - Searching for '{query}'", timeout=5000)
+
+    @Slot(list)
+    def model_search_results(self, entries: list[EntryRow]):
+        logger.info("Search returned %d entries", len(entries))
+        self.entries_model.load_entries(entries)
+
+        self.ui.statusbar.showMessage(f"Passwords - Found {len(entries)} entries", timeout=5000)
+
     @Slot()
     def add_password_entry(self):
         self.entry_info_dialog.reset_data(self.current_group, emit_as=EmitDialogInfoAs.add)
@@ -210,7 +377,7 @@ class PasswordEntriesController(QObject):
 
         self.entries_model.add_entry(entry)
 
-    def delete_password_entry(self, item: PasswordEntryData):
+    def delete_password_entry(self, item: EntryRow):
         btn = QMessageBox.information(
             self.mw_parent,
             "PasswordManager - Client",
@@ -233,9 +400,13 @@ class PasswordEntriesController(QObject):
 
         self.ui.statusbar.showMessage("Passwords - Entry deleted")
 
-    def edit_password_entry(self, item: PasswordEntryData):
+    def edit_password_entry(self, item: EntryRow):
+        self.data_ctrl.fetch_entry.start_processing(item, for_edit=True)
+
+    @Slot(PasswordEntryData)
+    def edit_fetched_entry(self, entry: PasswordEntryData):
         self.entry_info_dialog.reset_data(self.current_group, emit_as=EmitDialogInfoAs.edit)
-        self.entry_info_dialog.set_existing_data(item)
+        self.entry_info_dialog.set_existing_data(self.db.vault.reveal_entry(entry))
 
         self.entry_info_dialog.show()
 
@@ -252,12 +423,35 @@ class PasswordEntriesController(QObject):
             return
 
         index = indexes[0]
-        if index.data(Qt.ItemDataRole.UserRole) == entry:
+        if index.data(Qt.ItemDataRole.UserRole).entry_id == entry.entry_id:
             logger.debug("Entry changed is the currently selected entry, updating")
             self.entryChanged.emit(entry)
 
         return
 
+    @Slot(object, PasswordEntryData)
+    def model_confirm_password_entry(self, local_id: uuid.UUID, entry: PasswordEntryData):
+        self.entries_model.replace_entry_id(local_id, entry)
+
+    @Slot(PasswordEntryData)
+    def model_rollback_add_entry(self, entry: PasswordEntryData):
+        self.entries_model.delete_entry(entry)
+        self.ui.statusbar.showMessage(f"Passwords - Server rejected entry '{entry.title}', removed it", timeout=5000)
+
+    @Slot(PasswordEntryData)
+    def model_rollback_delete_entry(self, entry: PasswordEntryData):
+        if self.current_group and self.current_group.group_id == entry.group_id:
+            self.entries_model.add_entry(entry)
+
+        self.ui.statusbar.showMessage(
+            f"Passwords - Server rejected deleting '{entry.title}', restored it", timeout=5000
+        )
+
+    @Slot(PasswordEntryData)
+    def model_conflicted_password_entry(self, entry: PasswordEntryData):
+        self.entries_model.mark_conflicted(entry)
+        self.ui.statusbar.showMessage(f"Passwords - Server rejected changes to '{entry.title}'", timeout=5000)
+
 
 # TODO: Ensure when setting up sync for the first time, root group always matches the server
 class PasswordGroupsItemController(QObject):
@@ -275,7 +469,6 @@ class PasswordGroupsItemController(QObject):
         self.client: SyncClient = client
 
         self.worker_exc_received = pw_parent.worker_exc_received
-        self._loaded_ids: set[uuid.UUID] = set()
 
         # Controllers here
         self.groups_model = PasswordGroupsTreeModel(parent=self)
@@ -285,6 +478,12 @@ class PasswordGroupsItemController(QObject):
         self.current_group: GroupParentData = None
 
         self.data_ctrl: GroupsDataController = GroupsDataController(self)
+
+        # Resizing measures every visible row, so do it once after a burst of model changes
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+
+        self.resize_timer.setInterval(50)
         self.setup()
 
     def setup(self):
@@ -305,72 +504,131 @@ class PasswordGroupsItemController(QObject):
         # Auto show the horizontal scrollbar when updating the model
         tree = self.ui.passwordGroupsTreeView
 
-        tree.expanded.connect(lambda idx: tree.resizeColumnToContents(idx.column()))
-        tree.collapsed.connect(lambda idx: tree.resizeColumnToContents(idx.column()))
+        self.resize_timer.timeout.connect(lambda: tree.resizeColumnToContents(0))
 
         m = tree.model()
-        for sig in (m.rowsInserted, m.rowsRemoved, m.modelReset, m.dataChanged):
-            sig.connect(lambda *args: tree.resizeColumnToContents(0))
+        for sig in (tree.expanded, tree.collapsed, m.rowsInserted, m.rowsRemoved, m.modelReset, m.dataChanged):
+            sig.connect(lambda *args: self.resize_timer.start())
 
         self.ui.passwordGroupsTreeView.expandAll()
         self.ui.passwordGroupsTreeView.resizeColumnToContents(0)
 
-        self.ui.passwordGroupsTreeView.expanded.connect(self.treeview_item_expanded)
-
         self.add_group_dialog.dataComplete.connect(self.data_ctrl.add_group.start_processing)
         self.data_ctrl.add_group.addGroupComplete.connect(self.add_password_group_complete)
 
         self.data_ctrl.delete_group.deleteGroupComplete.connect(self.delete_complete)
         self.data_ctrl.fetch_root.fetchRootComplete.connect(self.after_get_root_group)
 
-        self.data_ctrl.fetch_children.fetchRootChildrenComplete.connect(self.after_get_root_children)
-        self.data_ctrl.fetch_root.start_processing()
+        self.data_ctrl.fetch_tree.fetchTreeComplete.connect(self.after_get_tree)
+
+        self.data_ctrl.pull_changes.pullChangesComplete.connect(self.after_pull_changes)
+        self.data_ctrl.pull_changes.pullChangesFailed.connect(self.pull_changes_failed)
+
+        # Periodically replay changes made while the server was unreachable
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(30_000)
+
+        self.flush_timer.timeout.connect(self.data_ctrl.flush_outbox.start_processing)
+        self.data_ctrl.flush_outbox.flushOutboxComplete.connect(self.after_flush_outbox)
+
+        # Shared by imports and exports, only one of them runs at a time
+        self.progress_dialog: QProgressDialog | None = None
+
+        self.data_ctrl.import_entries.importProgress.connect(self.update_progress)
+        self.data_ctrl.import_entries.importComplete.connect(self.import_entries_complete)
+
+        self.data_ctrl.import_entries.importFailed.connect(self.import_entries_failed)
+
+        self.data_ctrl.export_entries.exportProgress.connect(self.update_progress)
+        self.data_ctrl.export_entries.exportComplete.connect(self.export_entries_complete)
+
+        self.data_ctrl.export_entries.exportFailed.connect(self.export_entries_failed)
+
+        # Bring the local database up to date first, every read after that is served locally
+        if self.client.enabled:
+            self.data_ctrl.pull_changes.start_processing()
+            self.ui.statusbar.showMessage("Passwords - Syncing with server", timeout=5000)
+
+            self.flush_timer.start()
 
+            return
+
+        self.data_ctrl.fetch_root.start_processing()
         self.ui.statusbar.showMessage("Passwords - Loading top-level and child groups", timeout=5000)
 
+    @Slot(SyncResult)
+    def after_pull_changes(self, result: SyncResult):
+        logger.info("Pulled changes from server, loading groups")
+        self.data_ctrl.fetch_root.start_processing()
+
+        self.ui.statusbar.showMessage(
+            f"Passwords - Synced {result.groups_changed} groups and {result.entries_changed} entries", timeout=5000
+        )
+
+    @Slot(int)
+    def after_flush_outbox(self, sent: int):
+        if not sent:
+            return
+
+        # Objects created offline were re-keyed to the server's IDs, so the loaded models are stale
+        logger.info("Sent %d offline changes to server, reloading groups", sent)
+        self.data_ctrl.fetch_root.start_processing()
+
+        self.ui.statusbar.showMessage(f"Passwords - Sent {sent} offline changes to server", timeout=5000)
+
+    @Slot(Exception)
+    def pull_changes_failed(self, exc: Exception):
+        logger.warning("Could not pull changes from server, loading local groups")
+        self.data_ctrl.fetch_root.start_processing()
+
+        self.ui.statusbar.showMessage("Passwords - Sync failed, showing local data", timeout=5000)
+
     @Slot()
     def after_get_root_group(self, root_group: GroupParentData):
         self.root_group = root_group
-        self.groups_model.add_root_group(root_group)
 
-        logger.info("Loaded root group, loading children")
-        self.data_ctrl.fetch_children.start_processing(None)
+        logger.info("Loaded root group, loading group tree")
+        self.data_ctrl.fetch_tree.start_processing(root_group)
 
-    @Slot()
-    def after_get_root_children(self, groups: list[GroupChildrenData]):
-        for group in groups:
-            self._loaded_ids.add(group.group_id)
-            self.groups_model.add_group(group)
-        
-            func = partial(self.data_ctrl.fetch_children.process_threadless, group)
-            make_worker_thread(func, self.load_groups, self.worker_exc_received)
-
-            logger.debug("Loaded child of root '%s'", group.group_name)
-            
-        self.current_group = self.root_group
-        self.groupChanged.emit(self.root_group)
-
-        logger.info("Loaded root children")
-        self.ui.statusbar.showMessage("Passwords - Loaded top-level and child groups", timeout=5000)
+    def _expanded_group_ids(self) -> list[uuid.UUID]:
+        tree = self.ui.passwordGroupsTreeView
+        expanded: list[uuid.UUID] = []
 
-    @Slot()
-    def load_groups(self, data: tuple[list[GroupChildrenData], bool]):
-        groups, _ = data
-        for group in groups:
-            self.groups_model.add_group(group)
+        pending = [QModelIndex()]
+        while pending:
+            parent = pending.pop()
+            for row in range(self.groups_model.rowCount(parent)):
+                index = self.groups_model.index(row, 0, parent)
+                if tree.isExpanded(index):
+                    expanded.append(index.data(Qt.ItemDataRole.UserRole).group_id)
+                    pending.append(index)
 
-            func = partial(self.data_ctrl.fetch_children.process_threadless, group)
-            make_worker_thread(func, self.load_groups_without_recursion, self.worker_exc_received)
-            
-            logger.debug("Added group '%s'", group.group_name)
+        return expanded
 
     @Slot()
-    def load_groups_without_recursion(self, data: tuple[list[GroupChildrenData], bool]):
-        groups, _ = data
-        for group in groups:
-            self.groups_model.add_group(group)
-            logger.debug("Added group '%s'", group.group_name)
-    
+    def after_get_tree(self, groups: list[GroupParentData]):
+        # Syncs, outbox flushes and imports reload the tree, keep the user's place in it
+        expanded = self._expanded_group_ids()
+        selected_id = self.current_group.group_id if self.current_group is not None else None
+
+        self.groups_model.load_tree(groups)
+
+        tree = self.ui.passwordGroupsTreeView
+        tree.expand(self.groups_model.index(0, 0, QModelIndex()))
+
+        for group_id in expanded:
+            tree.expand(self.groups_model.index_by_id(group_id))
+
+        # The selected group may have been deleted, or re-keyed to the server's ID by a flush
+        item = self.groups_model.item_by_id(selected_id) if selected_id is not None else None
+        self.current_group = item.data() if item is not None else self.root_group
+
+        tree.setCurrentIndex(self.groups_model.index_by_id(self.current_group.group_id))
+        self.groupChanged.emit(self.current_group)
+
+        logger.info("Loaded group tree with %d groups", len(groups))
+        self.ui.statusbar.showMessage("Passwords - Loaded top-level and child groups", timeout=5000)
+
     @Slot()
     def treeview_clicked(self, index: QModelIndex):
         data: GroupParentData = index.data(Qt.ItemDataRole.UserRole)
@@ -378,21 +636,6 @@ class PasswordGroupsItemController(QObject):
 
         self.groupChanged.emit(data)
 
-    @Slot()
-    def treeview_item_expanded(self, index: QModelIndex):
-        data: GroupChildrenData = index.data(Qt.ItemDataRole.UserRole)
-        if data == self.root_group:
-            logger.debug("Not reloading root group")
-            return
-        
-        if data.group_id in self._loaded_ids:
-            logger.debug("Children of group '%s' already loaded, skipping", data.group_name)
-            return
-        
-        self._loaded_ids.add(data.group_id)
-        func = partial(self.data_ctrl.fetch_children.process_threadless, data)
-        make_worker_thread(func, self.load_groups, self.worker_exc_received)
-    
     @Slot()
     def context_menu_event(self, pos):
         context = QMenu(self.mw_parent)
@@ -401,14 +644,22 @@ class PasswordGroupsItemController(QObject):
         list_add_icon = QIcon(QIcon.fromTheme(QIcon.ThemeIcon.ListAdd))
         list_remove_icon = QIcon(QIcon.fromTheme(QIcon.ThemeIcon.ListRemove))
 
+        document_open_icon = QIcon(QIcon.fromTheme(QIcon.ThemeIcon.DocumentOpen))
+        document_save_as_icon = QIcon(QIcon.fromTheme(QIcon.ThemeIcon.DocumentSaveAs))
+
         # Actions
         add_group_action = QAction("Add group", self, icon=list_add_icon)
         remove_group_action = QAction("Remove group", self, icon=list_remove_icon)
 
+        import_entries_action = QAction("Import entries...", self, icon=document_open_icon)
+        export_entries_action = QAction("Export all entries...", self, icon=document_save_as_icon)
+
         # Triggers
         add_group_action.triggered.connect(self.add_password_group)
         context.addAction(add_group_action)
 
+        export_entries_action.triggered.connect(self.export_entries)
+
         # Item-dependent triggers
         indexes = self.ui.passwordGroupsTreeView.selectedIndexes()
         if indexes:
@@ -416,11 +667,21 @@ class PasswordGroupsItemController(QObject):
             current_item: PasswordEntryData = self.groups_model.data(index, Qt.ItemDataRole.UserRole)
 
             remove_group_action.triggered.connect(lambda: self.delete_password_group(current_item))
+            import_entries_action.triggered.connect(lambda: self.import_entries(current_item))
 
         # Item-dependent actions
         if indexes:
             context.addAction(remove_group_action)
 
+            context.addSeparator()
+            context.addAction(import_entries_action)
+
+        context.addAction(export_entries_action)
+
+        transfer_running = self.data_ctrl.import_entries.running or self.data_ctrl.export_entries.running
+        import_entries_action.setEnabled(not transfer_running)
+        export_entries_action.setEnabled(not transfer_running)
+
         context.exec(self.ui.passwordGroupsTreeView.mapToGlobal(pos))
 
     @Slot()
@@ -460,6 +721,172 @@ class PasswordGroupsItemController(QObject):
         self.groups_model.remove_group(data)
         self.ui.passwordGroupsTreeView.clearSelection()
 
+    def import_entries(self, group: GroupParentData):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self.mw_parent,
+            "Import entries",
+            "",
+            "Password exports (*.csv *.json *.jsonl *.xml *.pmbackup);;CSV (*.csv);;JSON (*.json *.jsonl);;"
+            "KeePass 2 XML (*.xml);;Encrypted backup (*.pmbackup)",
+        )
+        if not file_name:
+            return
+
+        path = Path(file_name)
+        password = None
+
+        if path.suffix.lower() == ".pmbackup":
+            password, ok = QInputDialog.getText(
+                self.mw_parent, "Import entries", "Password of the backup:", QLineEdit.EchoMode.Password
+            )
+            if not ok or not password:
+                return
+
+        self._show_progress_dialog(
+            f"Importing entries into '{group.group_name}'...", self.data_ctrl.import_entries.cancel
+        )
+
+        self.data_ctrl.import_entries.start_processing(path, group, password)
+        self.ui.statusbar.showMessage(f"Passwords - Importing entries into '{group.group_name}'", timeout=5000)
+
+    def _ask_export_password(self) -> str | None:
+        password, ok = QInputDialog.getText(
+            self.mw_parent, "Export entries", "Password to encrypt the backup with:", QLineEdit.EchoMode.Password
+        )
+        if not ok or not password:
+            return None
+
+        confirm, ok = QInputDialog.getText(
+            self.mw_parent, "Export entries", "Enter the password again:", QLineEdit.EchoMode.Password
+        )
+        if not ok:
+            return None
+
+        if confirm != password:
+            QMessageBox.warning(
+                self.mw_parent,
+                "PasswordManager - Client",
+                "The passwords do not match.",
+                buttons=QMessageBox.StandardButton.Ok,
+                defaultButton=QMessageBox.StandardButton.Ok,
+            )
+            return None
+
+        return password
+
+    @Slot()
+    def export_entries(self):
+        filters = {
+            "Encrypted backup (*.pmbackup)": ExportFormat.encrypted,
+            "CSV (*.csv)": ExportFormat.csv,
+            "JSON lines (*.jsonl)": ExportFormat.jsonl,
+        }
+        file_name, selected_filter = QFileDialog.getSaveFileName(
+            self.mw_parent, "Export entries", "passwords.pmbackup", ";;".join(filters)
+        )
+        if not file_name:
+            return
+
+        export_format = filters.get(selected_filter, ExportFormat.encrypted)
+        password = None
+
+        if export_format == ExportFormat.encrypted:
+            password = self._ask_export_password()
+            if password is None:
+                return
+        else:
+            btn = QMessageBox.warning(
+                self.mw_parent,
+                "PasswordManager - Client",
+                "This export is not encrypted, anyone who can read the file can read your passwords. Continue?",
+                buttons=QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                defaultButton=QMessageBox.StandardButton.No,
+            )
+            if btn == QMessageBox.StandardButton.No:
+                return
+
+        self._show_progress_dialog("Exporting entries...", self.data_ctrl.export_entries.cancel)
+
+        self.data_ctrl.export_entries.start_processing(Path(file_name), export_format, password)
+        self.ui.statusbar.showMessage("Passwords - Exporting entries", timeout=5000)
+
+    def _show_progress_dialog(self, label: str, cancel_slot):
+        dialog = QProgressDialog(label, "Cancel", 0, 100, self.mw_parent)
+        dialog.setWindowTitle("PasswordManager - Client")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+
+        dialog.canceled.connect(cancel_slot)
+        self.progress_dialog = dialog
+
+    @Slot(int, int)
+    def update_progress(self, done: int, total: int):
+        if self.progress_dialog is None or not total:
+            return
+
+        self.progress_dialog.setValue(min(100, done * 100 // total))
+
+    def _close_progress_dialog(self):
+        if self.progress_dialog is None:
+            return
+
+        self.progress_dialog.canceled.disconnect()
+        self.progress_dialog.close()
+
+        self.progress_dialog.deleteLater()
+        self.progress_dialog = None
+
+    @Slot(ImportResult)
+    def import_entries_complete(self, result: ImportResult):
+        self._close_progress_dialog()
+
+        # New groups may be anywhere in the tree, reload it like after a sync
+        self.data_ctrl.fetch_root.start_processing()
+
+        message = f"Passwords - Imported {result.entries_imported} entries and {result.groups_created} groups"
+        if result.cancelled:
+            message += ", cancelled"
+
+        self.ui.statusbar.showMessage(message, timeout=5000)
+
+    @Slot(Exception)
+    def import_entries_failed(self, exc: Exception):
+        self._close_progress_dialog()
+        self.data_ctrl.fetch_root.start_processing()
+
+        QMessageBox.warning(
+            self.mw_parent,
+            "PasswordManager - Client",
+            f"Could not import entries: {exc}",
+            buttons=QMessageBox.StandardButton.Ok,
+            defaultButton=QMessageBox.StandardButton.Ok,
+        )
+
+    @Slot(ExportResult)
+    def export_entries_complete(self, result: ExportResult):
+        self._close_progress_dialog()
+
+        if result.cancelled:
+            self.ui.statusbar.showMessage("Passwords - Export cancelled", timeout=5000)
+            return
+
+        self.ui.statusbar.showMessage(f"Passwords - Exported {result.entries_exported} entries", timeout=5000)
+
+    @Slot(Exception)
+    def export_entries_failed(self, exc: Exception):
+        self._close_progress_dialog()
+
+        QMessageBox.warning(
+            self.mw_parent,
+            "PasswordManager - Client",
+            f"Could not export entries: {exc}",
+            buttons=QMessageBox.StandardButton.Ok,
+            defaultButton=QMessageBox.StandardButton.Ok,
+        )
+
 
 class PasswordEntryInfoController(QObject):
     def __init__(self, pw_parent: PasswordsTabController):
@@ -484,7 +911,8 @@ class PasswordEntryInfoController(QObject):
         self.ui.entryUsernameDataLabel.setText(entry.username)
         self.ui.entryPasswordDataLabel.setText("*****")
 
-        self.ui.entryNotesPlainTextEdit.setPlainText(entry.notes)
+        # Only the notes are decrypted here, the password waits until it is shown
+        self.ui.entryNotesPlainTextEdit.setPlainText(self.pw_parent.db.vault.reveal(entry.notes, "notes"))
         self.ui.entryURLDataLabel.setText(str(entry.url) if entry.url else "")
 
     @Slot()
@@ -494,7 +922,7 @@ class PasswordEntryInfoController(QObject):
 
         if self._hidden:
             self._hidden = False
-            self.ui.entryPasswordDataLabel.setText(self._entry.password)
+            self.ui.entryPasswordDataLabel.setText(self.pw_parent.db.vault.reveal(self._entry.password, "password"))
         else:
             self._hidden = True
             self.ui.entryPasswordDataLabel.setText("*****")
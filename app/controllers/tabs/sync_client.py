@@ -59,7 +59,7 @@ class SyncClientLoader(QObject):
             sync_enabled=data.sync_enabled,
         )
 
-        self.sync_client = SyncClient(enabled=True)
+        self.sync_client = SyncClient(enabled=True, settings=self.mw_parent.app_settings.http)
 
         func = partial(self.sync_client.setup, saved_sync_info)
         make_worker_thread(func, self.sync_client_after_setup, self.worker_exc_received)
@@ -0,0 +1,9 @@
+"""Streaming importers for exports of other password managers."""
+
+from .importer import DEFAULT_BATCH_SIZE, VaultImporter, detect_format
+
+__all__ = (
+    "DEFAULT_BATCH_SIZE",
+    "VaultImporter",
+    "detect_format",
+)
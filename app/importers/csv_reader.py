@@ -0,0 +1,24 @@
+"""Streams entries out of CSV exports, one row at a time."""
+
+import csv
+import io
+import typing
+from collections.abc import Iterator
+
+from ..models.models import ImportedEntry
+from .records import record_to_entry
+
+
+def read_csv(file: typing.BinaryIO) -> Iterator[ImportedEntry]:
+    """Reads a CSV export with a header row, the header decides which column maps to which field."""
+
+    # utf-8-sig skips the byte order mark spreadsheet programs like to add
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            entry = record_to_entry(row)
+            if entry is not None:
+                yield entry
+    finally:
+        # Leave the binary file to the caller
+        text.detach()
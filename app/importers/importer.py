@@ -0,0 +1,224 @@
+"""Imports entries exported from other password managers into the local database."""
+
+import logging
+import threading
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import closing
+from datetime import UTC, datetime
+from pathlib import Path
+
+from pydantic import AnyUrl, TypeAdapter, ValidationError
+
+from ..localdb.crypto import EncryptedArchiveReader
+from ..localdb.database import MainDatabase
+from ..models.models import (
+    GroupParentData,
+    ImportedEntry,
+    ImportFormat,
+    ImportResult,
+    OutboxOperation,
+    OutboxOperationType,
+    PasswordEntryData,
+)
+from .csv_reader import read_csv
+from .json_reader import read_json
+from .keepass import read_keepass_xml
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+DEFAULT_BATCH_SIZE: int = 1000
+
+READERS = {
+    ImportFormat.csv: read_csv,
+    ImportFormat.json: read_json,
+    ImportFormat.keepass_xml: read_keepass_xml,
+}
+
+_FORMAT_SUFFIXES: dict[str, ImportFormat] = {
+    ".csv": ImportFormat.csv,
+    ".json": ImportFormat.json,
+    ".jsonl": ImportFormat.json,
+    ".xml": ImportFormat.keepass_xml,
+    ".pmbackup": ImportFormat.encrypted,
+}
+
+url_adapter = TypeAdapter(AnyUrl)
+
+
+def detect_format(path: Path) -> ImportFormat:
+    try:
+        return _FORMAT_SUFFIXES[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"unsupported import file type '{path.suffix}'") from None
+
+
+class VaultImporter:
+    """Streams an export into a group of the local database.
+
+    Entries are parsed one at a time and written in batches of `batch_size`, each batch in its own
+    transaction, so memory stays bounded no matter how large the export is. Missing groups are created
+    as they are first seen. Everything imported is also recorded in the outbox, so the next flush
+    sends it to the server.
+
+    Cancelling stops at the next entry, batches that were already written are kept.
+    """
+
+    def __init__(
+        self,
+        db: MainDatabase,
+        target_group_id: uuid.UUID,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress_callback: Callable[[int, int], None] | None = None,
+        cancel_event: threading.Event | None = None,
+    ):
+        self.db = db
+        self.target_group_id = target_group_id
+
+        self.batch_size = batch_size
+        self.progress_callback = progress_callback
+
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+
+        # (parent ID, group name) -> group ID
+        self._group_ids: dict[tuple[uuid.UUID, str], uuid.UUID] = {}
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def _load_groups(self) -> None:
+        for group in self.db.groups.get_subtree(self.target_group_id):
+            if group.group_id != self.target_group_id:
+                self._group_ids.setdefault((group.parent_id, group.group_name), group.group_id)
+
+    def _resolve_group(self, group_path: list[str], result: ImportResult) -> uuid.UUID:
+        group_id = self.target_group_id
+        for name in group_path:
+            key = (group_id, name)
+            child_id = self._group_ids.get(key)
+
+            if child_id is None:
+                group = self.db.defer(self._create_group, name, group_id).result()
+
+                child_id = self._group_ids[key] = group.group_id
+                result.groups_created += 1
+
+            group_id = child_id
+
+        return group_id
+
+    def _to_entry(self, imported: ImportedEntry, group_id: uuid.UUID, created_at: datetime) -> PasswordEntryData:
+        notes = imported.notes
+        url = None
+
+        if imported.url:
+            try:
+                url = url_adapter.validate_python(imported.url)
+            except ValidationError:
+                # Keep whatever the other manager stored, even if it isn't a valid URL
+                notes = "\n".join(filter(None, [notes, f"URL: {imported.url}"]))
+
+        return PasswordEntryData(
+            title=imported.title,
+            username=imported.username,
+            password=imported.password,
+            url=url,
+            notes=notes,
+            entry_id=uuid.uuid4(),
+            group_id=group_id,
+            created_at=created_at,
+        )
+
+    def _create_group(self, name: str, parent_id: uuid.UUID) -> GroupParentData:
+        group = self.db.groups.create_group(name, parent_id=parent_id)
+        self.db.outbox.record(OutboxOperationType.create_group, group.group_id, parent_id, {"group_name": name})
+
+        return group
+
+    def _write_batch(self, batch: list[PasswordEntryData]) -> None:
+        # One transaction, so a batch is never saved without being queued for the server
+        self.db.defer(self._write_rows, batch).result()
+
+    def _write_rows(self, batch: list[PasswordEntryData]) -> None:
+        self.db.entries.bulk_upsert(batch)
+        self.db.outbox.record_many(
+            [
+                OutboxOperation(
+                    operation=OutboxOperationType.create_entry,
+                    object_id=entry.entry_id,
+                    parent_id=entry.group_id,
+                    payload=entry.model_dump(mode="json", include={"title", "username", "password", "url", "notes"}),
+                )
+                for entry in batch
+            ]
+        )
+
+    def import_entries(
+        self, entries: Iterator[ImportedEntry], position: Callable[[], int] | None = None, total: int = 0
+    ) -> ImportResult:
+        """Writes entries from any iterator.
+
+        `position` returns how far into the source the reader is, out of `total`, and is passed to the
+        progress callback after every batch. Without it the number of imported entries is reported.
+        """
+        result = ImportResult()
+        self._load_groups()
+
+        created_at = datetime.now(UTC)
+        batch: list[PasswordEntryData] = []
+
+        def report_progress():
+            if self.progress_callback is not None:
+                done = position() if position is not None else result.entries_imported
+                self.progress_callback(done, total)
+
+        for imported in entries:
+            if self.cancel_event.is_set():
+                result.cancelled = True
+                break
+
+            group_id = self._resolve_group(imported.group_path, result)
+            batch.append(self._to_entry(imported, group_id, created_at))
+
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                result.entries_imported += len(batch)
+
+                batch = []
+                report_progress()
+
+        if batch and not result.cancelled:
+            self._write_batch(batch)
+            result.entries_imported += len(batch)
+
+        report_progress()
+        return result
+
+    def import_file(
+        self, path: Path, import_format: ImportFormat | None = None, password: str | None = None
+    ) -> ImportResult:
+        """Imports an export file, `password` decrypts a backup made by the encrypted export."""
+
+        import_format = import_format if import_format is not None else detect_format(path)
+
+        with path.open("rb") as file:
+            if import_format == ImportFormat.encrypted:
+                if password is None:
+                    raise ValueError("a password is needed to import an encrypted backup")
+
+                # Progress follows the encrypted file, the plaintext size isn't known up front
+                source, reader = EncryptedArchiveReader(file, password), read_json
+            else:
+                source, reader = file, READERS[import_format]
+
+            with closing(reader(source)) as entries:
+                result = self.import_entries(entries, file.tell, path.stat().st_size)
+
+        logger.info(
+            "Imported %d entries and %d groups from '%s'%s",
+            result.entries_imported,
+            result.groups_created,
+            path.name,
+            " before being cancelled" if result.cancelled else "",
+        )
+        return result
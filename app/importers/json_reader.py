@@ -0,0 +1,88 @@
+"""Streams entries out of JSON exports without loading the whole document."""
+
+import codecs
+import json
+import typing
+from collections.abc import Iterator
+
+from ..models.models import ImportedEntry
+from .records import record_to_entry
+
+READ_SIZE: int = 64 * 1024  # 64 KiB
+MAX_OBJECT_SIZE: int = 16 * 1024 * 1024  # 16 MiB, keeps a malformed file from being read whole
+_WHITESPACE: str = " \t\r\n"
+
+
+def _iter_objects(file: typing.BinaryIO) -> Iterator[dict]:
+    """Decodes one top-level value at a time out of a JSON array or a JSON lines file.
+
+    Only the current object and the unread part of the last chunk are kept in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder("utf-8-sig")()
+
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array: bool | None = None
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+
+        chunk = file.read(READ_SIZE)
+        eof = not chunk
+
+        buffer = buffer[pos:] + reader.decode(chunk, final=eof)
+        pos = 0
+
+        return not eof
+
+    while True:
+        # Skip whitespace and the separators of the array
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+
+            if pos < len(buffer) or not fill():
+                break
+
+        if pos >= len(buffer):
+            if in_array:
+                raise ValueError("unexpected end of file, the JSON array was not closed")
+            return
+
+        char = buffer[pos]
+        if in_array is None:
+            in_array = char == "["
+            if in_array:
+                pos += 1
+                continue
+        elif in_array and char == ",":
+            pos += 1
+            continue
+        elif in_array and char == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely an object split across chunks, read more and try again
+            if len(buffer) - pos > MAX_OBJECT_SIZE or not fill():
+                raise
+
+            continue
+
+        pos = end
+        if not isinstance(value, dict):
+            raise ValueError(f"expected a JSON object, got {type(value).__name__}")
+
+        yield value
+
+
+def read_json(file: typing.BinaryIO) -> Iterator[ImportedEntry]:
+    """Reads a JSON array of entry objects, or a JSON lines file with one entry object per line."""
+
+    for record in _iter_objects(file):
+        entry = record_to_entry(record)
+        if entry is not None:
+            yield entry
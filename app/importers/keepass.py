@@ -0,0 +1,109 @@
+"""Streams entries out of KeePass 2 XML exports."""
+
+import typing
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+
+from ..models.models import ImportedEntry
+
+# KeePass string keys -> entry fields, any other string is appended to the notes
+STRING_FIELDS: dict[str, str] = {
+    "Title": "title",
+    "UserName": "username",
+    "Password": "password",
+    "URL": "url",
+    "Notes": "notes",
+}
+
+
+def _read_entry(elem: ET.Element, group_path: list[str]) -> ImportedEntry | None:
+    fields: dict[str, str] = {}
+    extra: list[str] = []
+
+    for string in elem.iterfind("String"):
+        key = string.findtext("Key", "")
+        value_elem = string.find("Value")
+
+        if value_elem is None:
+            continue
+
+        # Only a .kdbx has the key of the inner stream, exports made with File > Export are never protected
+        if value_elem.get("Protected", "False").lower() == "true":
+            raise ValueError("protected values are not supported, export the database to KeePass XML first")
+
+        value = value_elem.text or ""
+        if key in STRING_FIELDS:
+            fields[STRING_FIELDS[key]] = value
+        elif value:
+            extra.append(f"{key}: {value}")
+
+    if not any(fields.get(name) for name in ("title", "username", "password", "url")):
+        return None
+
+    if extra:
+        fields["notes"] = "\n".join(filter(None, [fields.get("notes"), *extra]))
+
+    if not fields.get("title"):
+        fields["title"] = fields.get("url") or fields.get("username") or "Untitled"
+
+    return ImportedEntry(group_path=group_path, **fields)
+
+
+def read_keepass_xml(file: typing.BinaryIO) -> Iterator[ImportedEntry]:
+    """Reads a KeePass 2 XML export, skipping entry history and the recycle bin.
+
+    Elements are detached from their parent as soon as they are read, so only the entry being read
+    and the path to it are kept in memory. The top-level group maps to the group entries are imported into.
+    """
+    recycle_bin_uuid: str | None = None
+
+    # Open elements, and the name of every open group
+    parents: list[ET.Element] = []
+    group_names: list[str] = []
+
+    entry_depth = 0
+    history_depth = 0
+    skip_depth: int | None = None  # depth of the recycle bin group while inside it
+
+    # Python's expat parser doesn't resolve external entities and limits entity expansion
+    for event, elem in ET.iterparse(file, events=("start", "end")):  # noqa: S314
+        tag = elem.tag
+
+        if event == "start":
+            if tag == "Group":
+                group_names.append("")
+            elif tag == "Entry":
+                entry_depth += 1
+            elif tag == "History":
+                history_depth += 1
+
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        parent = parents[-1] if parents else None
+
+        if tag == "Entry":
+            entry_depth -= 1
+            if not history_depth and skip_depth is None:
+                entry = _read_entry(elem, group_names[1:])
+                if entry is not None:
+                    yield entry
+        elif tag == "History":
+            history_depth -= 1
+        elif tag == "Group":
+            if skip_depth == len(group_names):
+                skip_depth = None
+
+            group_names.pop()
+        elif parent is not None and parent.tag == "Group":
+            if tag == "Name":
+                group_names[-1] = elem.text or ""
+            elif tag == "UUID" and recycle_bin_uuid and elem.text == recycle_bin_uuid and skip_depth is None:
+                skip_depth = len(group_names)
+        elif tag == "RecycleBinUUID":
+            recycle_bin_uuid = elem.text
+
+        # Entries need their strings until they end, everything else can go right away
+        if parent is not None and (tag == "Entry" or not entry_depth):
+            parent.remove(elem)
@@ -0,0 +1,83 @@
+"""Maps the field names used by other password managers to the app's entry fields."""
+
+from ..models.models import ImportedEntry
+
+# Lower-cased field name -> entry field, covers the exports of most managers
+FIELD_ALIASES: dict[str, str] = {
+    "title": "title",
+    "name": "title",
+    "username": "username",
+    "login": "username",
+    "login_username": "username",
+    "user": "username",
+    "email": "username",
+    "password": "password",
+    "login_password": "password",
+    "url": "url",
+    "uri": "url",
+    "login_uri": "url",
+    "website": "url",
+    "notes": "notes",
+    "note": "notes",
+    "extra": "notes",
+    "comments": "notes",
+    "group": "group",
+    "folder": "group",
+    "grouping": "group",
+    "group_path": "group",
+}
+
+GROUP_SEPARATOR: str = "/"
+GROUP_ESCAPE: str = "\\"  # escapes the separator and itself in group names, other backslashes are kept
+
+
+def split_group_path(value: str | list | None) -> list[str]:
+    if not value:
+        return []
+
+    if isinstance(value, list):
+        return [str(name).strip() for name in value if str(name).strip()]
+
+    names: list[str] = []
+    name: list[str] = []
+
+    chars = iter(value)
+    for char in chars:
+        if char == GROUP_ESCAPE:
+            escaped = next(chars, "")
+            if escaped not in (GROUP_SEPARATOR, GROUP_ESCAPE):
+                name.append(char)
+
+            name.append(escaped)
+        elif char == GROUP_SEPARATOR:
+            names.append("".join(name))
+            name.clear()
+        else:
+            name.append(char)
+
+    names.append("".join(name))
+    return [name.strip() for name in names if name.strip()]
+
+
+def record_to_entry(record: dict) -> ImportedEntry | None:
+    """Builds an entry from a CSV row or JSON object, returns `None` for records with nothing to import."""
+
+    fields: dict = {}
+    for key, value in record.items():
+        if key is None or value is None:
+            continue
+
+        name = FIELD_ALIASES.get(str(key).strip().lower())
+        if name is not None and name not in fields:
+            fields[name] = value
+
+    group_path = split_group_path(fields.pop("group", None))
+    fields = {name: str(value) for name, value in fields.items()}
+
+    if not any(fields.get(name) for name in ("title", "username", "password", "url")):
+        return None
+
+    if not fields.get("title"):
+        fields["title"] = fields.get("url") or fields.get("username") or "Untitled"
+
+    return ImportedEntry(group_path=group_path, **fields)
@@ -0,0 +1,235 @@
+"""Key derivation and authenticated encryption for the local vault and its backups."""
+
+import base64
+import io
+import os
+import struct
+import typing
+from collections.abc import Iterator
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+from pydantic import BaseModel
+
+KEY_SIZE: int = 32  # AES-256
+SALT_SIZE: int = 16
+
+
+class KdfParams(BaseModel):
+    """Argon2id parameters, stored next to the salt so they can be raised later."""
+
+    iterations: int = 3
+    lanes: int = 4
+    memory_cost: int = 64 * 1024  # KiB
+
+
+def derive_key(password: str, salt: bytes, params: KdfParams | None = None) -> bytes:
+    """Derives an AES-256 key from a password, deliberately slow and memory-hard."""
+
+    params = params if params is not None else KdfParams()
+    kdf = Argon2id(
+        salt=salt,
+        length=KEY_SIZE,
+        iterations=params.iterations,
+        lanes=params.lanes,
+        memory_cost=params.memory_cost,
+    )
+    return kdf.derive(password.encode("utf-8"))
+
+
+class DecryptionError(Exception):
+    """Raised when data was encrypted with another key, or was modified after encryption."""
+
+
+class VaultLockedError(Exception):
+    """Raised when encrypted fields are read or written before the vault is unlocked."""
+
+
+# Encrypted fields
+#
+# Sealed values are stored in the same text columns as before: the prefix, then the nonce and ciphertext
+# in URL-safe base64. The field name is authenticated, so a value can't be moved into another column.
+SEALED_PREFIX: str = "pmv1:"
+NONCE_SIZE: int = 12
+
+
+def is_sealed(value: str | None) -> bool:
+    return value is not None and value.startswith(SEALED_PREFIX)
+
+
+def seal_value(aead: AESGCM, value: str, field: str) -> str:
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = aead.encrypt(nonce, value.encode("utf-8"), field.encode("ascii"))
+
+    return SEALED_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode("ascii")
+
+
+def open_value(aead: AESGCM, value: str, field: str) -> str:
+    try:
+        data = base64.urlsafe_b64decode(value[len(SEALED_PREFIX) :])
+        plaintext = aead.decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], field.encode("ascii"))
+    except (InvalidTag, ValueError):
+        raise DecryptionError(f"could not decrypt '{field}', it was sealed with another key or modified") from None
+
+    return plaintext.decode("utf-8")
+
+
+def wrap_key(master_key: bytes, key: bytes) -> bytes:
+    """Encrypts the vault key with the key derived from the master password."""
+
+    nonce = os.urandom(NONCE_SIZE)
+    return nonce + AESGCM(master_key).encrypt(nonce, key, b"vault-key")
+
+
+def unwrap_key(master_key: bytes, wrapped_key: bytes) -> bytes:
+    try:
+        return AESGCM(master_key).decrypt(wrapped_key[:NONCE_SIZE], wrapped_key[NONCE_SIZE:], b"vault-key")
+    except InvalidTag:
+        raise DecryptionError("wrong master password") from None
+
+
+def reseal_rows(old_key: bytes | None, new_key: bytes, rows: list[tuple], fields: tuple[str, ...]) -> list[tuple]:
+    """Re-encrypts `(rowid, value, ...)` rows from `old_key` to `new_key`.
+
+    Without `old_key` every value is treated as plaintext, which encrypts a vault for the first time.
+    It only takes plain data so it can run in another process.
+    """
+    old_aead = AESGCM(old_key) if old_key is not None else None
+    new_aead = AESGCM(new_key)
+
+    resealed: list[tuple] = []
+    for rowid, *values in rows:
+        new_values = []
+        for field, value in zip(fields, values, strict=True):
+            if old_aead is not None and is_sealed(value):
+                value = open_value(old_aead, value, field)
+
+            new_values.append(seal_value(new_aead, value, field))
+
+        resealed.append((rowid, *new_values))
+
+    return resealed
+
+
+# Encrypted archives
+#
+# header | chunk...
+#
+# header: magic, KDF parameters, salt, nonce prefix
+# chunk: ciphertext length (u32), final flag (u8), ciphertext
+#
+# Every chunk is sealed with the nonce prefix and its index, and authenticates the header and whether it
+# is the final chunk, so chunks can't be reordered, dropped or truncated without failing to decrypt.
+ARCHIVE_MAGIC: bytes = b"PMCARC01"
+ARCHIVE_CHUNK_SIZE: int = 64 * 1024  # 64 KiB
+
+_HEADER = struct.Struct(f">8sIII{SALT_SIZE}s8s")
+_CHUNK = struct.Struct(">IB")
+
+
+def _chunk_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(4, "big")
+
+
+class EncryptedArchiveWriter:
+    """Encrypts a stream of bytes into an archive, buffering at most one chunk."""
+
+    def __init__(self, file: typing.BinaryIO, password: str, params: KdfParams | None = None):
+        params = params if params is not None else KdfParams()
+        salt = os.urandom(SALT_SIZE)
+
+        self.file = file
+        self.aead = AESGCM(derive_key(password, salt, params))
+
+        self.header = _HEADER.pack(
+            ARCHIVE_MAGIC, params.iterations, params.lanes, params.memory_cost, salt, os.urandom(8)
+        )
+        self.file.write(self.header)
+
+        self._nonce_prefix = self.header[-8:]
+        self._index = 0
+        self._buffer = bytearray()
+
+    def _seal(self, data: bytes, final: bool) -> None:
+        nonce = _chunk_nonce(self._nonce_prefix, self._index)
+        ciphertext = self.aead.encrypt(nonce, data, self.header + bytes([final]))
+
+        self.file.write(_CHUNK.pack(len(ciphertext), final))
+        self.file.write(ciphertext)
+
+        self._index += 1
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) > ARCHIVE_CHUNK_SIZE:
+            self._seal(bytes(self._buffer[:ARCHIVE_CHUNK_SIZE]), False)
+            del self._buffer[:ARCHIVE_CHUNK_SIZE]
+
+    def close(self) -> None:
+        """Seals the final chunk, the archive is unreadable without it."""
+
+        self._seal(bytes(self._buffer), True)
+        self._buffer.clear()
+
+
+def read_encrypted_archive(file: typing.BinaryIO, password: str) -> Iterator[bytes]:
+    """Decrypts an archive written by `EncryptedArchiveWriter`, one chunk at a time."""
+
+    header = file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise DecryptionError("file is too short to be an encrypted archive")
+
+    magic, iterations, lanes, memory_cost, salt, nonce_prefix = _HEADER.unpack(header)
+    if magic != ARCHIVE_MAGIC:
+        raise DecryptionError("file is not an encrypted archive")
+
+    params = KdfParams(iterations=iterations, lanes=lanes, memory_cost=memory_cost)
+    aead = AESGCM(derive_key(password, salt, params))
+
+    index = 0
+    while True:
+        chunk_header = file.read(_CHUNK.size)
+        if len(chunk_header) != _CHUNK.size:
+            raise DecryptionError("archive is truncated")
+
+        length, final = _CHUNK.unpack(chunk_header)
+        ciphertext = file.read(length)
+
+        try:
+            data = aead.decrypt(_chunk_nonce(nonce_prefix, index), ciphertext, header + bytes([final]))
+        except InvalidTag:
+            raise DecryptionError("wrong password, or the archive was modified") from None
+
+        yield data
+        if final:
+            return
+
+        index += 1
+
+
+class EncryptedArchiveReader(io.RawIOBase):
+    """Reads the plaintext of an encrypted archive as a stream, decrypting one chunk at a time."""
+
+    def __init__(self, file: typing.BinaryIO, password: str):
+        super().__init__()
+
+        self._chunks = read_encrypted_archive(file, password)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+
+            self._buffer = chunk
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+
+        return size
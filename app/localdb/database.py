@@ -1,55 +1,317 @@
+import json
 import logging
+import multiprocessing
+import os
+import threading
 import uuid
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import TypeVar
 
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from pydantic import HttpUrl
-from sqlalchemy import Engine
+from sqlalchemy import Engine, bindparam, delete, event, func, insert, literal, literal_column, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, SQLModel, create_engine, select, text, true
 
-from ..localdb.dbtables import PasswordEntry, PasswordGroups, SyncConfig
+from ..config import DatabaseSettings
+from ..localdb.crypto import (
+    SALT_SIZE,
+    DecryptionError,
+    KdfParams,
+    VaultLockedError,
+    derive_key,
+    is_sealed,
+    open_value,
+    reseal_rows,
+    seal_value,
+    unwrap_key,
+    wrap_key,
+)
+from ..localdb.dbtables import (
+    ENTRY_SEARCH_COLUMNS,
+    ENTRY_SEARCH_DDL,
+    ENTRY_SEARCH_DROP,
+    PasswordEntry,
+    PasswordEntrySearch,
+    PasswordGroups,
+    SyncConfig,
+    SyncOutbox,
+    SyncState,
+    VaultConfig,
+)
+from ..localdb.export import export_entries
+from ..localdb.writer import DatabaseWriter
 from ..models.models import (
     EditedEntryWithID,
     EditedPasswordEntryInfo,
-    GroupChildrenData,
+    EntryCursor,
+    EntryRow,
+    ExportFormat,
+    ExportResult,
     GroupParentData,
+    OutboxOperation,
+    OutboxOperationType,
     PasswordEntryData,
+    SyncChangeset,
     SyncInfo,
 )
 
 logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+T = TypeVar("T")
+
 DEFAULT_CHUNK_SIZE: int = 25 * 1024 * 1024  # 25 MiB
 
+DEFAULT_UPSERT_CHUNK_SIZE: int = 1000  # rows per executemany() call
+
+REKEY_BATCH_SIZE: int = 2000
+PARALLEL_REKEY_THRESHOLD: int = 200_000  # entries, below this starting worker processes costs more than it saves
+
+# Selected in the field order of `EntryRow`, so listed rows map straight onto it
+_ENTRY_ROW_COLUMNS = (
+    PasswordEntry.title,
+    PasswordEntry.username,
+    PasswordEntry.url,
+    PasswordEntry.created_at,
+    PasswordEntry.entry_id,
+    PasswordEntry.group_id,
+)
+
+
+def _build_match_query(query: str) -> str:
+    """Turns user input into an FTS5 query where every word is a quoted prefix match."""
+
+    terms = []
+    for word in query.split():
+        escaped = word.replace('"', '""')
+        terms.append(f'"{escaped}"*')
+
+    return " ".join(terms)
+
+
+def _chunked(rows: list[dict], chunk_size: int):
+    for i in range(0, len(rows), chunk_size):
+        yield rows[i : i + chunk_size]
+
+
+def _upsert_groups(session: Session, groups: list[GroupParentData], chunk_size: int) -> int:
+    """Inserts or updates groups with `executemany()`, parents must come before their children."""
+
+    statement = sqlite_insert(PasswordGroups.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PasswordGroups.group_id],
+        set_={"group_name": statement.excluded.group_name, "parent_id": statement.excluded.parent_id},
+    )
+
+    rows = [
+        {
+            "group_id": group.group_id,
+            "group_name": group.group_name,
+            "parent_id": group.parent_id,
+            "is_root": group.parent_id is None,
+        }
+        for group in groups
+    ]
+    for chunk in _chunked(rows, chunk_size):
+        session.execute(statement, chunk)
+
+    return len(rows)
+
+
+def _upsert_entries(session: Session, entries: list[PasswordEntryData], chunk_size: int, vault: "VaultMethods") -> int:
+    """Inserts or updates entries with `executemany()`, their groups must already exist."""
+
+    statement = sqlite_insert(PasswordEntry.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PasswordEntry.entry_id],
+        set_={
+            name: statement.excluded[name]
+            for name in ("title", "username", "password", "url", "notes", "created_at", "group_id")
+        },
+    )
+
+    rows = [
+        {
+            "entry_id": entry.entry_id,
+            "title": entry.title,
+            "username": entry.username,
+            "password": vault.seal(entry.password, "password"),
+            "url": str(entry.url) if entry.url else None,
+            "notes": vault.seal(entry.notes, "notes"),
+            "created_at": entry.created_at,
+            "group_id": entry.group_id,
+        }
+        for entry in entries
+    ]
+    for chunk in _chunked(rows, chunk_size):
+        session.execute(statement, chunk)
+
+    return len(rows)
+
 
 class MainDatabase:
     """Main database class. This is a local version of the server database."""
 
     def __init__(self):
         self.engine: Engine = None
+        self.settings: DatabaseSettings = None
+
+        self.writer: DatabaseWriter = None
 
-    def setup(self, sqlite_path: Path) -> None:
+        # Changes after every committed batch of writes, tells readers whether a result from before it can still be used
+        self.write_version: int = 0
+
+    def setup(self, sqlite_path: Path, settings: DatabaseSettings | None = None) -> None:
         """Sets up the database and runs first-run checks.
 
         This must be called first before using the child methods.
         """
 
-        self.engine = create_engine(f"sqlite:///{sqlite_path}", echo=False)
+        self.settings = settings if settings is not None else DatabaseSettings()
+        connect_args = {"check_same_thread": False, "timeout": self.settings.busy_timeout / 1000}
+
+        self.engine = create_engine(
+            f"sqlite:///{sqlite_path}",
+            echo=False,
+            poolclass=QueuePool,
+            pool_size=self.settings.pool_size,
+            max_overflow=self.settings.max_overflow,
+            connect_args=connect_args,
+        )
+
+        # Groups, entries, the outbox and sync state are written by one thread through its own connection
+        write_engine = create_engine(
+            f"sqlite:///{sqlite_path}",
+            echo=False,
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            connect_args=connect_args,
+        )
+
+        # Pragmas are per-connection, so they have to be applied to every new pooled connection
+        for engine in (self.engine, write_engine):
+            event.listen(engine, "connect", self._apply_pragmas)
+
         SQLModel.metadata.create_all(self.engine)
 
-        with Session(self.engine) as session:
-            session.exec(text("PRAGMA foreign_keys=ON;"))
+        self._setup_indexes()
+        self._setup_search_index()
+
+        self.writer = DatabaseWriter(
+            write_engine,
+            max_delay=self.settings.group_commit_delay / 1000,
+            max_batch=self.settings.group_commit_size,
+            on_commit=self._count_write,
+        )
+        self.writer.start()
+
+        self.vault = VaultMethods(self)
 
         self.groups = PasswordGroupMethods(self)
         self.entries = PasswordEntryMethods(self)
 
         self.syncinfo = SyncConfigMethods(self)
+        self.syncstate = SyncStateMethods(self)
+        self.outbox = OutboxMethods(self)
 
         self.groups.create_group("Root", parent_id=None)
         self.syncinfo.create_default_info()
 
         return
 
+    def _count_write(self):
+        self.write_version += 1
+
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+
+        cursor.execute(f"PRAGMA journal_mode={self.settings.journal_mode};")
+        cursor.execute(f"PRAGMA synchronous={self.settings.synchronous};")
+
+        cursor.execute(f"PRAGMA mmap_size={self.settings.mmap_size:d};")
+        cursor.execute(f"PRAGMA cache_size={self.settings.cache_size:d};")
+
+        cursor.execute(f"PRAGMA temp_store={self.settings.temp_store};")
+        cursor.execute(f"PRAGMA busy_timeout={self.settings.busy_timeout:d};")
+
+        cursor.execute("PRAGMA foreign_keys=ON;")
+        cursor.close()
+
+    def _setup_indexes(self):
+        # `create_all()` skips existing tables along with their indexes, so vaults created before
+        # an index was added get it here
+        for sql_table in (PasswordGroups.__table__, PasswordEntry.__table__):
+            for index in sql_table.indexes:
+                index.create(self.engine, checkfirst=True)
+
+    def _setup_search_index(self):
+        with self.engine.begin() as conn:
+            result = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'passwordentry_fts'")
+            index_exists = result.first() is not None
+
+            # Indexes created before notes were encrypted still cover them
+            if index_exists:
+                result = conn.exec_driver_sql("SELECT name FROM pragma_table_info('passwordentry_fts')")
+                if tuple(row[0] for row in result) != ENTRY_SEARCH_COLUMNS:
+                    for statement in ENTRY_SEARCH_DROP:
+                        conn.exec_driver_sql(statement)
+
+                    index_exists = False
+
+            for statement in ENTRY_SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+
+            # Index entries that were added before the search index existed
+            if not index_exists:
+                conn.exec_driver_sql("INSERT INTO passwordentry_fts(passwordentry_fts) VALUES ('rebuild')")
+                logger.info("Created entry search index")
+
+    def export(
+        self,
+        path: Path,
+        export_format: ExportFormat,
+        password: str | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> ExportResult:
+        """Exports every entry along with the path of its group.
+
+        Entries are streamed in batches and written incrementally, so memory use doesn't grow with
+        the size of the vault. `encrypted` writes the JSON lines export into an archive encrypted
+        with `password`. `progress_callback` gets `(entries written, total entries)` after every batch.
+
+        The file only appears at `path` once the export completes.
+        """
+        return export_entries(
+            self.engine,
+            self.vault,
+            path,
+            export_format,
+            password=password,
+            progress_callback=progress_callback,
+            cancel_event=cancel_event,
+        )
+
+    def defer(self, func: Callable[..., T], *args, **kwargs) -> Future[T]:
+        """Runs a write method on the writer thread without waiting for it.
+
+        Writes made by `func` go into the same batch and are committed together, or not at all if it raises.
+        Pass the future to `make_future_task()` to get the result in a Qt slot.
+        """
+        return self.writer.submit(lambda session: func(*args, **kwargs))
+
     def close(self):
+        if self.writer:
+            self.writer.stop()
+            self.writer.engine.dispose()
+
         if self.engine:
             self.engine.dispose()
 
@@ -66,13 +328,14 @@ class PasswordGroupMethods:
 
         `group_id` parameter is to stay in sync with the server.
         """
-        with Session(self.engine) as session:
+
+        def write(session: Session):
             # So the 'Root' group can be created without a parent
             if parent_id:
-                result2 = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == parent_id))
+                result2 = session.exec(select(PasswordGroups.group_id).where(PasswordGroups.group_id == parent_id))
                 result2.one()
             else:
-                result3 = session.exec(select(PasswordGroups).where(PasswordGroups.is_root == true()))
+                result3 = session.exec(select(PasswordGroups.group_id).where(PasswordGroups.is_root == true()))
                 root_model = result3.one_or_none()
 
                 if root_model:
@@ -84,85 +347,126 @@ class PasswordGroupMethods:
                 group_id=g_id, group_name=group_name, parent_id=parent_id, is_root=False if parent_id else True
             )
             session.add(new_group)
-            session.commit()
 
             return GroupParentData(group_id=g_id, group_name=group_name, parent_id=parent_id)
 
-    def get_children_of_root(self) -> list[GroupChildrenData]:
+        return self.parent.writer.execute(write)
+
+    def bulk_upsert(self, groups: list[GroupParentData], chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE) -> int:
+        """Inserts or updates many groups in a single transaction, returns how many were written.
+
+        `groups` must be ordered so that parents come before their children.
+        """
+
+        def write(session: Session):
+            return _upsert_groups(session, groups, chunk_size)
+
+        return self.parent.writer.execute(write)
+
+    def get_subtree(self, group_id: uuid.UUID, max_depth: int | None = None) -> list[GroupParentData]:
+        """Get a group and all of its descendants in a single recursive query.
+
+        Groups are ordered by depth, so a parent always comes before its children.
+        `max_depth` limits how many levels below `group_id` are returned.
+        """
         with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.is_root == true()))
-            root_group = result.one()
-            child_models: list[GroupChildrenData] = []
-
-            # session.refresh(root_group)
-            for child in root_group.child_groups:
-                child_model = GroupChildrenData(
-                    group_name=child.group_name, parent_id=child.parent_id, group_id=child.group_id
+            subtree = (
+                select(
+                    PasswordGroups.group_id,
+                    PasswordGroups.group_name,
+                    PasswordGroups.parent_id,
+                    literal(0).label("depth"),
                 )
-                child_models.append(child_model)
+                .where(PasswordGroups.group_id == group_id)
+                .cte("subtree", recursive=True)
+            )
 
-        return child_models
+            child = aliased(PasswordGroups)
+            recursive_part = select(
+                child.group_id, child.group_name, child.parent_id, (subtree.c.depth + 1).label("depth")
+            ).join(subtree, child.parent_id == subtree.c.group_id)
 
-    def get_children_of_group(self, group_id: uuid.UUID) -> list[GroupChildrenData]:
-        with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
-            group = result.one()
+            if max_depth is not None:
+                recursive_part = recursive_part.where(subtree.c.depth < max_depth)
 
-            if group.is_root:
-                return self.get_children_of_root()
+            subtree = subtree.union_all(recursive_part)
+            result = session.exec(
+                select(subtree.c.group_id, subtree.c.group_name, subtree.c.parent_id).order_by(
+                    subtree.c.depth, subtree.c.group_name
+                )
+            )
+            rows = result.all()
+
+        if not rows:
+            raise ValueError(f"group {group_id} does not exist")
 
-            child_models: list[GroupChildrenData] = []
-            for child in group.child_groups:
-                child_model = GroupChildrenData(
-                    group_name=child.group_name, parent_id=child.parent_id, group_id=child.group_id
+        return [GroupParentData(group_id=row[0], group_name=row[1], parent_id=row[2]) for row in rows]
+
+    def change_group_id(self, old_id: uuid.UUID, new_id: uuid.UUID) -> None:
+        """Re-keys a group, used when the server assigns its own ID to a group created offline."""
+
+        def write(session: Session):
+            result = session.exec(
+                select(PasswordGroups.group_name, PasswordGroups.parent_id, PasswordGroups.is_root).where(
+                    PasswordGroups.group_id == old_id
                 )
-                child_models.append(child_model)
+            )
+            group_name, parent_id, is_root = result.one()
 
-        return child_models
+            # Foreign keys can't be updated in place, so move everything to a new row
+            session.add(PasswordGroups(group_id=new_id, group_name=group_name, parent_id=parent_id, is_root=is_root))
+            session.flush()
+
+            session.exec(update(PasswordGroups).where(PasswordGroups.parent_id == old_id).values(parent_id=new_id))
+            session.exec(update(PasswordEntry).where(PasswordEntry.group_id == old_id).values(group_id=new_id))
+
+            session.exec(delete(PasswordGroups).where(PasswordGroups.group_id == old_id))
+
+        self.parent.writer.execute(write)
 
     def delete_group(self, group_id: uuid.UUID) -> bool:
-        with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
-            group = result.one()
+        def write(session: Session):
+            result = session.exec(select(PasswordGroups.is_root).where(PasswordGroups.group_id == group_id))
+            is_root = result.one()
 
-            if group.is_root:
+            if is_root:
                 raise ValueError("not allowed to delete top-level group")
 
-            session.delete(group)
-            session.commit()
+            # Child groups and entries are removed by the ON DELETE CASCADE foreign keys
+            session.exec(delete(PasswordGroups).where(PasswordGroups.group_id == group_id))
+
+        self.parent.writer.execute(write)
 
         return True
 
     def check_group_exists(self, group_id: uuid.UUID) -> bool:
         with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
+            result = session.exec(select(PasswordGroups.group_id).where(PasswordGroups.group_id == group_id))
             group = result.one_or_none()
             if not group:
                 return False
 
         return True
-    
+
     def get_root_info(self) -> GroupParentData:
         with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.is_root == true()))
-            group = result.one()
-            
-            return GroupParentData(
-                group_id=group.group_id,
-                group_name=group.group_name,
-                parent_id=None
+            result = session.exec(
+                select(PasswordGroups.group_id, PasswordGroups.group_name).where(PasswordGroups.is_root == true())
             )
+            group = result.one()
+
+            return GroupParentData(group_id=group.group_id, group_name=group.group_name, parent_id=None)
 
     def get_group_info(self, group_id: uuid.UUID) -> GroupParentData:
         with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
-            group = result.one()
-            
-            return GroupParentData(
-                group=group.group_id,
-                group_name=group.group_name,
-                parent_id=group.group_id
+            result = session.exec(
+                select(PasswordGroups.group_id, PasswordGroups.group_name, PasswordGroups.parent_id).where(
+                    PasswordGroups.group_id == group_id
+                )
             )
+            group = result.one()
+
+            return GroupParentData(group_id=group.group_id, group_name=group.group_name, parent_id=group.parent_id)
 
 
 class PasswordEntryMethods:
@@ -181,10 +485,9 @@ class PasswordEntryMethods:
 
         `entry_id` and `created_at` parameter is used by `SyncedDatabase` to stay in sync with the server.
         """
-        with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
 
-            group = result.one()
+        def write(session: Session):
+            # A missing group fails the foreign key when the write is flushed
             url_or_none = str(data.url) if data.url else None
 
             # TODO: Make this a separate model if the amount of data that needs to be synced
@@ -192,15 +495,14 @@ class PasswordEntryMethods:
             e_id = entry_id if entry_id is not None else uuid.uuid4()
             c_at = created_at if created_at is not None else datetime.now(UTC)
 
-            # TODO: Encrypt password entries so its safer in the database
             new_entry = PasswordEntry(
                 entry_id=e_id,
                 title=data.title,
                 username=data.username,
-                password=data.password,
+                password=self.parent.vault.seal(data.password, "password"),
                 url=url_or_none,
-                notes=data.notes,
-                group_id=group.group_id,
+                notes=self.parent.vault.seal(data.notes, "notes"),
+                group_id=group_id,
                 created_at=c_at,
             )
             session.add(new_entry)
@@ -213,69 +515,125 @@ class PasswordEntryMethods:
                 created_at=new_entry.created_at,
                 notes=data.notes,
                 entry_id=new_entry.entry_id,
-                group_id=group.group_id,
+                group_id=group_id,
+            )
+            return entry_public
+
+        return self.parent.writer.execute(write)
+
+    def bulk_upsert(self, entries: list[PasswordEntryData], chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE) -> int:
+        """Inserts or updates many entries in a single transaction, returns how many were written."""
+
+        def write(session: Session):
+            return _upsert_entries(session, entries, chunk_size, self.parent.vault)
+
+        return self.parent.writer.execute(write)
+
+    def get_entry(self, entry_id: uuid.UUID) -> PasswordEntryData:
+        """Get one entry with its password and notes, listings only carry the displayed columns."""
+
+        with Session(self.engine) as session:
+            result = session.exec(select(PasswordEntry).where(PasswordEntry.entry_id == entry_id))
+            entry = result.one()
+
+            entry_public = PasswordEntryData(
+                title=entry.title,
+                username=entry.username,
+                password=entry.password,
+                url=entry.url,
+                created_at=entry.created_at,
+                notes=entry.notes,
+                entry_id=entry.entry_id,
+                group_id=entry.group_id,
             )
-            session.commit()
 
         return entry_public
 
-    def get_entries_by_group(self, group_id: uuid.UUID, amount: int = 100, offset: int = 0):
+    def get_entries_by_group(
+        self, group_id: uuid.UUID, amount: int = 100, offset: int = 0, after: EntryCursor | None = None
+    ) -> list[EntryRow]:
+        """Get a page of entries ordered by title.
+
+        Pass the cursor of the last entry as `after` to seek straight to the next page, `offset` is kept
+        for callers that page by position. Use `get_entry()` for the password and notes of an entry.
+        """
         with Session(self.engine) as session:
-            result = session.exec(select(PasswordGroups).where(PasswordGroups.group_id == group_id))
-            existing_group = result.one()
+            result = session.exec(select(PasswordGroups.group_id).where(PasswordGroups.group_id == group_id))
+            result.one()
+
+            # Columns only, loading the ORM objects would pull in the whole group through its relationships
+            statement = (
+                select(*_ENTRY_ROW_COLUMNS)
+                .where(PasswordEntry.group_id == group_id)
+                .order_by(PasswordEntry.title, PasswordEntry.entry_id)
+                .limit(amount)
+            )
+            if after is not None:
+                cursor = tuple_(literal(after.title), literal(after.entry_id, PasswordEntry.entry_id.type))
+                statement = statement.where(tuple_(PasswordEntry.title, PasswordEntry.entry_id) > cursor)
+            else:
+                statement = statement.offset(offset)
+
+            entries = session.exec(statement).all()
+
+        return list(map(EntryRow._make, entries))
+
+    def search(self, query: str, limit: int = 50, offset: int = 0) -> list[EntryRow]:
+        """Full-text search over entry titles, usernames and URLs.
 
+        Every word in `query` is matched as a prefix, results are ranked with title matches first.
+        """
+        match_query = _build_match_query(query)
+        if not match_query:
+            return []
+
+        with Session(self.engine) as session:
             result = session.exec(
-                select(PasswordEntry, PasswordGroups)
-                .join(PasswordGroups)
-                .where(PasswordEntry.group_id == existing_group.group_id)
-                .limit(amount)
+                select(*_ENTRY_ROW_COLUMNS)
+                .join(PasswordEntrySearch, PasswordEntrySearch.c.rowid == literal_column("passwordentry.rowid"))
+                .where(text("passwordentry_fts MATCH :match_query").bindparams(match_query=match_query))
+                .order_by(text("bm25(passwordentry_fts, 10.0, 5.0, 2.0)"))
+                .limit(limit)
                 .offset(offset)
             )
             entries = result.all()
 
-            entries_public: list[PasswordEntryData] = []
-            for entry, group in entries:
-                entry_public = PasswordEntryData(
-                    title=entry.title,
-                    username=entry.username,
-                    password=entry.password,
-                    url=entry.url,
-                    created_at=entry.created_at,
-                    notes=entry.notes,
-                    entry_id=entry.entry_id,
-                    group_id=group.group_id,
-                )
-                entries_public.append(entry_public)
-
-        return entries_public
+        return list(map(EntryRow._make, entries))
 
     def delete_entry_by_id(self, entry_id: uuid.UUID, group_id: uuid.UUID) -> bool:
-        with Session(self.engine) as session:
+        def write(session: Session):
             result = session.exec(
-                select(PasswordEntry)
-                .join(PasswordGroups)
-                .where(PasswordEntry.entry_id == entry_id, PasswordGroups.group_id == group_id)
+                select(PasswordEntry).where(PasswordEntry.entry_id == entry_id, PasswordEntry.group_id == group_id)
             )
             entry = result.one()
 
             session.delete(entry)
-            session.commit()
+
+        self.parent.writer.execute(write)
 
         return True
 
+    def change_entry_id(self, old_id: uuid.UUID, new_id: uuid.UUID) -> None:
+        """Re-keys an entry, used when the server assigns its own ID to an entry created offline."""
+
+        def write(session: Session):
+            session.exec(update(PasswordEntry).where(PasswordEntry.entry_id == old_id).values(entry_id=new_id))
+
+        self.parent.writer.execute(write)
+
     def update_entry_data(self, entry_id: uuid.UUID, data: EditedEntryWithID) -> PasswordEntryData:
-        with Session(self.engine) as session:
-            result = session.exec(select(PasswordEntry).join(PasswordGroups).where(PasswordEntry.entry_id == entry_id))
+        def write(session: Session):
+            result = session.exec(select(PasswordEntry).where(PasswordEntry.entry_id == entry_id))
             entry = result.one()
             url_or_none = str(data.url) if data.url else None
 
             entry.title = data.title
             entry.username = data.username
 
-            entry.password = data.password
+            entry.password = self.parent.vault.seal(data.password, "password")
             entry.url = url_or_none
 
-            entry.notes = data.notes
+            entry.notes = self.parent.vault.seal(data.notes, "notes")
             session.add(entry)
 
             entry_public = PasswordEntryData(
@@ -285,12 +643,12 @@ class PasswordEntryMethods:
                 password=data.password,
                 url=data.url,
                 notes=data.notes,
-                group_id=entry.group.group_id,
+                group_id=entry.group_id,
                 created_at=entry.created_at,
             )
-            session.commit()
+            return entry_public
 
-        return entry_public
+        return self.parent.writer.execute(write)
 
 
 class SyncConfigMethods:
@@ -299,7 +657,7 @@ class SyncConfigMethods:
         self.engine = parent.engine
 
     def create_default_info(self):
-        with Session(self.engine) as session:
+        def write(session: Session):
             result = session.exec(select(SyncConfig))
             existing_config = result.one_or_none()
 
@@ -310,10 +668,10 @@ class SyncConfigMethods:
             config = SyncConfig(username="", server_url=None)
             session.add(config)
 
-            session.commit()
+        self.parent.writer.execute(write)
 
     def set_sync_info(self, username: str, server_url: HttpUrl | None, sync_enabled: bool):
-        with Session(self.engine) as session:
+        def write(session: Session):
             result = session.exec(select(SyncConfig))
             config = result.one()
 
@@ -321,10 +679,12 @@ class SyncConfigMethods:
             config.server_url = str(server_url) if server_url else None
 
             config.sync_enabled = sync_enabled
-            session.commit()
+            session.add(config)
 
             return SyncInfo(username=username, server_url=server_url, sync_enabled=sync_enabled)
 
+        return self.parent.writer.execute(write)
+
     def get_sync_info(self):
         with Session(self.engine) as session:
             result = session.exec(select(SyncConfig))
@@ -333,12 +693,436 @@ class SyncConfigMethods:
             return SyncInfo(username=config.username, server_url=config.server_url, sync_enabled=config.sync_enabled)
 
     def toggle_sync_enabled(self, sync_enabled: bool):
-        with Session(self.engine) as session:
+        def write(session: Session):
             result = session.exec(select(SyncConfig))
             config = result.one()
 
             config.sync_enabled = sync_enabled
-            syncinfo = SyncInfo(username=config.username, server_url=config.server_url, sync_enabled=sync_enabled)
+            session.add(config)
+
+            return SyncInfo(username=config.username, server_url=config.server_url, sync_enabled=sync_enabled)
+
+        return self.parent.writer.execute(write)
+
+
+class SyncStateMethods:
+    def __init__(self, parent: MainDatabase):
+        self.parent = parent
+        self.engine = parent.engine
+
+    def get_revisions(self) -> dict[uuid.UUID, str]:
+        with Session(self.engine) as session:
+            result = session.exec(select(SyncState.object_id, SyncState.revision))
+            return {object_id: revision for object_id, revision in result.all()}
+
+    def get_local_ids(self) -> tuple[set[uuid.UUID], set[uuid.UUID]]:
+        """Returns the IDs of every local group and entry."""
+
+        with Session(self.engine) as session:
+            group_ids = set(session.exec(select(PasswordGroups.group_id)).all())
+            entry_ids = set(session.exec(select(PasswordEntry.entry_id)).all())
+
+        return group_ids, entry_ids
+
+    def forget(self, object_ids: list[uuid.UUID]) -> None:
+        """Drops the stored revisions so the next pull overwrites these objects with the server copy."""
+
+        if not object_ids:
+            return
+
+        def write(session: Session):
+            session.exec(delete(SyncState).where(SyncState.object_id.in_(object_ids)))
+
+        self.parent.writer.execute(write)
+
+    def apply_changeset(self, changeset: SyncChangeset, synced_at: datetime) -> None:
+        """Applies changes pulled from the server in a single transaction.
+
+        `upsert_groups` must be ordered so that parents come before their children.
+        """
+
+        def write(session: Session):
+            if changeset.replace_root:
+                self._replace_root(session, changeset.replace_root)
+
+            if changeset.delete_entry_ids:
+                session.exec(delete(PasswordEntry).where(PasswordEntry.entry_id.in_(changeset.delete_entry_ids)))
+
+            # Child groups and entries are removed by the foreign key cascade
+            if changeset.delete_group_ids:
+                session.exec(delete(PasswordGroups).where(PasswordGroups.group_id.in_(changeset.delete_group_ids)))
+
+            _upsert_groups(session, changeset.upsert_groups, DEFAULT_UPSERT_CHUNK_SIZE)
+            _upsert_entries(session, changeset.upsert_entries, DEFAULT_UPSERT_CHUNK_SIZE, self.parent.vault)
+
+            deleted_ids = changeset.delete_entry_ids + changeset.delete_group_ids
+            if deleted_ids:
+                session.exec(delete(SyncState).where(SyncState.object_id.in_(deleted_ids)))
+
+            statement = sqlite_insert(SyncState.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=[SyncState.object_id],
+                set_={"revision": statement.excluded.revision, "synced_at": statement.excluded.synced_at},
+            )
+
+            rows = [
+                {"object_id": object_id, "object_type": object_type, "revision": revision, "synced_at": synced_at}
+                for object_id, (object_type, revision) in changeset.revisions.items()
+            ]
+            for chunk in _chunked(rows, DEFAULT_UPSERT_CHUNK_SIZE):
+                session.execute(statement, chunk)
+
+        self.parent.writer.execute(write)
+
+    def _replace_root(self, session: Session, new_root: GroupParentData):
+        # Adopt the server's root group, moving anything under the local root into it
+        result = session.exec(select(PasswordGroups.group_id).where(PasswordGroups.is_root == true()))
+        old_root_id = result.one()
+
+        session.add(
+            PasswordGroups(group_id=new_root.group_id, group_name=new_root.group_name, parent_id=None, is_root=True)
+        )
+        session.flush()
+
+        session.exec(
+            update(PasswordGroups).where(PasswordGroups.parent_id == old_root_id).values(parent_id=new_root.group_id)
+        )
+        session.exec(
+            update(PasswordEntry).where(PasswordEntry.group_id == old_root_id).values(group_id=new_root.group_id)
+        )
+
+        session.exec(delete(PasswordGroups).where(PasswordGroups.group_id == old_root_id))
+        session.exec(update(SyncOutbox).where(SyncOutbox.parent_id == old_root_id).values(parent_id=new_root.group_id))
+
+
+class OutboxMethods:
+    def __init__(self, parent: MainDatabase):
+        self.parent = parent
+        self.engine = parent.engine
+
+    def record(
+        self,
+        operation: OutboxOperationType,
+        object_id: uuid.UUID,
+        parent_id: uuid.UUID | None,
+        payload: dict | None = None,
+    ) -> None:
+        def write(session: Session):
+            row = SyncOutbox(
+                operation=operation.value,
+                object_id=object_id,
+                parent_id=parent_id,
+                payload=self.parent.vault.seal_payload(payload) if payload is not None else None,
+            )
+            session.add(row)
+
+        self.parent.writer.execute(write)
+
+    def record_many(self, operations: list[OutboxOperation]) -> None:
+        """Records many operations in a single transaction, in the order given."""
+
+        rows = [
+            {
+                "operation": op.operation.value,
+                "object_id": op.object_id,
+                "parent_id": op.parent_id,
+                "payload": self.parent.vault.seal_payload(op.payload) if op.payload is not None else None,
+                "created_at": datetime.now(UTC),
+            }
+            for op in operations
+        ]
+        if not rows:
+            return
+
+        def write(session: Session):
+            for chunk in _chunked(rows, DEFAULT_UPSERT_CHUNK_SIZE):
+                session.execute(insert(SyncOutbox.__table__), chunk)
+
+        self.parent.writer.execute(write)
+
+    def get_pending(self) -> list[OutboxOperation]:
+        with Session(self.engine) as session:
+            result = session.exec(select(SyncOutbox).order_by(SyncOutbox.id))
+            rows = result.all()
+
+            operations: list[OutboxOperation] = []
+            for row in rows:
+                operation = OutboxOperation(
+                    operation=OutboxOperationType(row.operation),
+                    object_id=row.object_id,
+                    parent_id=row.parent_id,
+                    payload=self.parent.vault.open_payload(row.payload) if row.payload is not None else None,
+                    source_ids=[row.id],
+                )
+                operations.append(operation)
+
+        return operations
+
+    def count(self) -> int:
+        with Session(self.engine) as session:
+            result = session.exec(select(func.count()).select_from(SyncOutbox))
+            return result.one()
 
-            session.commit()
-            return syncinfo
+    def remove(self, operation_ids: list[int]) -> None:
+        if not operation_ids:
+            return
+
+        def write(session: Session):
+            session.exec(delete(SyncOutbox).where(SyncOutbox.id.in_(operation_ids)))
+
+        self.parent.writer.execute(write)
+
+    def remap_id(self, old_id: uuid.UUID, new_id: uuid.UUID) -> None:
+        """Points pending operations at the ID the server assigned to an object."""
+
+        def write(session: Session):
+            session.exec(update(SyncOutbox).where(SyncOutbox.object_id == old_id).values(object_id=new_id))
+            session.exec(update(SyncOutbox).where(SyncOutbox.parent_id == old_id).values(parent_id=new_id))
+
+        self.parent.writer.execute(write)
+
+
+class VaultMethods:
+    """Encrypts entry passwords, notes and outbox payloads at rest.
+
+    A random vault key seals the fields and is stored encrypted with a key derived from the master
+    password by Argon2id. The derivation runs once in `unlock()` and both keys are cached for the session.
+    Reads hand out the sealed values, they are only decrypted through `reveal()` when the plaintext is
+    actually shown, so listing entries costs no crypto at all.
+
+    Databases created before encryption stay in plaintext until `create()` sets a master password.
+    """
+
+    def __init__(self, parent: MainDatabase):
+        self.parent = parent
+        self.engine = parent.engine
+
+        self._master_key: bytes | None = None
+        self._key: bytes | None = None
+        self._aead: AESGCM | None = None
+
+        with Session(self.engine) as session:
+            result = session.exec(select(VaultConfig.id))
+            self._initialized: bool = result.first() is not None
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    @property
+    def unlocked(self) -> bool:
+        return self._aead is not None
+
+    def _set_keys(self, master_key: bytes | None, key: bytes | None):
+        self._master_key = master_key
+        self._key = key
+
+        self._aead = AESGCM(key) if key is not None else None
+
+    def _require_aead(self) -> AESGCM:
+        if self._aead is None:
+            raise VaultLockedError("the vault is locked")
+
+        return self._aead
+
+    def create(self, password: str, params: KdfParams | None = None, max_workers: int | None = None) -> None:
+        """Sets the master password and encrypts every existing entry with a new vault key."""
+
+        if self._initialized:
+            raise RuntimeError("vault already has a master password")
+
+        params = params if params is not None else KdfParams()
+        salt = os.urandom(SALT_SIZE)
+
+        master_key = derive_key(password, salt, params)
+        key = AESGCM.generate_key(bit_length=256)
+
+        # One transaction, a failure leaves the vault in plaintext rather than half encrypted
+        def write(session: Session):
+            self._reseal_all(session, None, key, max_workers)
+
+            config = VaultConfig(
+                id=1, salt=salt, kdf_params=params.model_dump_json(), wrapped_key=wrap_key(master_key, key)
+            )
+            session.add(config)
+
+        self.parent.writer.execute(write)
+        self._set_keys(master_key, key)
+        self._initialized = True
+
+        logger.info("Encrypted vault with a new master password")
+
+    def unlock(self, password: str) -> None:
+        """Derives the master key and caches the vault key, raises `DecryptionError` on a wrong password."""
+
+        with Session(self.engine) as session:
+            result = session.exec(select(VaultConfig))
+            config = result.one()
+
+        master_key = derive_key(password, config.salt, KdfParams.model_validate_json(config.kdf_params))
+        key = unwrap_key(master_key, config.wrapped_key)
+
+        self._set_keys(master_key, key)
+        logger.info("Unlocked vault")
+
+    def lock(self) -> None:
+        self._set_keys(None, None)
+
+    def change_password(self, old_password: str, new_password: str, params: KdfParams | None = None) -> None:
+        """Re-encrypts the vault key with a new master password, entries are left untouched."""
+
+        params = params if params is not None else KdfParams()
+        with Session(self.engine) as session:
+            result = session.exec(select(VaultConfig))
+            config = result.one()
+
+        # Keys are derived before writing, the writer thread isn't held up by Argon2id
+        old_master_key = derive_key(old_password, config.salt, KdfParams.model_validate_json(config.kdf_params))
+        key = unwrap_key(old_master_key, config.wrapped_key)
+
+        salt = os.urandom(SALT_SIZE)
+        master_key = derive_key(new_password, salt, params)
+
+        def write(session: Session):
+            session.execute(
+                update(VaultConfig)
+                .where(VaultConfig.id == config.id)
+                .values(salt=salt, kdf_params=params.model_dump_json(), wrapped_key=wrap_key(master_key, key))
+            )
+
+        self.parent.writer.execute(write)
+        self._set_keys(master_key, key)
+        logger.info("Changed vault master password")
+
+    def rotate_key(self, max_workers: int | None = None) -> None:
+        """Re-encrypts every sealed field with a new vault key."""
+
+        self._require_aead()
+
+        master_key, old_key = self._master_key, self._key
+        key = AESGCM.generate_key(bit_length=256)
+
+        def write(session: Session):
+            self._reseal_all(session, old_key, key, max_workers)
+            session.execute(update(VaultConfig).values(wrapped_key=wrap_key(master_key, key)))
+
+            # Switched on the writer thread, writes queued behind this one must already seal with the new key
+            self._set_keys(master_key, key)
+
+        try:
+            self.parent.writer.execute(write)
+        except Exception:
+            self._set_keys(master_key, old_key)
+            raise
+
+        logger.info("Rotated vault key")
+
+    def _reseal_all(self, session: Session, old_key: bytes | None, new_key: bytes, max_workers: int | None):
+        """Re-encrypts entries in batches, spread across processes for larger vaults.
+
+        Batches are read by rowid and written back in order as they complete, at most two batches per
+        worker are in flight so memory stays bounded.
+        """
+        rowid = literal_column("rowid")
+        fields = ("password", "notes")
+
+        update_statement = (
+            update(PasswordEntry.__table__)
+            .where(rowid == bindparam("row_id"))
+            .values(password=bindparam("sealed_password"), notes=bindparam("sealed_notes"))
+        )
+
+        def read_batches():
+            last_rowid = -1
+            while True:
+                result = session.execute(
+                    select(rowid, PasswordEntry.password, PasswordEntry.notes)
+                    .select_from(PasswordEntry)
+                    .where(rowid > last_rowid)
+                    .order_by(rowid)
+                    .limit(REKEY_BATCH_SIZE)
+                )
+                rows = [tuple(row) for row in result.all()]
+                if not rows:
+                    return
+
+                last_rowid = rows[-1][0]
+                yield rows
+
+        def write_batch(rows: list[tuple]):
+            params = [
+                {"row_id": row_id, "sealed_password": password, "sealed_notes": notes}
+                for row_id, password, notes in rows
+            ]
+            session.execute(update_statement, params)
+
+        result = session.exec(select(func.count()).select_from(PasswordEntry))
+        total = result.one()
+
+        workers = max_workers if max_workers is not None else os.cpu_count() or 1
+        if total < PARALLEL_REKEY_THRESHOLD or workers < 2:
+            for rows in read_batches():
+                write_batch(reseal_rows(old_key, new_key, rows, fields))
+        else:
+            # Spawned workers only import the crypto module, forking a Qt process isn't safe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                pending: deque[Future] = deque()
+
+                for rows in read_batches():
+                    pending.append(pool.submit(reseal_rows, old_key, new_key, rows, fields))
+                    if len(pending) >= workers * 2:
+                        write_batch(pending.popleft().result())
+
+                while pending:
+                    write_batch(pending.popleft().result())
+
+        # Pending outbox operations carry passwords too
+        result = session.execute(select(SyncOutbox.id, SyncOutbox.payload).where(SyncOutbox.payload.is_not(None)))
+        payload_rows = reseal_rows(old_key, new_key, [tuple(row) for row in result.all()], ("payload",))
+
+        for row_id, payload in payload_rows:
+            session.execute(update(SyncOutbox).where(SyncOutbox.id == row_id).values(payload=payload))
+
+        logger.info("Re-encrypted %d entries and %d outbox operations", total, len(payload_rows))
+
+    def seal(self, value: str, field: str) -> str:
+        """Encrypts a field before it is written, passes it through when the vault has no master password."""
+
+        if not self._initialized:
+            return value
+
+        aead = self._require_aead()
+        if is_sealed(value):
+            # Entries read from the database may be written back as they are
+            try:
+                open_value(aead, value, field)
+                return value
+            except DecryptionError:
+                pass
+
+        return seal_value(aead, value, field)
+
+    def reveal(self, value: str, field: str) -> str:
+        """Decrypts a field, plaintext values are returned as they are."""
+
+        if not is_sealed(value):
+            return value
+
+        return open_value(self._require_aead(), value, field)
+
+    def reveal_entry(self, entry: PasswordEntryData) -> PasswordEntryData:
+        return entry.model_copy(
+            update={"password": self.reveal(entry.password, "password"), "notes": self.reveal(entry.notes, "notes")}
+        )
+
+    def seal_payload(self, payload: dict) -> str:
+        # The server must only ever get plaintext fields
+        payload = {
+            name: self.reveal(value, name) if name in ("password", "notes") and isinstance(value, str) else value
+            for name, value in payload.items()
+        }
+        return self.seal(json.dumps(payload), "payload")
+
+    def open_payload(self, value: str) -> dict:
+        return json.loads(self.reveal(value, "payload"))
@@ -2,6 +2,7 @@ import uuid
 from datetime import UTC, datetime
 from typing import Optional
 
+from sqlalchemy import Index, column, table
 from sqlmodel import Column, DateTime, Field, Relationship, SQLModel, TypeDecorator
 
 
@@ -23,7 +24,12 @@ class TZDateTime(TypeDecorator):
 
 
 # Self referential model (https://docs.sqlalchemy.org/en/latest/orm/self_referential.html)
+# Relationships never load implicitly, a plain lookup would otherwise pull in the whole subtree and every entry.
+# Queries that need them ask with `selectinload()`, listing paths select columns only.
 class PasswordGroups(SQLModel, table=True):
+    # Children of a group in display order
+    __table_args__ = (Index("ix_passwordgroups_parent_id_group_name", "parent_id", "group_name"),)
+
     group_id: uuid.UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     group_name: str = Field(min_length=1, nullable=False, index=True)
 
@@ -33,31 +39,80 @@ class PasswordGroups(SQLModel, table=True):
     # Self-referential relationships
     parent_group: Optional["PasswordGroups"] = Relationship(
         back_populates="child_groups",
-        sa_relationship_kwargs={"lazy": "selectin", "remote_side": "PasswordGroups.group_id"},
+        sa_relationship_kwargs={"lazy": "raise", "remote_side": "PasswordGroups.group_id"},
     )
     child_groups: list["PasswordGroups"] = Relationship(
-        back_populates="parent_group", sa_relationship_kwargs={"lazy": "selectin"}, passive_deletes="all"
+        back_populates="parent_group", sa_relationship_kwargs={"lazy": "raise"}, passive_deletes="all"
     )
 
     entries: list["PasswordEntry"] = Relationship(
-        back_populates="group", sa_relationship_kwargs={"lazy": "selectin"}, passive_deletes="all"
+        back_populates="group", sa_relationship_kwargs={"lazy": "raise"}, passive_deletes="all"
     )
 
 
 class PasswordEntry(SQLModel, table=True):
+    # Covers the keyset pagination order of `get_entries_by_group`
+    __table_args__ = (Index("ix_passwordentry_group_id_title_entry_id", "group_id", "title", "entry_id"),)
+
     entry_id: uuid.UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     title: str = Field(nullable=False, index=True)
 
     username: str = Field(nullable=False)
-    password: str = Field(nullable=False)  # keep this encrypted
+    password: str = Field(nullable=False)  # sealed by `VaultMethods`
 
     url: str | None = Field(default=None, nullable=True)
-    notes: str = Field(nullable=False)
+    notes: str = Field(nullable=False)  # sealed by `VaultMethods`
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(TZDateTime))
 
     group_id: uuid.UUID = Field(foreign_key="passwordgroups.group_id", ondelete="CASCADE")
-    group: PasswordGroups = Relationship(back_populates="entries", sa_relationship_kwargs={"lazy": "selectin"})
+    group: PasswordGroups = Relationship(back_populates="entries", sa_relationship_kwargs={"lazy": "raise"})
+
+
+# External content FTS5 index over `PasswordEntry`, kept in sync by triggers so every write path is covered.
+# It is not part of the SQLModel metadata, `MainDatabase` creates it after `create_all()`.
+# Notes are encrypted at rest, so only the plaintext columns are indexed.
+PasswordEntrySearch = table("passwordentry_fts", column("rowid"))
+ENTRY_SEARCH_COLUMNS: tuple[str, ...] = ("title", "username", "url")
+
+ENTRY_SEARCH_DDL: tuple[str, ...] = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS passwordentry_fts USING fts5(
+        title, username, url,
+        content='passwordentry', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passwordentry_fts_ai AFTER INSERT ON passwordentry BEGIN
+        INSERT INTO passwordentry_fts(rowid, title, username, url)
+        VALUES (new.rowid, new.title, new.username, new.url);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passwordentry_fts_ad AFTER DELETE ON passwordentry BEGIN
+        INSERT INTO passwordentry_fts(passwordentry_fts, rowid, title, username, url)
+        VALUES ('delete', old.rowid, old.title, old.username, old.url);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passwordentry_fts_au AFTER UPDATE OF title, username, url ON passwordentry
+    BEGIN
+        INSERT INTO passwordentry_fts(passwordentry_fts, rowid, title, username, url)
+        VALUES ('delete', old.rowid, old.title, old.username, old.url);
+        INSERT INTO passwordentry_fts(rowid, title, username, url)
+        VALUES (new.rowid, new.title, new.username, new.url);
+    END
+    """,
+)
+
+# Dropped when the index was created before a schema change, `MainDatabase` then recreates and rebuilds it
+ENTRY_SEARCH_DROP: tuple[str, ...] = (
+    "DROP TRIGGER IF EXISTS passwordentry_fts_ai",
+    "DROP TRIGGER IF EXISTS passwordentry_fts_ad",
+    "DROP TRIGGER IF EXISTS passwordentry_fts_au",
+    "DROP TABLE IF EXISTS passwordentry_fts",
+)
 
 
 class SyncConfig(SQLModel, table=True):
@@ -66,3 +121,38 @@ class SyncConfig(SQLModel, table=True):
 
     server_url: str | None = Field(default=None, nullable=True)
     sync_enabled: bool = Field(default=False)
+
+
+class VaultConfig(SQLModel, table=True):
+    """The vault key, encrypted with a key derived from the master password."""
+
+    id: int = Field(primary_key=True)
+
+    salt: bytes = Field(nullable=False)
+    kdf_params: str = Field(nullable=False)  # JSON
+
+    wrapped_key: bytes = Field(nullable=False)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(TZDateTime))
+
+
+class SyncState(SQLModel, table=True):
+    """Last synced revision of every group and entry pulled from the server."""
+
+    object_id: uuid.UUID = Field(primary_key=True)
+    object_type: str = Field(nullable=False, index=True)  # "group" or "entry"
+
+    revision: str = Field(nullable=False)
+    synced_at: datetime = Field(sa_column=Column(TZDateTime, nullable=False))
+
+
+class SyncOutbox(SQLModel, table=True):
+    """Mutations made while offline, replayed to the server in insertion order."""
+
+    id: int | None = Field(default=None, primary_key=True)
+    operation: str = Field(nullable=False)
+
+    object_id: uuid.UUID = Field(nullable=False, index=True)
+    parent_id: uuid.UUID | None = Field(default=None, nullable=True, index=True)
+
+    payload: str | None = Field(default=None, nullable=True)  # JSON, sealed by `VaultMethods`
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), sa_column=Column(TZDateTime))
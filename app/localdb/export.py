@@ -0,0 +1,184 @@
+"""Streams the local database out to backup files."""
+
+import csv
+import io
+import json
+import logging
+import threading
+import typing
+from collections.abc import Callable, Iterator
+from contextlib import closing
+from pathlib import Path
+
+from sqlalchemy import Engine, String, case, func, literal
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select, true
+
+from ..models.models import ExportFormat, ExportResult
+from .crypto import EncryptedArchiveWriter
+from .dbtables import PasswordEntry, PasswordGroups
+
+if typing.TYPE_CHECKING:
+    from .database import VaultMethods
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+DEFAULT_EXPORT_BATCH_SIZE: int = 1000
+
+# Joins group names in SQL, a control character that group names don't contain
+_PATH_SEPARATOR: str = "\x1f"
+
+EXPORT_FIELDS: tuple[str, ...] = ("group", "title", "username", "password", "url", "notes")
+
+# CSV group paths are split on the separator by the importer, names escape it the way the importer expects
+_GROUP_SEPARATOR: str = "/"
+_GROUP_ESCAPE: str = "\\"
+
+
+def _join_group_path(names: list[str]) -> str:
+    return _GROUP_SEPARATOR.join(
+        name.replace(_GROUP_ESCAPE, _GROUP_ESCAPE * 2).replace(_GROUP_SEPARATOR, _GROUP_ESCAPE + _GROUP_SEPARATOR)
+        for name in names
+    )
+
+
+def _iter_entry_rows(engine: Engine, vault: "VaultMethods", batch_size: int) -> Iterator[list[dict]]:
+    """Yields every entry with the path of its group, one batch at a time.
+
+    Group paths are built by a single recursive CTE and rows are streamed with `yield_per`,
+    so only one batch is ever held in memory. Passwords and notes are decrypted here.
+    """
+    with Session(engine) as session:
+        paths = (
+            select(PasswordGroups.group_id, literal("", String).label("path"))
+            .where(PasswordGroups.is_root == true())
+            .cte("group_paths", recursive=True)
+        )
+
+        child = aliased(PasswordGroups)
+        child_path = case(
+            (paths.c.path == "", child.group_name),
+            else_=paths.c.path + _PATH_SEPARATOR + child.group_name,
+        )
+        paths = paths.union_all(select(child.group_id, child_path).join(paths, child.parent_id == paths.c.group_id))
+
+        statement = (
+            select(
+                paths.c.path,
+                PasswordEntry.title,
+                PasswordEntry.username,
+                PasswordEntry.password,
+                PasswordEntry.url,
+                PasswordEntry.notes,
+            )
+            .join(paths, paths.c.group_id == PasswordEntry.group_id)
+            .execution_options(yield_per=batch_size)
+        )
+
+        result = session.exec(statement)
+        for partition in result.partitions():
+            yield [
+                {
+                    "group_path": path.split(_PATH_SEPARATOR) if path else [],
+                    "title": title,
+                    "username": username,
+                    "password": vault.reveal(password, "password"),
+                    "url": url,
+                    "notes": vault.reveal(notes, "notes"),
+                }
+                for path, title, username, password, url, notes in partition
+            ]
+
+
+class _CsvWriter:
+    """Writes rows with the same header the CSV importer reads."""
+
+    def __init__(self, file: typing.BinaryIO):
+        self.text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+
+        self.writer = csv.DictWriter(self.text, fieldnames=EXPORT_FIELDS)
+        self.writer.writeheader()
+
+    def write_rows(self, rows: list[dict]) -> None:
+        for row in rows:
+            row["group"] = _join_group_path(row.pop("group_path"))
+            self.writer.writerow(row)
+
+    def close(self) -> None:
+        self.text.flush()
+        self.text.detach()
+
+
+class _JsonLinesWriter:
+    """Writes one JSON object per entry, to the file or through an encrypted archive."""
+
+    def __init__(self, file: typing.BinaryIO | EncryptedArchiveWriter):
+        self.file = file
+
+    def write_rows(self, rows: list[dict]) -> None:
+        self.file.write("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+
+    def close(self) -> None:
+        if isinstance(self.file, EncryptedArchiveWriter):
+            self.file.close()
+
+
+def export_entries(
+    engine: Engine,
+    vault: "VaultMethods",
+    path: Path,
+    export_format: ExportFormat,
+    password: str | None = None,
+    batch_size: int = DEFAULT_EXPORT_BATCH_SIZE,
+    progress_callback: Callable[[int, int], None] | None = None,
+    cancel_event: threading.Event | None = None,
+) -> ExportResult:
+    """Writes every entry to `path` in batches, see `MainDatabase.export()`."""
+
+    if export_format == ExportFormat.encrypted and not password:
+        raise ValueError("a password is required for encrypted exports")
+
+    with Session(engine) as session:
+        total = session.exec(select(func.count()).select_from(PasswordEntry)).one()
+
+    # Write next to the target so a cancelled or failed export never leaves a partial backup behind
+    part_path = path.with_name(path.name + ".part")
+    result = ExportResult()
+
+    try:
+        with part_path.open("wb") as file:
+            match export_format:
+                case ExportFormat.csv:
+                    writer = _CsvWriter(file)
+                case ExportFormat.jsonl:
+                    writer = _JsonLinesWriter(file)
+                case ExportFormat.encrypted:
+                    writer = _JsonLinesWriter(EncryptedArchiveWriter(file, password))
+
+            with closing(_iter_entry_rows(engine, vault, batch_size)) as batches:
+                for rows in batches:
+                    if cancel_event is not None and cancel_event.is_set():
+                        result.cancelled = True
+                        break
+
+                    writer.write_rows(rows)
+                    result.entries_exported += len(rows)
+
+                    if progress_callback is not None:
+                        progress_callback(result.entries_exported, total)
+
+            writer.close()
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    if result.cancelled:
+        part_path.unlink(missing_ok=True)
+        logger.info("Export to '%s' cancelled after %d entries", path.name, result.entries_exported)
+
+        return result
+
+    part_path.replace(path)
+    logger.info("Exported %d entries to '%s'", result.entries_exported, path.name)
+
+    return result
@@ -0,0 +1,192 @@
+"""Runs every write to the local database on one thread, committing them in groups."""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+from sqlalchemy import Engine, event
+from sqlmodel import Session
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+T = TypeVar("T")
+
+DEFAULT_COMMIT_DELAY: float = 0.001  # seconds
+DEFAULT_COMMIT_SIZE: int = 500  # writes
+
+
+def _disable_implicit_transactions(dbapi_connection, connection_record):
+    # pysqlite starts transactions on its own and only before DML, which breaks savepoints
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(connection):
+    # Take the write lock up front, upgrading a read transaction can fail without waiting for `busy_timeout`
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class DatabaseWriter(threading.Thread):
+    """Serializes writes on a thread of its own, committing those queued close together at once.
+
+    SQLite allows one writer at a time, so writes from many threads only wait on each other's locks
+    and pay for a commit each. Here writes wait at most `max_delay` seconds for others to join them
+    and up to `max_batch` writes share a transaction, flushed once. When any of them fails the batch
+    is rolled back and written again with a savepoint per write, so only the failing writes are lost;
+    writes must not have side effects outside the session. Futures resolve once the batch is committed,
+    after `on_commit` is called.
+
+    `engine` must only be used by the writer, its connections are set up to start transactions explicitly.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        max_delay: float = DEFAULT_COMMIT_DELAY,
+        max_batch: int = DEFAULT_COMMIT_SIZE,
+        on_commit: Callable[[], None] | None = None,
+    ):
+        super().__init__(name="database-writer", daemon=True)
+
+        self.engine = engine
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+
+        # Called on this thread once a batch with at least one successful write is committed
+        self.on_commit = on_commit
+
+        event.listen(self.engine, "connect", _disable_implicit_transactions)
+        event.listen(self.engine, "begin", _begin_immediate)
+
+        self._queue: queue.SimpleQueue[tuple[Callable[[Session], Any], Future] | None] = queue.SimpleQueue()
+        self._session: Session | None = None  # batch being written, only used on this thread
+
+        self.batches: int = 0
+        self.writes: int = 0
+
+    def submit(self, func: Callable[[Session], T]) -> Future[T]:
+        """Queues `func` to run with the session of the next batch."""
+
+        if not self.is_alive():
+            raise RuntimeError("database writer is not running")
+
+        future: Future[T] = Future()
+        self._queue.put((func, future))
+
+        return future
+
+    def execute(self, func: Callable[[Session], T]) -> T:
+        """Runs `func` in the next batch and waits until it is committed.
+
+        Called from a write that is already running, `func` runs right away as part of it.
+        """
+        if threading.current_thread() is self:
+            return func(self._session)
+
+        return self.submit(func).result()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Commits what is queued and stops the thread."""
+
+        if not self.is_alive():
+            return
+
+        self._queue.put(None)
+        self.join(timeout)
+
+    def _next_batch(self) -> tuple[list[tuple[Callable[[Session], Any], Future]], bool]:
+        item = self._queue.get()
+        if item is None:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is None:
+                return batch, True
+
+            batch.append(item)
+
+        return batch, False
+
+    @staticmethod
+    def _write_all(session: Session, batch: list[tuple[Callable[[Session], Any], Future]]) -> list[tuple]:
+        results = [(future, func(session), None) for func, future in batch]
+        session.flush()
+
+        return results
+
+    @staticmethod
+    def _write_each(session: Session, batch: list[tuple[Callable[[Session], Any], Future]]) -> list[tuple]:
+        results = []
+        for func, future in batch:
+            try:
+                with session.begin_nested():
+                    result = func(session)
+            except Exception as exc:
+                results.append((future, None, exc))
+            else:
+                results.append((future, result, None))
+
+        return results
+
+    def _write_batch(self, batch: list[tuple[Callable[[Session], Any], Future]]) -> None:
+        batch = [(func, future) for func, future in batch if future.set_running_or_notify_cancel()]
+
+        with Session(self.engine) as session:
+            self._session = session
+            try:
+                try:
+                    results = self._write_all(session, batch)
+                except Exception:
+                    logger.debug("A write in a batch of %d failed, writing them one at a time", len(batch))
+
+                    session.rollback()
+                    results = self._write_each(session, batch)
+
+                session.commit()
+            except Exception as exc:
+                logger.error("Could not commit %d writes", len(batch), exc_info=exc)
+                for _, future in batch:
+                    future.set_exception(exc)
+
+                return
+            finally:
+                self._session = None
+
+        written = sum(exc is None for _, _, exc in results)
+
+        self.batches += 1
+        self.writes += written
+
+        if written and self.on_commit is not None:
+            # The batch is committed either way, callers waiting on it must not hang
+            try:
+                self.on_commit()
+            except Exception as exc:
+                logger.error("Commit callback failed", exc_info=exc)
+
+        for future, result, exc in results:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+
+        logger.debug("Database writer stopped after %d writes in %d batches", self.writes, self.batches)
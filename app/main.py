@@ -6,6 +6,7 @@ from PySide6.QtCore import QTimer
 from PySide6.QtGui import QCloseEvent
 from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox
 
+from . import workers
 from .config import AppSettings, setup_logger
 from .controllers.apps import AppsController
 from .ui.main import Ui_MainWindow
@@ -53,9 +54,14 @@ class MainWindow(QMainWindow):
             return
 
         setup_logger(self.app_settings.log_level)
+        workers.set_max_worker_count(self.app_settings.max_worker_threads)
+
         self.app_ctrl = AppsController(self)
 
     def closeEvent(self, event: QCloseEvent):
+        # Let running tasks finish before the database and client are closed under them
+        workers.shutdown()
+
         if self.app_ctrl:
             if self.app_ctrl.pw_tab.db is not None:
                 self.app_ctrl.pw_tab.db.close()
@@ -63,6 +69,8 @@ class MainWindow(QMainWindow):
             if self.app_ctrl.pw_tab.client is not None:
                 self.app_ctrl.pw_tab.client.close()
 
+        workers.stop_event_loop()
+
         event.accept()
         return super().closeEvent(event)
 
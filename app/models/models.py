@@ -1,5 +1,7 @@
 import uuid
 from datetime import UTC, datetime
+from enum import StrEnum
+from typing import NamedTuple
 
 from pydantic import AnyUrl, AwareDatetime, BaseModel, HttpUrl
 
@@ -31,6 +33,34 @@ class PasswordEntryData(PasswordEntryBase):
     created_at: AwareDatetime = datetime.now(UTC)
 
 
+class EntryRow(NamedTuple):
+    """Listed entry, only the displayed columns and IDs.
+
+    A plain tuple instead of a `PasswordEntryData` so listing thousands of entries skips validation,
+    the password and notes are fetched by ID when an entry is selected. Fields are in column order.
+    """
+
+    title: str
+    username: str
+    url: str | None
+    created_at: datetime
+
+    entry_id: uuid.UUID
+    group_id: uuid.UUID
+
+    @classmethod
+    def from_entry(cls, entry: PasswordEntryData) -> "EntryRow":
+        url = str(entry.url) if entry.url else None
+        return cls(entry.title, entry.username, url, entry.created_at, entry.entry_id, entry.group_id)
+
+
+class EntryCursor(BaseModel):
+    """Position after the last entry of a page, entries are ordered by title then ID."""
+
+    title: str
+    entry_id: uuid.UUID
+
+
 # TODO: Extend this when adding metadata
 class AddPasswordGroup(BaseModel):
     group_name: str
@@ -70,3 +100,98 @@ class SavedSyncInfo(SyncBase):
     server_url: HttpUrl
     access_token: str
     sync_enabled: bool
+
+
+# Sync engine
+class SyncChangeset(BaseModel):
+    """Changes pulled from the server, applied to the local database in one transaction."""
+
+    replace_root: GroupParentData | None = None
+
+    upsert_groups: list[GroupParentData] = []
+    upsert_entries: list[PasswordEntryData] = []
+
+    delete_group_ids: list[uuid.UUID] = []
+    delete_entry_ids: list[uuid.UUID] = []
+
+    # Object ID -> (object type, revision)
+    revisions: dict[uuid.UUID, tuple[str, str]] = {}
+
+
+class SyncResult(BaseModel):
+    groups_changed: int
+    entries_changed: int
+
+    groups_deleted: int
+    entries_deleted: int
+
+    synced_at: AwareDatetime
+    outbox_flushed: int = 0
+
+
+# Outbox
+class OutboxOperationType(StrEnum):
+    create_entry = "create_entry"
+    update_entry = "update_entry"
+    delete_entry = "delete_entry"
+
+    create_group = "create_group"
+    delete_group = "delete_group"
+
+
+class OutboxOperation(BaseModel):
+    """A local mutation waiting to be replayed to the server."""
+
+    operation: OutboxOperationType
+    object_id: uuid.UUID
+
+    # Group of an entry, or parent of a group
+    parent_id: uuid.UUID | None
+
+    # Title, username, etc for entries, group name for groups
+    payload: dict | None = None
+
+    # Outbox rows this operation was coalesced from
+    source_ids: list[int] = []
+
+
+# Importers
+class ImportFormat(StrEnum):
+    csv = "csv"
+    json = "json"
+    keepass_xml = "keepass_xml"
+    encrypted = "encrypted"  # JSON lines in an archive written by the encrypted export
+
+
+class ImportedEntry(BaseModel):
+    """An entry read from another password manager's export, before it is written locally."""
+
+    # Group names below the group the entries are imported into
+    group_path: list[str] = []
+
+    title: str
+    username: str = ""
+
+    password: str = ""
+    url: str | None = None
+
+    notes: str = ""
+
+
+class ImportResult(BaseModel):
+    groups_created: int = 0
+    entries_imported: int = 0
+
+    cancelled: bool = False
+
+
+# Exporters
+class ExportFormat(StrEnum):
+    csv = "csv"
+    jsonl = "jsonl"
+    encrypted = "encrypted"
+
+
+class ExportResult(BaseModel):
+    entries_exported: int = 0
+    cancelled: bool = False
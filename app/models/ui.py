@@ -4,10 +4,10 @@ import uuid
 from datetime import datetime
 from pathlib import Path
 
-from pydantic import AnyUrl
-from PySide6.QtCore import QAbstractListModel, QAbstractTableModel, QAbstractItemModel, QModelIndex, Qt
+from PySide6.QtCore import QAbstractListModel, QAbstractTableModel, QAbstractItemModel, QModelIndex, Qt, Signal
+from PySide6.QtGui import QColor
 
-from .models import GroupChildrenData, GroupParentData, PasswordEntryData
+from .models import EntryCursor, EntryRow, GroupChildrenData, GroupParentData, PasswordEntryData
 
 if typing.TYPE_CHECKING:
     from ..controllers.tabs.databases import DatabasesTabController
@@ -16,41 +16,170 @@ if typing.TYPE_CHECKING:
 logger: logging.Logger = logging.getLogger("passwordmanager-client")
 
 
+class _EntryRowIndex:
+    """Entry rows in display order, with O(log n) lookups between entry IDs and row numbers.
+
+    Rows keep the slot they were appended in and removing one only leaves a hole, so no other slot moves.
+    A Fenwick tree counts the filled slots, the row of a slot is how many filled slots come before it.
+    Without holes slots are rows and lookups skip the tree, holes are compacted once they are half the slots.
+    """
+
+    def __init__(self):
+        self._slots: list[EntryRow | None] = []
+        self._slot_of: dict[uuid.UUID, int] = {}
+
+        self._tree: list[int] = [0]  # 1-based, counts filled slots
+        self._holes: int = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, entry_id: uuid.UUID) -> bool:
+        return entry_id in self._slot_of
+
+    def reset(self, rows: list[EntryRow]) -> None:
+        self._slots = list(rows)
+        self._slot_of = {row.entry_id: slot for slot, row in enumerate(self._slots)}
+
+        self._holes = 0
+        self._build_tree()
+
+    def _build_tree(self) -> None:
+        size = len(self._slots)
+        tree = [0] + [int(row is not None) for row in self._slots]
+
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+
+        self._tree = tree
+
+    def _filled_before(self, slot: int) -> int:
+        count = 0
+        i = slot
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+
+        return count
+
+    def append(self, row: EntryRow) -> int:
+        """Adds a row after the last one, returns its row number."""
+
+        # A new Fenwick node covers the nodes just before it, sum them instead of rebuilding
+        i = len(self._tree)
+        count = 1
+
+        child = i - 1
+        while child > i - (i & -i):
+            count += self._tree[child]
+            child -= child & -child
+
+        self._tree.append(count)
+
+        self._slot_of[row.entry_id] = len(self._slots)
+        self._slots.append(row)
+
+        return len(self._slot_of) - 1
+
+    def row_of(self, entry_id: uuid.UUID) -> int | None:
+        slot = self._slot_of.get(entry_id)
+        if slot is None or not self._holes:
+            return slot
+
+        return self._filled_before(slot)
+
+    def at(self, row: int) -> EntryRow:
+        if not self._holes:
+            return self._slots[row]
+
+        # Walk down the tree to the slot with `row` filled slots before it
+        slot = 0
+        remaining = row + 1
+
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            node = slot + step
+            if node < len(self._tree) and self._tree[node] < remaining:
+                slot = node
+                remaining -= self._tree[node]
+
+            step >>= 1
+
+        return self._slots[slot]
+
+    def replace(self, entry_id: uuid.UUID, row: EntryRow) -> None:
+        """Puts `row` in place of the entry, which may change its ID."""
+
+        slot = self._slot_of.pop(entry_id)
+        self._slot_of[row.entry_id] = slot
+
+        self._slots[slot] = row
+
+    def remove(self, entry_id: uuid.UUID) -> None:
+        slot = self._slot_of.pop(entry_id)
+        self._slots[slot] = None
+
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] -= 1
+            i += i & -i
+
+        self._holes += 1
+        if self._holes * 2 >= len(self._slots):
+            self.reset([row for row in self._slots if row is not None])
+
+
 class PasswordEntriesTableModel(QAbstractTableModel):
+    """Entries of the current group, loaded a page at a time as the view scrolls."""
+
+    moreEntriesRequested = Signal(EntryCursor)
+
     def __init__(self, /, parent: "PasswordEntriesController" = None):
         super().__init__(parent)
         self.pw_ctrl = parent
 
-        self._display_data: list[list[str | datetime]] = []
-        self._item_data: list[PasswordEntryData] = []
-
-        self._idx_lookup: dict[uuid.UUID, int] = {}
+        # Rows hold their cells in column order, the full entry is fetched by ID when selected
+        self._rows = _EntryRowIndex()
         self._col_headers: list[str] = ["Title", "Username", "URL", "Created At"]
 
+        # Entries whose local edit was rejected by the server
+        self._conflicted: set[uuid.UUID] = set()
+
+        # Position of the last fetched page, entries added locally don't move it
+        self._cursor: EntryCursor | None = None
+        self._fetching: bool = False
+
     def rowCount(self, /, parent: QModelIndex = None):
-        return len(self._item_data)
+        return len(self._rows)
 
     def columnCount(self, /, parent: QModelIndex = None):
         return len(self._col_headers)
 
     def data(self, index, /, role):
+        entry = self._rows.at(index.row())
         if role == Qt.ItemDataRole.UserRole:
-            return self._item_data[index.row()]
+            return entry
 
         if role == Qt.ItemDataRole.DisplayRole:
-            value = self._display_data[index.row()][index.column()]
+            value = entry[index.column()]
             if isinstance(value, datetime):
                 return value.strftime("%x %X")
 
-            if isinstance(value, AnyUrl):
-                return str(value)
-
             if value is None:
                 logger.debug("Received 'None' value at cell [%d, %d]", index.row(), index.column())
                 return ""
 
             return value
 
+        if entry.entry_id in self._conflicted:
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(Qt.GlobalColor.red)
+
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return "This change was rejected by the server and will be replaced on the next sync"
+
         return None
 
     def headerData(self, section, orientation, /, role):
@@ -63,56 +192,128 @@ class PasswordEntriesTableModel(QAbstractTableModel):
         if orientation == Qt.Orientation.Vertical:
             return super().headerData(section, orientation, role)
 
-    def load_entries(self, entries: list[PasswordEntryData]):
-        self.beginResetModel()
+    def canFetchMore(self, parent: QModelIndex):
+        if parent.isValid():
+            return False
 
-        self._display_data.clear()
-        self._item_data.clear()
+        return self._cursor is not None and not self._fetching
 
-        self._idx_lookup.clear()
-        logger.debug("Cleared all password entries")
+    def fetchMore(self, parent: QModelIndex):
+        if not self.canFetchMore(parent):
+            return
 
-        for entry in entries:
-            display_data = [entry.title, entry.username, entry.url, entry.created_at]
-            self._display_data.append(display_data)
+        self._fetching = True
+        self.moreEntriesRequested.emit(self._cursor)
 
-            self._item_data.append(entry)
-            self._idx_lookup[entry.entry_id] = self._item_data.index(entry)
+    def fetch_more_failed(self):
+        """Lets the view ask for the next page again after fetching it failed."""
 
-        logger.debug("Added %d entries to password entry model", len(self._item_data))
+        self._fetching = False
+
+    def _update_cursor(self, entries: list[EntryRow], has_more: bool):
+        self._fetching = False
+        if not has_more or not entries:
+            self._cursor = None
+            return
+
+        last = entries[-1]
+        self._cursor = EntryCursor(title=last.title, entry_id=last.entry_id)
+
+    def load_entries(self, entries: list[EntryRow], has_more: bool = False):
+        """Replaces every entry, `has_more` tells the view it can fetch the page after `entries`."""
+
+        self.beginResetModel()
+
+        self._rows.reset(entries)
+        self._conflicted.clear()
+
+        self._update_cursor(entries, has_more)
+
+        logger.debug("Added %d entries to password entry model", len(self._rows))
         self.endResetModel()
 
+    def append_entries(self, entries: list[EntryRow], has_more: bool = False):
+        """Appends the next page fetched through `moreEntriesRequested`."""
+
+        # The model was reloaded while this page was being fetched
+        if not self._fetching:
+            logger.debug("Discarding stale page of %d entries", len(entries))
+            return
+
+        new_entries = [entry for entry in entries if entry.entry_id not in self._rows]
+        if new_entries:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_entries) - 1)
+
+            for entry in new_entries:
+                self._rows.append(entry)
+
+            self.endInsertRows()
+
+        self._update_cursor(entries, has_more)
+        logger.debug("Appended %d entries to password entry model", len(new_entries))
+
     def add_entry(self, entry: PasswordEntryData):
-        display_data = [entry.title, entry.username, entry.url, entry.created_at]
+        # Restoring an entry that is still listed
+        if entry.entry_id in self._rows:
+            self.update_entry(entry)
+            return
 
-        self._item_data.append(entry)
-        self._display_data.append(display_data)
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
 
-        self._idx_lookup[entry.entry_id] = self._item_data.index(entry)
-        self.layoutChanged.emit()
+        self._rows.append(EntryRow.from_entry(entry))
+        self.endInsertRows()
 
-    def delete_entry(self, data: PasswordEntryData):
-        row = self._idx_lookup.get(data.entry_id, None)
+    def delete_entry(self, data: PasswordEntryData | EntryRow):
+        row = self._rows.row_of(data.entry_id)
         if row is None:
             logger.warning("Entry ID '%s' not in model", data.entry_id)
             return
 
-        del self._item_data[row]
-        del self._display_data[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
 
-        del self._idx_lookup[data.entry_id]
-        self.layoutChanged.emit()
+        self._rows.remove(data.entry_id)
+        self._conflicted.discard(data.entry_id)
+
+        self.endRemoveRows()
 
     def update_entry(self, data: PasswordEntryData):
-        row = self._idx_lookup.get(data.entry_id, None)
+        row = self._rows.row_of(data.entry_id)
         if row is None:
             logger.warning("Entry ID '%s' not in model", data.entry_id)
             return
 
-        display_data = [data.title, data.username, data.url, data.created_at]
+        self._rows.replace(data.entry_id, EntryRow.from_entry(data))
+        self._conflicted.discard(data.entry_id)
+
+        top = self.index(row, 0)
+        bottom = self.index(row, self.columnCount() - 1)
+
+        self.dataChanged.emit(top, bottom)
+
+    def replace_entry_id(self, old_id: uuid.UUID, data: PasswordEntryData):
+        """Swaps a locally generated entry ID for the one the server assigned."""
+
+        row = self._rows.row_of(old_id)
+        if row is None:
+            logger.debug("Entry ID '%s' not in model", old_id)
+            return
 
-        self._item_data[row] = data
-        self._display_data[row] = display_data
+        self._rows.replace(old_id, EntryRow.from_entry(data))
+
+        top = self.index(row, 0)
+        bottom = self.index(row, self.columnCount() - 1)
+
+        self.dataChanged.emit(top, bottom)
+
+    def mark_conflicted(self, data: PasswordEntryData):
+        row = self._rows.row_of(data.entry_id)
+        if row is None:
+            logger.debug("Entry ID '%s' not in model", data.entry_id)
+            return
+
+        self._conflicted.add(data.entry_id)
 
         top = self.index(row, 0)
         bottom = self.index(row, self.columnCount() - 1)
@@ -164,14 +365,24 @@ class PasswordGroupItem:
         self.parent_item = parent
         self.child_items = []
 
+        # Position among the parent's children, Qt asks for it on every `parent()` call
+        self._row: int = 0
         self._invis_root: bool = root
 
         self._item_data: GroupParentData = data
         self._display_data: list = [data.group_name] if data else None
 
     def append_child(self, item: "PasswordGroupItem"):
+        item._row = len(self.child_items)
         self.child_items.append(item)
 
+    def remove_child(self, row: int) -> "PasswordGroupItem":
+        item = self.child_items.pop(row)
+        for sibling in self.child_items[row:]:
+            sibling._row -= 1
+
+        return item
+
     def child(self, row: int):
         return self.child_items[row]
 
@@ -194,9 +405,7 @@ class PasswordGroupItem:
         return self.parent_item
 
     def row(self):
-        if self.parent_item:
-            return self.parent_item.child_items.index(self)
-        return 0
+        return self._row
 
 
 class PasswordGroupsTreeModel(QAbstractItemModel):
@@ -263,30 +472,92 @@ class PasswordGroupsTreeModel(QAbstractItemModel):
         else:
             return QModelIndex()
 
+    def load_tree(self, groups: list[GroupParentData]):
+        """Replaces the whole tree in a single model reset.
+
+        The first group becomes the top-level item, every group after it must come after its parent.
+        """
+        self.beginResetModel()
+
+        self._invis_root_item = PasswordGroupItem(None, parent=None, root=True)
+        self._items_by_id.clear()
+
+        for i, group in enumerate(groups):
+            parent_item = self._invis_root_item if i == 0 else self.item_by_id(group.parent_id)
+            if not parent_item:
+                logger.warning("Invalid parent group ID '%s'", group.parent_id)
+                continue
+
+            item = PasswordGroupItem(group, parent=parent_item)
+            parent_item.append_child(item)
+
+            self._items_by_id[group.group_id] = item
+
+        logger.debug("Loaded %d groups into groups model", len(self._items_by_id))
+        self.endResetModel()
+
+    def _index_of(self, item: PasswordGroupItem) -> QModelIndex:
+        if item is self._invis_root_item:
+            return QModelIndex()
+
+        return self.createIndex(item.row(), 0, item)
+
     def add_root_group(self, group: GroupParentData):
+        row = self._invis_root_item.child_count()
+        self.beginInsertRows(QModelIndex(), row, row)
+
         item = PasswordGroupItem(group, parent=self._invis_root_item)
         self._invis_root_item.append_child(item)
 
         self._items_by_id[group.group_id] = item
-        self.layoutChanged.emit()
+        self.endInsertRows()
 
     def add_group(self, group: GroupParentData | GroupChildrenData):
-        parent_item = self.item_by_id(group.parent_id)
-        if not parent_item:
-            logger.warning("Invalid parent group ID '%s'", group.parent_id)
-            logger.warning("%s", group.model_dump_json(indent=4))
-            return
+        self.add_groups([group])
 
-        if not self._items_by_id.get(group.group_id):
-            item = PasswordGroupItem(group, parent=parent_item)
-            parent_item.append_child(item)
+    def add_groups(self, groups: list[GroupParentData | GroupChildrenData]) -> int:
+        """Adds groups under parents already in the tree, returns how many were added.
 
-            self._items_by_id[group.group_id] = item
-            logger.debug("Added group ID '%s' to model", group.group_id)
-        else:
-            logger.debug("Group ID '%s' already exists, not duplicating", group.group_id)
+        A group may also be the child of one added before it in `groups`, whole subtrees go in with
+        one `rowsInserted` per parent that was already in the tree.
+        """
+        new_items: dict[uuid.UUID, PasswordGroupItem] = {}
+        pending: dict[PasswordGroupItem, list[PasswordGroupItem]] = {}
+
+        for group in groups:
+            if group.group_id in self._items_by_id or group.group_id in new_items:
+                logger.debug("Group ID '%s' already exists, not duplicating", group.group_id)
+                continue
+
+            # Children of new groups are attached right away, they are inserted along with their parent
+            parent_item = new_items.get(group.parent_id)
+            if parent_item is not None:
+                item = PasswordGroupItem(group, parent=parent_item)
+                parent_item.append_child(item)
+            else:
+                parent_item = self.item_by_id(group.parent_id)
+                if not parent_item:
+                    logger.warning("Invalid parent group ID '%s'", group.parent_id)
+                    continue
+
+                item = PasswordGroupItem(group, parent=parent_item)
+                pending.setdefault(parent_item, []).append(item)
+
+            new_items[group.group_id] = item
+
+        for parent_item, items in pending.items():
+            first = parent_item.child_count()
+            self.beginInsertRows(self._index_of(parent_item), first, first + len(items) - 1)
+
+            for item in items:
+                parent_item.append_child(item)
 
-        self.layoutChanged.emit()
+            self.endInsertRows()
+
+        self._items_by_id.update(new_items)
+        logger.debug("Added %d groups to model", len(new_items))
+
+        return len(new_items)
 
     def remove_group(self, group: GroupParentData):
         parent_item = self.item_by_id(group.parent_id)
@@ -296,14 +567,29 @@ class PasswordGroupsTreeModel(QAbstractItemModel):
             logger.warning("Invalid parent group ID '%s'", group.parent_id)
             return False
 
-        row = parent_item.child_items.index(item)
-        parent_index = self.createIndex(parent_item.row(), 0, parent_item)
+        if not item:
+            logger.warning("Group ID '%s' not in model", group.group_id)
+            return False
+
+        row = item.row()
+        self.beginRemoveRows(self._index_of(parent_item), row, row)
 
-        self.beginRemoveRows(parent_index, row, row)
-        parent_item.child_items.pop(row)
+        parent_item.remove_child(row)
+
+        # Forget the whole subtree, its groups were deleted with it
+        stack = [item]
+        while stack:
+            removed = stack.pop()
+            self._items_by_id.pop(removed.data().group_id, None)
+
+            stack.extend(removed.child_items)
 
         self.endRemoveRows()
         return True
 
     def item_by_id(self, group_id: uuid.UUID) -> PasswordGroupItem | None:
         return self._items_by_id.get(group_id, None)
+
+    def index_by_id(self, group_id: uuid.UUID) -> QModelIndex:
+        item = self._items_by_id.get(group_id, None)
+        return self._index_of(item) if item is not None else QModelIndex()
@@ -1,5 +1,9 @@
+import asyncio
+import importlib.util
 import logging
 import uuid
+from collections.abc import Awaitable
+from typing import TypeVar
 
 import httpx
 from pydantic import TypeAdapter
@@ -22,35 +26,88 @@ from ..client.api.groups import retrieve_top_level_groups_api_groups_get as api_
 from ..client.api.groups import retrieve_root_group_info_api_groups_info_get as api_get_root_group_info
 from ..client.api.groups import retrieve_group_info_api_groups_group_id_info_get as api_get_group_info
 
+from ..client.errors import UnexpectedStatus
 from ..client.models import UserInfoPublic
 from ..client.types import Response
 
+from ..config import HttpClientSettings
+
 # models
-from ..models.models import EditedEntryWithID, EditedPasswordEntryInfo, SavedSyncInfo
+from ..models.models import (
+    EditedEntryWithID,
+    EditedPasswordEntryInfo,
+    GroupParentData,
+    PasswordEntryData,
+    SavedSyncInfo,
+)
+from ..workers import run_coroutine
 from . import models as pd_models  # Generated Pydantic models
 
 logger: logging.Logger = logging.getLogger("passwordmanager-client")
 DEFAULT_CHUNK_SIZE: int = 25 * 1024 * 1024  # 25 MiB
 
+DEFAULT_MAX_CONCURRENCY: int = 8
+T = TypeVar("T")
+
+# List responses are validated straight from the response bytes into the app's models,
+# skipping the generated attrs models and the Pydantic models built from them
+entry_list_adapter: TypeAdapter[list[PasswordEntryData]] = TypeAdapter(list[PasswordEntryData])
+group_list_adapter: TypeAdapter[list[GroupParentData]] = TypeAdapter(list[GroupParentData])
+
+
+def _response_content(response: httpx.Response) -> bytes:
+    if response.status_code != 200:
+        raise UnexpectedStatus(response.status_code, response.content)
+
+    return response.content
+
 
 class SyncClient:
     """Abstraction to syncing with the server, separating the local database and the server sync."""
 
-    def __init__(self, enabled: bool = True):
+    def __init__(self, enabled: bool = True, settings: HttpClientSettings | None = None):
         self.auth_client: AuthenticatedClient = None
+        self.aio: AsyncSyncClient | None = None
+
         self.enabled: bool = enabled
 
+        self.settings: HttpClientSettings = settings if settings is not None else HttpClientSettings()
+
     def setup(self, sync_info: SavedSyncInfo) -> None:
         if not self.enabled:
             raise RuntimeError("client is explicitly disabled, cannot setup")
 
+        http2 = self.settings.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 is enabled but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+
+        # Shared by the sync and async clients, so bursts of requests reuse a few warm connections
+        timeout = httpx.Timeout(
+            connect=self.settings.connect_timeout,
+            read=self.settings.read_timeout,
+            write=self.settings.write_timeout,
+            pool=self.settings.pool_timeout,
+        )
+        limits = httpx.Limits(
+            max_connections=self.settings.max_connections,
+            max_keepalive_connections=self.settings.max_keepalive_connections,
+            keepalive_expiry=self.settings.keepalive_expiry,
+        )
+
         self.auth_client: AuthenticatedClient = AuthenticatedClient(
             str(sync_info.server_url),
             sync_info.access_token,
             raise_on_unexpected_status=True,
-            timeout=30,
-            httpx_args={"event_hooks": {"request": [self.log_request], "response": [self.log_response]}},
+            timeout=timeout,
+            httpx_args={"limits": limits, "http2": http2},
         )
+
+        # Set per client, httpx.AsyncClient awaits its hooks
+        self.auth_client.get_httpx_client().event_hooks = {
+            "request": [self.log_request],
+            "response": [self.log_response],
+        }
         data: Response[UserInfoPublic] = auth_test.sync_detailed(client=self.auth_client)
 
         if data.parsed is None:
@@ -62,6 +119,7 @@ class SyncClient:
         self.groups = PasswordGroupMethods(self)
         self.entries = PasswordEntryMethods(self)
 
+        self.aio = AsyncSyncClient(self, max_concurrency=self.settings.max_concurrency)
         return
 
     def log_request(self, req: httpx.Request):
@@ -86,14 +144,55 @@ class SyncClient:
             self.auth_client.get_httpx_client().close()
             logger.debug("Closed HTTP client")
 
+        # Only created once setup succeeds
+        if self.aio is not None:
+            self.aio.close()
+
+
+class AsyncSyncClient:
+    """Async counterpart of `SyncClient`, every coroutine runs on the shared event loop thread.
+
+    Fan-out methods send one request per group concurrently, at most `max_concurrency` at a time.
+    """
+
+    def __init__(self, parent: SyncClient, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.parent = parent
+        self.auth_client = parent.auth_client
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.auth_client.get_async_httpx_client().event_hooks = {
+            "request": [self.log_request],
+            "response": [self.log_response],
+        }
+
+        self.groups = AsyncPasswordGroupMethods(self)
+        self.entries = AsyncPasswordEntryMethods(self)
+
+    async def log_request(self, req: httpx.Request):
+        self.parent.log_request(req)
+
+    async def log_response(self, res: httpx.Response):
+        self.parent.log_response(res)
+
+    async def _limited(self, aw: Awaitable[T]) -> T:
+        async with self._semaphore:
+            return await aw
+
+    async def gather(self, *aws: Awaitable[T]) -> list[T]:
+        """Like `asyncio.gather`, but never runs more than `max_concurrency` requests at once."""
+
+        return await asyncio.gather(*(self._limited(aw) for aw in aws))
+
+    def close(self):
+        run_coroutine(self.auth_client.get_async_httpx_client().aclose()).result()
+        logger.debug("Closed async HTTP client")
+
 
 class PasswordGroupMethods:
     def __init__(self, parent: SyncClient):
         self.parent = parent
         self.auth_client = parent.auth_client
 
-        self.list_of_children: TypeAdapter = TypeAdapter(list[pd_models.GroupPublicChildren])
-
     def create_group(self, group_name: str, parent_id: uuid.UUID) -> pd_models.GroupPublicGet:
         body = api_models.GroupCreate(group_name=group_name, parent_id=parent_id)
         data: api_models.GroupPublicGet = api_create_group.sync(client=self.auth_client, body=body)
@@ -102,19 +201,13 @@ class PasswordGroupMethods:
         model = pd_models.GroupPublicGet.model_validate(data, from_attributes=True)
         return model
 
-    def get_children_of_root(self) -> list[pd_models.GroupPublicChildren]:
-        data: list[api_models.GroupPublicChildren] = api_get_root_group.sync(client=self.auth_client)
-        assert data is not None
+    def get_children_of_root(self) -> list[GroupParentData]:
+        response = self.auth_client.get_httpx_client().request(**api_get_root_group._get_kwargs())
+        return group_list_adapter.validate_json(_response_content(response))
 
-        models = self.list_of_children.validate_python(data, from_attributes=True)
-        return models
-
-    def get_children_of_group(self, group_id: uuid.UUID) -> list[pd_models.GroupPublicChildren]:
-        data = api_get_group.sync(group_id, client=self.auth_client)
-        assert data is not None
-
-        models = self.list_of_children.validate_python(data, from_attributes=True)
-        return models
+    def get_children_of_group(self, group_id: uuid.UUID) -> list[GroupParentData]:
+        response = self.auth_client.get_httpx_client().request(**api_get_group._get_kwargs(group_id))
+        return group_list_adapter.validate_json(_response_content(response))
 
     def delete_group(self, group_id: uuid.UUID) -> pd_models.GenericSuccess:
         data: api_models.GenericSuccess = api_delete_group.sync(group_id, client=self.auth_client)
@@ -155,18 +248,11 @@ class PasswordEntryMethods:
         model = pd_models.EntryPublicGet.model_validate(api_data, from_attributes=True)
         return model
 
-    def get_entries_by_group(
-        self, group_id: uuid.UUID, amount: int = 100, offset: int = 0
-    ) -> list[pd_models.EntryPublicGet]:
-        data: list[api_models.EntryPublicGet] = api_get_entries.sync(
-            group_id, client=self.auth_client, amount=amount, offset=offset
-        )
-        assert data is not None
-
-        ta = TypeAdapter(list[pd_models.EntryPublicGet])
-        models = ta.validate_python(data, from_attributes=True)
+    def get_entries_by_group(self, group_id: uuid.UUID, amount: int = 100, offset: int = 0) -> list[PasswordEntryData]:
+        kwargs = api_get_entries._get_kwargs(group_id, amount=amount, offset=offset)
+        response = self.auth_client.get_httpx_client().request(**kwargs)
 
-        return models
+        return entry_list_adapter.validate_json(_response_content(response))
 
     def delete_entry_by_id(self, entry_id: uuid.UUID, group_id: uuid.UUID) -> pd_models.GenericSuccess:
         data: api_models.GenericSuccess = api_delete_entry.sync(group_id, entry_id, client=self.auth_client)
@@ -188,3 +274,107 @@ class PasswordEntryMethods:
 
         model = pd_models.EntryPublicGet.model_validate(api_data, from_attributes=True)
         return model
+
+
+class AsyncPasswordGroupMethods:
+    def __init__(self, parent: AsyncSyncClient):
+        self.parent = parent
+        self.auth_client = parent.auth_client
+
+    async def create_group(self, group_name: str, parent_id: uuid.UUID) -> pd_models.GroupPublicGet:
+        body = api_models.GroupCreate(group_name=group_name, parent_id=parent_id)
+        data: api_models.GroupPublicGet = await api_create_group.asyncio(client=self.auth_client, body=body)
+        assert data is not None
+
+        model = pd_models.GroupPublicGet.model_validate(data, from_attributes=True)
+        return model
+
+    async def get_children_of_root(self) -> list[GroupParentData]:
+        response = await self.auth_client.get_async_httpx_client().request(**api_get_root_group._get_kwargs())
+        return group_list_adapter.validate_json(_response_content(response))
+
+    async def get_children_of_group(self, group_id: uuid.UUID) -> list[GroupParentData]:
+        response = await self.auth_client.get_async_httpx_client().request(**api_get_group._get_kwargs(group_id))
+        return group_list_adapter.validate_json(_response_content(response))
+
+    async def get_children_of_groups(self, group_ids: list[uuid.UUID]) -> dict[uuid.UUID, list[GroupParentData]]:
+        results = await self.parent.gather(*(self.get_children_of_group(group_id) for group_id in group_ids))
+        return dict(zip(group_ids, results, strict=True))
+
+    async def delete_group(self, group_id: uuid.UUID) -> pd_models.GenericSuccess:
+        data: api_models.GenericSuccess = await api_delete_group.asyncio(group_id, client=self.auth_client)
+        assert data is not None
+
+        model: pd_models.GenericSuccess = pd_models.GenericSuccess.model_validate(data, from_attributes=True)
+        return model
+
+    async def get_root_info(self) -> pd_models.GroupPublicGet:
+        data = await api_get_root_group_info.asyncio(client=self.auth_client)
+        assert data is not None
+
+        models = pd_models.GroupPublicGet.model_validate(data, from_attributes=True)
+        return models
+
+    async def get_group_info(self, group_id: uuid.UUID) -> pd_models.GroupPublicGet:
+        data = await api_get_group_info.asyncio(group_id, client=self.auth_client)
+        assert data is not None
+
+        models = pd_models.GroupPublicGet.model_validate(data, from_attributes=True)
+        return models
+
+
+class AsyncPasswordEntryMethods:
+    def __init__(self, parent: AsyncSyncClient):
+        self.parent = parent
+        self.auth_client = parent.auth_client
+
+    async def create_entry(self, group_id: uuid.UUID, data: EditedPasswordEntryInfo) -> pd_models.EntryPublicGet:
+        url_or_none = str(data.url) if data.url else None
+
+        body: api_models.EntryCreate = api_models.EntryCreate(
+            title=data.title, username=data.username, password=data.password, url=url_or_none, notes=data.notes
+        )
+        api_data: api_models.EntryPublicGet = await api_create_entry.asyncio(
+            group_id, client=self.auth_client, body=body
+        )
+        assert api_data is not None
+
+        model = pd_models.EntryPublicGet.model_validate(api_data, from_attributes=True)
+        return model
+
+    async def get_entries_by_group(
+        self, group_id: uuid.UUID, amount: int = 100, offset: int = 0
+    ) -> list[PasswordEntryData]:
+        kwargs = api_get_entries._get_kwargs(group_id, amount=amount, offset=offset)
+        response = await self.auth_client.get_async_httpx_client().request(**kwargs)
+
+        return entry_list_adapter.validate_json(_response_content(response))
+
+    async def get_entries_of_groups(
+        self, group_ids: list[uuid.UUID], amount: int = 100, offset: int = 0
+    ) -> dict[uuid.UUID, list[PasswordEntryData]]:
+        results = await self.parent.gather(
+            *(self.get_entries_by_group(group_id, amount=amount, offset=offset) for group_id in group_ids)
+        )
+        return dict(zip(group_ids, results, strict=True))
+
+    async def delete_entry_by_id(self, entry_id: uuid.UUID, group_id: uuid.UUID) -> pd_models.GenericSuccess:
+        data: api_models.GenericSuccess = await api_delete_entry.asyncio(group_id, entry_id, client=self.auth_client)
+        assert data is not None
+
+        model = pd_models.GenericSuccess.model_validate(data, from_attributes=True)
+        return model
+
+    async def update_entry_data(self, entry_id: uuid.UUID, data: EditedEntryWithID) -> pd_models.EntryPublicGet:
+        url_or_none = str(data.url) if data.url else None
+
+        body: api_models.EntryUpdate = api_models.EntryUpdate(
+            title=data.title, username=data.username, password=data.password, url=url_or_none, notes=data.notes
+        )
+        api_data: api_models.EntryPublicGet = await api_update_entry.asyncio(
+            data.group_id, entry_id, client=self.auth_client, body=body
+        )
+        assert api_data is not None
+
+        model = pd_models.EntryPublicGet.model_validate(api_data, from_attributes=True)
+        return model
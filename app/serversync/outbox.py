@@ -0,0 +1,144 @@
+"""Replays mutations made while offline to the server."""
+
+import logging
+import uuid
+
+from ..client.errors import UnexpectedStatus
+from ..localdb.database import MainDatabase
+from ..models.models import EditedEntryWithID, EditedPasswordEntryInfo, OutboxOperation, OutboxOperationType
+from .client import SyncClient
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+_CREATE_OPS = (OutboxOperationType.create_entry, OutboxOperationType.create_group)
+_DELETE_OPS = (OutboxOperationType.delete_entry, OutboxOperationType.delete_group)
+
+
+def coalesce_operations(operations: list[OutboxOperation]) -> tuple[list[OutboxOperation], list[int]]:
+    """Collapses the pending operations into at most one per object.
+
+    A create followed by updates becomes a single create with the latest data, updates are squashed into
+    the last one and anything followed by a delete becomes the delete. An object created and deleted
+    while offline disappears entirely, along with everything that was created inside it.
+
+    Returns the operations to replay and the outbox rows that need no replay at all.
+    """
+    merged: dict[uuid.UUID, OutboxOperation | None] = {}
+    source_ids: dict[uuid.UUID, list[int]] = {}
+
+    for op in operations:
+        current = merged.get(op.object_id)
+        source_ids.setdefault(op.object_id, []).extend(op.source_ids)
+
+        if op.operation in _CREATE_OPS:
+            merged[op.object_id] = op
+        elif op.operation == OutboxOperationType.update_entry:
+            if current is not None and current.operation == OutboxOperationType.create_entry:
+                merged[op.object_id] = current.model_copy(update={"payload": op.payload})
+            else:
+                merged[op.object_id] = op
+        elif op.operation in _DELETE_OPS:
+            if current is not None and current.operation in _CREATE_OPS:
+                merged[op.object_id] = None  # never reached the server
+            else:
+                merged[op.object_id] = op
+
+    # Objects inside a group that never reached the server can't be replayed either
+    dropped: set[uuid.UUID] = {object_id for object_id, op in merged.items() if op is None}
+    coalesced: list[OutboxOperation] = []
+
+    for object_id, op in merged.items():
+        if op is None:
+            continue
+
+        if op.parent_id in dropped:
+            dropped.add(object_id)
+            continue
+
+        coalesced.append(op.model_copy(update={"source_ids": source_ids[object_id]}))
+
+    dropped_source_ids = [i for object_id in dropped for i in source_ids[object_id]]
+    return coalesced, dropped_source_ids
+
+
+class OutboxFlusher:
+    """Replays the outbox to the server in batches, re-keying objects the server assigned new IDs to."""
+
+    def __init__(self, db: MainDatabase, client: SyncClient, batch_size: int = 50):
+        if not client.enabled:
+            raise RuntimeError("cannot flush the outbox with a disabled client")
+
+        self.db = db
+        self.client = client
+
+        self.batch_size = batch_size
+
+    def _replay(self, op: OutboxOperation, id_map: dict[uuid.UUID, uuid.UUID]) -> None:
+        object_id = id_map.get(op.object_id, op.object_id)
+        parent_id = id_map.get(op.parent_id, op.parent_id)
+
+        match op.operation:
+            case OutboxOperationType.create_entry:
+                data = EditedPasswordEntryInfo(group_id=parent_id, **op.payload)
+                net_entry = self.client.entries.create_entry(parent_id, data)
+
+                self.db.entries.change_entry_id(object_id, net_entry.entry_id)
+                id_map[op.object_id] = net_entry.entry_id
+            case OutboxOperationType.update_entry:
+                data = EditedEntryWithID(entry_id=object_id, group_id=parent_id, **op.payload)
+                self.client.entries.update_entry_data(object_id, data)
+            case OutboxOperationType.delete_entry:
+                self.client.entries.delete_entry_by_id(object_id, parent_id)
+            case OutboxOperationType.create_group:
+                net_group = self.client.groups.create_group(op.payload["group_name"], parent_id)
+
+                self.db.groups.change_group_id(object_id, net_group.group_id)
+                id_map[op.object_id] = net_group.group_id
+            case OutboxOperationType.delete_group:
+                self.client.groups.delete_group(object_id)
+
+    def flush(self) -> int:
+        """Replays every pending operation, returns how many coalesced operations were sent."""
+
+        operations, dropped_ids = coalesce_operations(self.db.outbox.get_pending())
+        self.db.outbox.remove(dropped_ids)
+
+        if not operations:
+            return 0
+
+        # Operations recorded against a local root that was never synced belong to the server's root
+        id_map: dict[uuid.UUID, uuid.UUID] = {}
+        local_root = self.db.groups.get_root_info()
+        net_root = self.client.groups.get_root_info()
+
+        if local_root.group_id != net_root.group_id:
+            id_map[local_root.group_id] = net_root.group_id
+
+        sent = 0
+        done_ids: list[int] = []
+
+        try:
+            for op in operations:
+                try:
+                    self._replay(op, id_map)
+                except UnexpectedStatus as exc:
+                    # Already gone on the server, nothing left to delete
+                    if exc.status_code != 404 or op.operation not in _DELETE_OPS:
+                        raise
+
+                done_ids.extend(op.source_ids)
+                sent += 1
+
+                if len(done_ids) >= self.batch_size:
+                    self.db.outbox.remove(done_ids)
+                    done_ids = []
+        finally:
+            self.db.outbox.remove(done_ids)
+
+            # Pending rows that were not reached yet must follow the new IDs
+            for old_id, new_id in id_map.items():
+                if old_id != local_root.group_id:
+                    self.db.outbox.remap_id(old_id, new_id)
+
+        logger.info("Flushed %d outbox operations to the server", sent)
+        return sent
@@ -0,0 +1,159 @@
+"""Sync engine that keeps the local database as a cache of the server."""
+
+import hashlib
+import logging
+import uuid
+from datetime import UTC, datetime
+
+from pydantic import BaseModel
+
+from ..localdb.database import MainDatabase
+from ..models.models import GroupParentData, PasswordEntryData, SyncChangeset, SyncResult
+from ..workers import run_coroutine
+from .client import SyncClient
+from .outbox import OutboxFlusher
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+
+def object_revision(model: BaseModel) -> str:
+    """Revision of a group or entry, used to detect what changed since the last sync."""
+
+    return hashlib.blake2b(model.model_dump_json().encode("utf-8"), digest_size=16).hexdigest()
+
+
+class SyncEngine:
+    """Pulls the server state and applies only what changed since the last sync.
+
+    The server does not expose revisions or a change feed, so a pull still walks the server once,
+    fetching every level of the tree and every page of entries concurrently through the async client.
+    Each object's revision is compared to the one stored in `SyncState`, only changed objects are written
+    and the whole changeset is committed in one transaction. After a pull, every UI read is served locally.
+    """
+
+    def __init__(self, db: MainDatabase, client: SyncClient, page_size: int = 100):
+        if not client.enabled:
+            raise RuntimeError("cannot sync with a disabled client")
+
+        self.db = db
+        self.client = client
+
+        self.page_size = page_size
+        self.flusher = OutboxFlusher(db, client)
+
+    def _pull_groups(self, root: GroupParentData) -> list[GroupParentData]:
+        # Breadth first, so parents are always applied before their children
+        net_groups: list[GroupParentData] = [root]
+        level = self.client.groups.get_children_of_root()
+
+        # Every group of a level is fetched concurrently on the event loop
+        while level:
+            net_groups.extend(level)
+
+            group_ids = [group.group_id for group in level]
+            children = run_coroutine(self.client.aio.groups.get_children_of_groups(group_ids)).result()
+
+            level = [child for group_id in group_ids for child in children[group_id]]
+
+        return net_groups
+
+    def _pull_entries(self, group_ids: list[uuid.UUID]) -> list[PasswordEntryData]:
+        net_entries: list[PasswordEntryData] = []
+        offset = 0
+
+        # Fetch a page of every group at once, groups with a full page need another round
+        while group_ids:
+            pages = run_coroutine(
+                self.client.aio.entries.get_entries_of_groups(group_ids, amount=self.page_size, offset=offset)
+            ).result()
+
+            for page in pages.values():
+                net_entries.extend(page)
+
+            group_ids = [group_id for group_id, page in pages.items() if len(page) == self.page_size]
+            offset += self.page_size
+
+        return net_entries
+
+    def build_changeset(self) -> SyncChangeset:
+        known_revisions = self.db.syncstate.get_revisions()
+        local_group_ids, local_entry_ids = self.db.syncstate.get_local_ids()
+
+        local_root = self.db.groups.get_root_info()
+        net_root = GroupParentData.model_validate(self.client.groups.get_root_info(), from_attributes=True)
+
+        changeset = SyncChangeset()
+        if net_root.group_id != local_root.group_id:
+            if local_root.group_id in known_revisions:
+                raise RuntimeError("local root group was synced with a different server")
+
+            logger.info("Adopting server root group '%s'", net_root.group_id)
+            changeset.replace_root = net_root
+            local_group_ids.add(net_root.group_id)
+
+        net_groups = self._pull_groups(net_root)
+        net_group_ids: set[uuid.UUID] = set()
+
+        for group in net_groups:
+            net_group_ids.add(group.group_id)
+            revision = object_revision(group)
+
+            if known_revisions.get(group.group_id) == revision and group.group_id in local_group_ids:
+                continue
+
+            changeset.revisions[group.group_id] = ("group", revision)
+            if group.group_id != net_root.group_id or not changeset.replace_root:
+                changeset.upsert_groups.append(group)
+
+        net_entry_ids: set[uuid.UUID] = set()
+        for entry in self._pull_entries([group.group_id for group in net_groups]):
+            net_entry_ids.add(entry.entry_id)
+            revision = object_revision(entry)
+
+            if known_revisions.get(entry.entry_id) == revision and entry.entry_id in local_entry_ids:
+                continue
+
+            changeset.revisions[entry.entry_id] = ("entry", revision)
+            changeset.upsert_entries.append(entry)
+
+        # Only remove objects that were synced before, anything else was created locally
+        changeset.delete_group_ids = [
+            group_id for group_id in local_group_ids if group_id in known_revisions and group_id not in net_group_ids
+        ]
+        changeset.delete_entry_ids = [
+            entry_id for entry_id in local_entry_ids if entry_id in known_revisions and entry_id not in net_entry_ids
+        ]
+
+        return changeset
+
+    def pull(self) -> SyncResult:
+        synced_at = datetime.now(UTC)
+        changeset = self.build_changeset()
+
+        self.db.syncstate.apply_changeset(changeset, synced_at)
+        result = SyncResult(
+            groups_changed=len(changeset.upsert_groups) + (1 if changeset.replace_root else 0),
+            entries_changed=len(changeset.upsert_entries),
+            groups_deleted=len(changeset.delete_group_ids),
+            entries_deleted=len(changeset.delete_entry_ids),
+            synced_at=synced_at,
+        )
+
+        logger.info(
+            "Sync complete: %d groups and %d entries changed, %d groups and %d entries deleted",
+            result.groups_changed,
+            result.entries_changed,
+            result.groups_deleted,
+            result.entries_deleted,
+        )
+        return result
+
+    def sync(self) -> SyncResult:
+        """Pushes the outbox first so the pull that follows already contains the local changes."""
+
+        flushed = self.flusher.flush()
+
+        result = self.pull()
+        result.outbox_flushed = flushed
+
+        return result
@@ -1,7 +1,7 @@
 ################################################################################
 ## Form generated from reading UI file 'main.ui'
 ##
-## Created by: Qt User Interface Compiler version 6.9.1
+## Created by: Qt User Interface Compiler version 6.12.0
 ##
 ## WARNING! All changes made in this file will be lost when recompiling UI file!
 ################################################################################
@@ -16,6 +16,7 @@ from PySide6.QtWidgets import (
     QGroupBox,
     QHBoxLayout,
     QLabel,
+    QLineEdit,
     QListView,
     QMenu,
     QMenuBar,
@@ -109,6 +110,18 @@ class Ui_MainWindow:
 
         self.horizontalLayout_12.addWidget(self.databasesOpenDatabaseButton)
 
+        self.databasesChangePasswordButton = QPushButton(self.databasesTabButtonsWidget)
+        self.databasesChangePasswordButton.setObjectName("databasesChangePasswordButton")
+        self.databasesChangePasswordButton.setEnabled(False)
+
+        self.horizontalLayout_12.addWidget(self.databasesChangePasswordButton)
+
+        self.databasesRotateKeyButton = QPushButton(self.databasesTabButtonsWidget)
+        self.databasesRotateKeyButton.setObjectName("databasesRotateKeyButton")
+        self.databasesRotateKeyButton.setEnabled(False)
+
+        self.horizontalLayout_12.addWidget(self.databasesRotateKeyButton)
+
         self.verticalLayout_9.addWidget(self.databasesTabButtonsWidget)
 
         self.verticalSpacer_4 = QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Minimum)
@@ -161,6 +174,12 @@ class Ui_MainWindow:
         self.verticalLayout_8 = QVBoxLayout(self.passwordEntriesWidget)
         self.verticalLayout_8.setObjectName("verticalLayout_8")
         self.verticalLayout_8.setContentsMargins(-1, 0, -1, -1)
+        self.passwordSearchLineEdit = QLineEdit(self.passwordEntriesWidget)
+        self.passwordSearchLineEdit.setObjectName("passwordSearchLineEdit")
+        self.passwordSearchLineEdit.setClearButtonEnabled(True)
+
+        self.verticalLayout_8.addWidget(self.passwordSearchLineEdit)
+
         self.passwordEntriesTableView = QTableView(self.passwordEntriesWidget)
         self.passwordEntriesTableView.setObjectName("passwordEntriesTableView")
         sizePolicy2 = QSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
@@ -508,12 +527,19 @@ class Ui_MainWindow:
         )
         self.databasesNewDatabaseButton.setText(QCoreApplication.translate("MainWindow", "New database", None))
         self.databasesOpenDatabaseButton.setText(QCoreApplication.translate("MainWindow", "Open database", None))
+        self.databasesChangePasswordButton.setText(
+            QCoreApplication.translate("MainWindow", "Change master password", None)
+        )
+        self.databasesRotateKeyButton.setText(QCoreApplication.translate("MainWindow", "Rotate encryption key", None))
         self.databasesRecentlyOpenedLabel.setText(
             QCoreApplication.translate("MainWindow", "Recently opened databases:", None)
         )
         self.appTabWidget.setTabText(
             self.appTabWidget.indexOf(self.databasesTab), QCoreApplication.translate("MainWindow", "Databases", None)
         )
+        self.passwordSearchLineEdit.setPlaceholderText(
+            QCoreApplication.translate("MainWindow", "Search entries...", None)
+        )
         self.entryUsernameLabel.setText(QCoreApplication.translate("MainWindow", "Username:", None))
         self.entryPasswordLabel.setText(QCoreApplication.translate("MainWindow", "Password:", None))
         self.entryNotesLabel.setText(QCoreApplication.translate("MainWindow", "Notes:", None))
@@ -1,30 +1,336 @@
-from collections.abc import Callable
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Coroutine, Hashable
+from enum import IntEnum
 from functools import partial
 from typing import Any
 
-from PySide6.QtCore import QObject, QThread, Signal
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+logger: logging.Logger = logging.getLogger("passwordmanager-client")
+
+DEFAULT_MAX_WORKERS: int = 8
+
+_pool: QThreadPool = QThreadPool()
+_pool.setMaxThreadCount(DEFAULT_MAX_WORKERS)
+
+# Tasks are kept alive until they finish so their signals are not garbage collected mid-run
+_active: set["WorkerTask"] = set()
+_active_lock: threading.Lock = threading.Lock()
 
-_refs: list[tuple["WorkerThread", QThread]] = []
 _t_count: int = 1
 
+# One event loop thread shared by every async network call, started on first use
+_loop_thread: "AsyncLoopThread | None" = None
+_loop_lock: threading.Lock = threading.Lock()
+
+_active_async: set["AsyncTask"] = set()
+
+
+class TaskPriority(IntEnum):
+    """Scheduling classes of worker tasks, most urgent first."""
+
+    interactive = 0  # the user is waiting on it
+    visible_prefetch = 1  # fills in what is on screen or about to be
+    background_sync = 2  # server calls and syncs the user didn't ask for
+    maintenance = 3  # imports, exports and anything else that can wait
+
+
+# Queued tasks past the limit drop the oldest of their class
+DEFAULT_QUEUE_LIMITS: dict[TaskPriority, int] = {
+    TaskPriority.interactive: 256,
+    TaskPriority.visible_prefetch: 32,
+    TaskPriority.background_sync: 64,
+    TaskPriority.maintenance: 16,
+}
 
-class WorkerThread(QObject):
+# Seconds a class can wait behind more urgent ones before its oldest task goes first
+DEFAULT_MAX_QUEUE_WAIT: dict[TaskPriority, float] = {
+    TaskPriority.visible_prefetch: 0.25,
+    TaskPriority.background_sync: 1.0,
+    TaskPriority.maintenance: 3.0,
+}
+
+
+class TaskDroppedError(Exception):
+    """Reported by a task that was dropped from a full queue without running."""
+
+
+class WorkerSignals(QObject):
     dataReady = Signal(object)
     excReceived = Signal(Exception)
     runFinished = Signal()
 
-    def __init__(self, func: Callable[[], Any]):
+
+class WorkerTask(QRunnable):
+    """Runs `func` on the shared thread pool and reports back through `signals`."""
+
+    def __init__(
+        self,
+        func: Callable[[], Any],
+        name: str,
+        priority: TaskPriority = TaskPriority.interactive,
+        droppable: bool = True,
+    ):
         super().__init__()
         self.func = func
+        self.name = name
+        self.droppable = droppable
+
+        self.signals = WorkerSignals()
+        self.setAutoDelete(False)  # lifetime is managed through `_active`
+
+        self.priority: TaskPriority = priority
+        self.queued_at: float = 0.0
+
+        self.cancelled: bool = False
+        self.dropped: bool = False
+
+        # Called when the task is cancelled or dropped before it ran
+        self.on_abandoned: Callable[[], None] | None = None
 
     def run(self):
         try:
+            if self.dropped:
+                self.signals.excReceived.emit(
+                    TaskDroppedError(f"task '{self.name}' was dropped from the {self.priority.name} queue")
+                )
+                return
+
+            if self.cancelled:
+                return
+
             result = self.func()
-            self.dataReady.emit(result)
+            if not self.cancelled:
+                self.signals.dataReady.emit(result)
         except Exception as exc:
-            self.excReceived.emit(exc)
+            if not self.cancelled:
+                self.signals.excReceived.emit(exc)
         finally:
-            self.runFinished.emit()
+            self.signals.runFinished.emit()
+            _scheduler.task_done(self)
+
+    def cancel(self) -> bool:
+        """Removes the task from its queue if it hasn't started, returns whether it was removed.
+
+        A task that is already running can't be interrupted, it finishes without reporting its result.
+        """
+        self.cancelled = True
+        if _scheduler.take(self):
+            pass
+        elif _pool.tryTake(self):
+            _scheduler.task_done(self)
+        else:
+            return False
+
+        _release_task(self)
+        if self.on_abandoned is not None:
+            self.on_abandoned()
+
+        return True
+
+
+class TaskScheduler:
+    """Hands worker tasks to the thread pool by priority, starting them only when a thread is free.
+
+    Each class has a bounded queue, when one is full its oldest droppable task is dropped and reports
+    `TaskDroppedError` instead of running. Tasks that aren't droppable, such as writes sent to the server,
+    are queued past the limit. Classes run in priority order, but once the oldest task of a class has waited longer
+    than its `max_wait` it goes first, so background work still makes progress under a steady stream of
+    interactive tasks. Until then other classes never take the last free thread, long syncs or imports can't
+    keep interactive tasks waiting for one.
+    """
+
+    def __init__(
+        self,
+        pool: QThreadPool,
+        queue_limits: dict[TaskPriority, int] | None = None,
+        max_wait: dict[TaskPriority, float] | None = None,
+    ):
+        self.pool = pool
+        self.queue_limits = dict(queue_limits if queue_limits is not None else DEFAULT_QUEUE_LIMITS)
+        self.max_wait = dict(max_wait if max_wait is not None else DEFAULT_MAX_QUEUE_WAIT)
+
+        self._lock = threading.Lock()
+        self._queues: dict[TaskPriority, deque[WorkerTask]] = {priority: deque() for priority in TaskPriority}
+        self._running: set[WorkerTask] = set()
+
+        self.dropped: int = 0
+        self.aged: int = 0  # tasks started ahead of more urgent classes after waiting too long
+
+    def _next_task(self) -> WorkerTask | None:
+        max_threads = self.pool.maxThreadCount()
+        free = max_threads - len(self._running)
+        if free <= 0:
+            return None
+
+        # A task that waited too long runs as if it was interactive
+        now = time.monotonic()
+        starved = [
+            priority
+            for priority, queue in self._queues.items()
+            if priority != TaskPriority.interactive and queue and now - queue[0].queued_at > self.max_wait[priority]
+        ]
+        if starved:
+            priority = min(starved, key=lambda starved_priority: self._queues[starved_priority][0].queued_at)
+            if any(self._queues[urgent] for urgent in TaskPriority if urgent < priority):
+                self.aged += 1
+
+            return self._queues[priority].popleft()
+
+        reserved = 1 if max_threads > 1 else 0
+        for priority, queue in self._queues.items():
+            if not queue:
+                continue
+
+            if priority != TaskPriority.interactive and free <= reserved:
+                return None
+
+            return queue.popleft()
+
+        return None
+
+    def dispatch(self) -> None:
+        """Starts queued tasks while there are free threads."""
+
+        started: list[WorkerTask] = []
+        with self._lock:
+            while (task := self._next_task()) is not None:
+                self._running.add(task)
+                started.append(task)
+
+        for task in started:
+            self.pool.start(task)
+
+    def submit(self, task: WorkerTask, jump_queue: bool = False) -> None:
+        """Queues `task` in its class, ahead of the others in it with `jump_queue`."""
+
+        task.queued_at = time.monotonic()
+        dropped = None
+
+        with self._lock:
+            queue = self._queues[task.priority]
+            droppable = [queued for queued in queue if queued.droppable]
+            if len(queue) >= self.queue_limits[task.priority] and droppable:
+                dropped = min(droppable, key=lambda queued: queued.queued_at)
+                queue.remove(dropped)
+                self.dropped += 1
+
+            if jump_queue:
+                queue.appendleft(task)
+            else:
+                queue.append(task)
+
+        if dropped is not None:
+            logger.warning("Dropped task '%s', the %s queue is full", dropped.name, dropped.priority.name)
+
+            # Reported from the pool like any other result, the task is never started by the scheduler
+            dropped.cancelled = dropped.dropped = True
+            if dropped.on_abandoned is not None:
+                dropped.on_abandoned()
+
+            self.pool.start(dropped)
+
+        self.dispatch()
+
+    def promote(self, task: WorkerTask, priority: TaskPriority, jump_queue: bool = False) -> bool:
+        """Moves a queued task to a more urgent class or the front of its own, returns whether it was moved."""
+
+        with self._lock:
+            if priority > task.priority or (priority == task.priority and not jump_queue):
+                return False
+
+            try:
+                self._queues[task.priority].remove(task)
+            except ValueError:
+                return False
+
+            task.priority = priority
+            if jump_queue:
+                self._queues[priority].appendleft(task)
+            else:
+                self._queues[priority].append(task)
+
+        self.dispatch()
+        return True
+
+    def take(self, task: WorkerTask) -> bool:
+        """Removes a task that hasn't started from its queue."""
+
+        with self._lock:
+            try:
+                self._queues[task.priority].remove(task)
+            except ValueError:
+                return False
+
+        return True
+
+    def task_done(self, task: WorkerTask) -> None:
+        with self._lock:
+            if task not in self._running:
+                return
+
+            self._running.discard(task)
+
+        self.dispatch()
+
+    def clear(self) -> list[WorkerTask]:
+        """Removes every queued task, returns them."""
+
+        with self._lock:
+            tasks = [task for queue in self._queues.values() for task in queue]
+            for queue in self._queues.values():
+                queue.clear()
+
+        return tasks
+
+
+_scheduler: TaskScheduler = TaskScheduler(_pool)
+
+
+class AsyncLoopThread(threading.Thread):
+    """Runs the asyncio event loop used by the async client."""
+
+    def __init__(self):
+        super().__init__(name="asyncio-loop", daemon=True)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+        self.loop.close()
+
+
+class AsyncTask:
+    """A future completed on another thread, such as a coroutine on the event loop, reporting back through `signals`."""
+
+    def __init__(self, future: concurrent.futures.Future, name: str):
+        self.future = future
+        self.name = name
+
+        self.signals = WorkerSignals()
+
+    def _on_done(self, future: concurrent.futures.Future):
+        # Runs on the event loop thread, signals are queued to the receivers' thread
+        try:
+            if future.cancelled():
+                return
+
+            exc = future.exception()
+            if exc is not None:
+                self.signals.excReceived.emit(exc)
+            else:
+                self.signals.dataReady.emit(future.result())
+        finally:
+            self.signals.runFinished.emit()
+
+    def cancel(self) -> bool:
+        return self.future.cancel()
 
 
 def _get_func_name(func: Callable | None) -> str | None:
@@ -42,34 +348,224 @@ def _get_func_name(func: Callable | None) -> str | None:
     return func_name
 
 
+def _release_task(task: WorkerTask):
+    with _active_lock:
+        _active.discard(task)
+
+
+def _release_async_task(task: AsyncTask):
+    with _active_lock:
+        _active_async.discard(task)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop_thread
+
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.is_alive():
+            _loop_thread = AsyncLoopThread()
+            _loop_thread.start()
+
+            logger.debug("Started asyncio event loop thread")
+
+        return _loop_thread.loop
+
+
+def set_max_worker_count(count: int):
+    """Sets the maximum amount of threads the shared pool is allowed to use."""
+
+    if count < 1:
+        raise ValueError("worker count must be at least 1")
+
+    _pool.setMaxThreadCount(count)
+    _scheduler.dispatch()
+
+    logger.debug("Set max worker count to %d", count)
+
+
+def shutdown(timeout_ms: int = 5000) -> bool:
+    """Drops queued tasks, cancels async tasks and waits for running ones to finish."""
+
+    with _active_lock:
+        async_tasks = list(_active_async)
+
+    for task in async_tasks:
+        task.cancel()
+
+    for task in _scheduler.clear():
+        task.cancelled = True
+        _release_task(task)
+
+    _pool.clear()
+    return _pool.waitForDone(timeout_ms)
+
+
+def stop_event_loop(timeout: float = 5.0):
+    """Stops the event loop thread, call after every async client was closed."""
+
+    global _loop_thread
+
+    with _loop_lock:
+        loop_thread, _loop_thread = _loop_thread, None
+
+    if loop_thread is None:
+        return
+
+    loop_thread.loop.call_soon_threadsafe(loop_thread.loop.stop)
+    loop_thread.join(timeout)
+
+
+def run_coroutine(coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+    """Schedules `coro` on the event loop thread, the returned future can be waited on from any other thread."""
+
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
 def make_worker_thread(
     func: Callable[[], Any],
     data_func: Callable[[object], Any] | None = None,
     exc_callback: Callable[[Exception], Any] | None = None,
-) -> tuple[WorkerThread, QThread]:
-    global _t_count
+    priority: TaskPriority = TaskPriority.interactive,
+    jump_queue: bool = False,
+    droppable: bool = True,
+) -> WorkerTask:
+    """Runs `func` on the shared thread pool.
 
-    worker = WorkerThread(func)
-    thread = QThread()
+    `data_func` receives the return value and `exc_callback` receives any exception raised,
+    both are called on the thread that owns the receivers (usually the UI thread).
+    The task waits in the queue of `priority` for a free thread, see `TaskScheduler`.
+    Pass `droppable=False` for tasks whose result can't be lost, a full queue then never drops them.
+    """
+    global _t_count
 
-    worker.moveToThread(thread)
+    func_name = _get_func_name(func)
+    task = WorkerTask(func, f"task-{_t_count}:func[{func_name}]", priority, droppable)
 
     if data_func is not None:
-        worker.dataReady.connect(data_func)
+        task.signals.dataReady.connect(data_func)
 
     if exc_callback is not None:
-        worker.excReceived.connect(exc_callback)
+        task.signals.excReceived.connect(exc_callback)
 
-    thread.started.connect(worker.run)
-    worker.runFinished.connect(thread.quit)
+    task.signals.runFinished.connect(partial(_release_task, task))
 
-    func_name = _get_func_name(func)
+    with _active_lock:
+        _active.add(task)
+
+    _t_count += 1
+    _scheduler.submit(task, jump_queue)
+
+    return task
+
+
+class SingleFlight:
+    """Shares one worker task between identical calls made while it is still running.
+
+    Calls are identified by a key such as `(operation, group ID)`. The first call for a key starts a task,
+    later calls join it until it returns and get the same result through their callbacks. Joining with
+    callbacks that are already connected adds nothing, so a helper repeating its own request gets one result.
+    """
+
+    def __init__(self):
+        # Reentrant, starting a task can drop one of this instance's queued tasks, which then leaves here
+        self._lock = threading.RLock()
+        self._in_flight: dict[Hashable, tuple[object, WorkerTask, list]] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def _leave(self, key: Hashable, token: object):
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None and flight[0] is token:
+                del self._in_flight[key]
+
+    def _run(self, key: Hashable, token: object, func: Callable[[], Any]):
+        try:
+            return func()
+        finally:
+            # Leave before the result is emitted, so no call can join once it's too late to receive it
+            self._leave(key, token)
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            flight = self._in_flight.get(key)
+            return flight is not None and not flight[1].cancelled
+
+    def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Any],
+        data_func: Callable[[object], Any] | None = None,
+        exc_callback: Callable[[Exception], Any] | None = None,
+        priority: TaskPriority = TaskPriority.interactive,
+        jump_queue: bool = False,
+    ) -> WorkerTask:
+        """Joins the task running for `key`, or starts `func` like `make_worker_thread` does.
+
+        Joining a task that is still queued with a more urgent `priority` moves it up to that class.
+        """
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None and not flight[1].cancelled:
+                _, task, callbacks = flight
+                self.hits += 1
+
+                logger.debug("Joined in-flight task '%s' (%d hits, %d misses)", task.name, self.hits, self.misses)
+
+                if data_func is not None and data_func not in callbacks:
+                    task.signals.dataReady.connect(data_func)
+                    callbacks.append(data_func)
 
-    thread.setObjectName(f"thread-{_t_count}:func[{func_name}]")
-    thread.start()
+                if exc_callback is not None and exc_callback not in callbacks:
+                    task.signals.excReceived.connect(exc_callback)
+                    callbacks.append(exc_callback)
 
-    refs = (worker, thread)
-    _refs.append(refs)
+                _scheduler.promote(task, priority, jump_queue)
+                return task
 
+            self.misses += 1
+            token = object()
+
+            # The task can't leave `_in_flight` before it is added, removing it takes the lock held here
+            task = make_worker_thread(
+                partial(self._run, key, token, func), data_func, exc_callback, priority, jump_queue
+            )
+            self._in_flight[key] = (token, task, [data_func, exc_callback])
+
+            # A task that never runs never reaches `_run()`
+            task.on_abandoned = partial(self._leave, key, token)
+
+        return task
+
+
+def make_future_task(
+    future: concurrent.futures.Future,
+    data_func: Callable[[object], Any] | None = None,
+    exc_callback: Callable[[Exception], Any] | None = None,
+    name: str | None = None,
+) -> AsyncTask:
+    """Reports the result of a future completed on another thread, like a queued database write.
+
+    Callbacks are called on the thread that owns the receivers, same as `make_worker_thread`.
+    """
+    global _t_count
+
+    task = AsyncTask(future, name if name is not None else f"future-task-{_t_count}")
+
+    if data_func is not None:
+        task.signals.dataReady.connect(data_func)
+
+    if exc_callback is not None:
+        task.signals.excReceived.connect(exc_callback)
+
+    task.signals.runFinished.connect(partial(_release_async_task, task))
+
+    with _active_lock:
+        _active_async.add(task)
+
+    task.future.add_done_callback(task._on_done)
     _t_count += 1
-    return refs
+
+    return task
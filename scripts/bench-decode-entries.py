@@ -0,0 +1,95 @@
+"""Benchmark decoding a page of entries from a server response, before and after the fast decode path."""
+
+import json
+import sys
+import time
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.client import models as api_models  # noqa: E402
+from app.models.models import PasswordEntryData  # noqa: E402
+from app.serversync import models as pd_models  # noqa: E402
+from app.serversync.client import entry_list_adapter  # noqa: E402
+
+PAGE_SIZE: int = 10_000
+ROUNDS: int = 5
+
+
+def make_page(size: int) -> bytes:
+    group_id = str(uuid.uuid4())
+    created_at = datetime.now(UTC).isoformat()
+
+    entries = [
+        {
+            "title": f"Entry {i}",
+            "username": f"user{i}@example.com",
+            "password": "correct horse battery staple",
+            "url": f"https://example.com/login/{i}" if i % 2 else None,
+            "notes": "Some notes about this entry",
+            "entry_id": str(uuid.uuid4()),
+            "group_id": group_id,
+            "created_at": created_at,
+        }
+        for i in range(size)
+    ]
+    return json.dumps(entries).encode("utf-8")
+
+
+def decode_generated(content: bytes) -> list[PasswordEntryData]:
+    # What every response went through: attrs models, Pydantic models, then the app's models
+    api_entries = [api_models.EntryPublicGet.from_dict(item) for item in json.loads(content)]
+    pd_entries = [pd_models.EntryPublicGet.model_validate(item, from_attributes=True) for item in api_entries]
+
+    return [
+        PasswordEntryData(
+            title=entry.title,
+            username=entry.username,
+            password=entry.password,
+            url=entry.url.model_dump() if entry.url is not None else None,
+            notes=entry.notes,
+            entry_id=entry.entry_id,
+            group_id=entry.group_id,
+            created_at=entry.created_at,
+        )
+        for entry in pd_entries
+    ]
+
+
+def decode_fast(content: bytes) -> list[PasswordEntryData]:
+    return entry_list_adapter.validate_json(content)
+
+
+def bench(name: str, func, content: bytes) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(content)
+
+        best = min(best, time.perf_counter() - start)
+
+    rate = PAGE_SIZE / best
+    print(f"{name:<10} {best * 1000:8.1f} ms/page {rate:12,.0f} entries/sec")
+
+    return rate
+
+
+def main():
+    content = make_page(PAGE_SIZE)
+    print(f"Decoding a page of {PAGE_SIZE:,} entries ({len(content) / 1024:,.0f} KiB), best of {ROUNDS} rounds")
+    print()
+
+    if decode_generated(content) != decode_fast(content):
+        raise RuntimeError("decode paths returned different entries")
+
+    before = bench("generated", decode_generated, content)
+    after = bench("fast", decode_fast, content)
+
+    print()
+    print(f"Speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
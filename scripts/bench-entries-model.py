@@ -0,0 +1,80 @@
+"""Benchmark loading rows into the entries table model and deleting some of them, at growing sizes.
+
+Both should grow linearly with the number of rows: the time per row stays about the same from one size to the next.
+"""
+
+import random
+import sys
+import time
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PySide6.QtCore import QCoreApplication, Qt  # noqa: E402
+
+from app.models.models import EntryRow  # noqa: E402
+from app.models.ui import PasswordEntriesTableModel  # noqa: E402
+
+ROW_COUNTS: tuple[int, ...] = (25_000, 50_000, 100_000)
+DELETE_COUNT: int = 1_000
+
+
+def make_rows(count: int) -> list[EntryRow]:
+    created_at = datetime.now(UTC)
+    group_id = uuid.uuid4()
+
+    return [
+        EntryRow(
+            f"Entry {i}", f"user{i}@example.com", f"https://example.com/login/{i}", created_at, uuid.uuid4(), group_id
+        )
+        for i in range(count)
+    ]
+
+
+def check(model: PasswordEntriesTableModel, expected: list[EntryRow]):
+    assert model.rowCount() == len(expected)
+
+    for row in random.sample(range(len(expected)), 200):
+        assert model.data(model.index(row, 0), Qt.ItemDataRole.UserRole) is expected[row]
+
+
+def bench(count: int):
+    rows = make_rows(count)
+    model = PasswordEntriesTableModel()
+
+    start = time.perf_counter()
+    model.load_entries(rows)
+    load_time = time.perf_counter() - start
+
+    deleted = random.sample(rows, DELETE_COUNT)
+
+    start = time.perf_counter()
+    for entry in deleted:
+        model.delete_entry(entry)
+
+    delete_time = time.perf_counter() - start
+
+    deleted_ids = {entry.entry_id for entry in deleted}
+    check(model, [entry for entry in rows if entry.entry_id not in deleted_ids])
+
+    print(
+        f"{count:>9,} {load_time * 1000:9.1f} ms {load_time / count * 1e6:7.2f} us/row"
+        f" {delete_time * 1000:9.1f} ms {delete_time / DELETE_COUNT * 1e6:7.2f} us/delete"
+    )
+
+
+def main():
+    QCoreApplication([])
+    random.seed(0)
+
+    print(f"Loading rows, then deleting {DELETE_COUNT:,} random rows")
+    print(f"{'rows':>9} {'load':>12} {'':>13} {'deletes':>12}")
+
+    for count in ROW_COUNTS:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark adding entries through the database writer, committing each write alone and in groups.
+
+Entries are added by threads that wait for each write, and queued all at once the way the UI helpers do.
+Grouped commits should finish the same writes in far fewer transactions, and sooner.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.localdb.database import MainDatabase  # noqa: E402
+from app.models.models import EditedPasswordEntryInfo  # noqa: E402
+
+THREAD_COUNT: int = 8
+WRITES_PER_THREAD: int = 250
+
+# (label, max batch size)
+BATCH_SIZES: tuple[tuple[str, int], ...] = (("one per commit", 1), ("grouped", 500))
+
+
+def bench(label: str, max_batch: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MainDatabase()
+        db.setup(Path(tmp) / "bench.db")
+        db.writer.max_batch = max_batch
+
+        group_id = db.groups.get_root_info().group_id
+        data = EditedPasswordEntryInfo(
+            title="Entry",
+            username="user@example.com",
+            password="hunter2",  # noqa: S106
+            url=None,
+            notes="",
+            group_id=group_id,
+        )
+
+        def write():
+            for _ in range(WRITES_PER_THREAD):
+                db.entries.create_entry(group_id, data)
+
+        def queue():
+            futures = [
+                db.defer(db.entries.create_entry, group_id, data) for _ in range(THREAD_COUNT * WRITES_PER_THREAD)
+            ]
+            for future in futures:
+                future.result()
+
+        for mode, func in (("waiting", write), ("queued", queue)):
+            threads = [threading.Thread(target=func) for _ in range(THREAD_COUNT if func is write else 1)]
+            batches = db.writer.batches
+
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            elapsed = time.perf_counter() - start
+            batches = db.writer.batches - batches
+
+            count = THREAD_COUNT * WRITES_PER_THREAD
+            print(f"{label:>15} {mode:>8} {elapsed * 1000:9.1f} ms {count / elapsed:9.0f} writes/s {batches:6} commits")
+
+        db.close()
+
+
+def main():
+    print(f"{THREAD_COUNT} threads adding {WRITES_PER_THREAD} entries each, then the same amount queued at once")
+    for label, max_batch in BATCH_SIZES:
+        bench(label, max_batch)
+
+
+if __name__ == "__main__":
+    main()
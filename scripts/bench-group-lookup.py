@@ -0,0 +1,100 @@
+"""Benchmark looking up a group with 10k entries, with the old eager loading and with the current loaders."""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.localdb.database import MainDatabase  # noqa: E402
+from app.localdb.dbtables import PasswordEntry, PasswordGroups  # noqa: E402
+
+ENTRY_COUNT: int = 10_000
+ROUNDS: int = 5
+
+
+def populate(db: MainDatabase) -> uuid.UUID:
+    root = db.groups.get_root_info()
+    group = db.groups.create_group("Benchmark", parent_id=root.group_id)
+
+    rows = [
+        {
+            "entry_id": uuid.uuid4(),
+            "title": f"Entry {i}",
+            "username": f"user{i}@example.com",
+            "password": "correct horse battery staple",
+            "url": f"https://example.com/login/{i}",
+            "notes": "Some notes about this entry " * 8,
+            "created_at": datetime.now(UTC),
+            "group_id": group.group_id,
+        }
+        for i in range(ENTRY_COUNT)
+    ]
+    with Session(db.engine) as session:
+        session.exec(insert(PasswordEntry), params=rows)
+        session.commit()
+
+    return group.group_id
+
+
+def lookup_eager(db: MainDatabase, group_id: uuid.UUID) -> bool:
+    # What every `select(PasswordGroups)` did while the relationships were `lazy="selectin"`
+    with Session(db.engine) as session:
+        result = session.exec(
+            select(PasswordGroups)
+            .where(PasswordGroups.group_id == group_id)
+            .options(
+                selectinload(PasswordGroups.parent_group),
+                selectinload(PasswordGroups.child_groups),
+                selectinload(PasswordGroups.entries).selectinload(PasswordEntry.group),
+            )
+        )
+        return result.one_or_none() is not None
+
+
+def lookup_current(db: MainDatabase, group_id: uuid.UUID) -> bool:
+    return db.groups.check_group_exists(group_id)
+
+
+def bench(name: str, func, db: MainDatabase, group_id: uuid.UUID):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(db, group_id)
+
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(db, group_id)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {best * 1000:9.2f} ms {peak / 1024:12,.0f} KiB peak")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = MainDatabase()
+        db.setup(Path(tmp_dir) / "bench.db")
+
+        group_id = populate(db)
+        print(f"Looking up a group with {ENTRY_COUNT:,} entries, best of {ROUNDS} rounds")
+        print()
+
+        bench("eager", lookup_eager, db, group_id)
+        bench("current", lookup_current, db, group_id)
+
+        db.close()
+
+
+if __name__ == "__main__":
+    main()